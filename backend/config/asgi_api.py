@@ -0,0 +1,13 @@
+"""
+ASGI entry point for API workers (config/settings_api.py), e.g.
+
+    uvicorn config.asgi_api:application
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings_api")
+
+application = get_asgi_application()
@@ -42,12 +42,17 @@ INSTALLED_APPS = [
     "portal",
 ]
 MIDDLEWARE = [
+    "portal.metrics.RequestMetricsMiddleware",
+    "portal.profiling.RequestProfilerMiddleware",
+    "portal.querycheck.DuplicateQueryMiddleware",
+    "portal.compression.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "portal.audit.AuditActorMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,6 +87,16 @@ DATABASES = {
     }
 }
 
+# Shared by every worker process on the host, so invalidations (calendar feed
+# versions, signed download URLs) reach all of them. Switch to Redis or
+# Memcached when workers run on more than one host.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "var" / "cache",
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,3 +144,150 @@ CORS_ALLOWED_ORIGINS = [
 ]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+# Request metrics (portal/metrics.py). Each worker dumps its totals here so
+# /metrics can merge across processes.
+PORTAL_METRICS_DIR = BASE_DIR / "var" / "metrics"
+PORTAL_METRICS_FLUSH_SECONDS = 5
+PORTAL_METRICS_TOKEN = ""
+
+# On-demand profiling (portal/profiling.py)
+PORTAL_PROFILE_DIR = BASE_DIR / "var" / "profiles"
+PORTAL_PROFILE_HEADER_MAX_AGE = 24 * 3600
+PORTAL_PROFILE_POLL_SECONDS = 10
+
+# Duplicate / N+1 query detection (portal/querycheck.py). Enabled with DEBUG;
+# set PORTAL_QUERYCHECK_RAISE = True in CI to turn reports into errors.
+PORTAL_QUERYCHECK_ENABLED = DEBUG
+PORTAL_QUERYCHECK_THRESHOLD = 1
+PORTAL_QUERYCHECK_RAISE = False
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "portal.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# JSON encoding and response compression (portal/renderers.py,
+# portal/compression.py)
+PORTAL_JSON_BACKEND = "auto"
+PORTAL_COMPRESS_MIN_BYTES = 1024
+PORTAL_COMPRESS_CACHE_ENTRIES = 256
+PORTAL_GZIP_LEVEL = 6
+PORTAL_BROTLI_QUALITY = 5
+# Random gzip header padding against BREACH; 0 turns it off and lets the
+# middleware use brotli.
+PORTAL_COMPRESS_MAX_RANDOM_BYTES = 100
+
+# Image proxy (portal/images.py)
+PORTAL_IMAGE_WIDTHS = (320, 640, 1280)
+PORTAL_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+PORTAL_IMAGE_FETCH_TIMEOUT = 10
+PORTAL_IMAGE_PREFETCH = True
+PORTAL_IMAGE_PREFETCH_WORKERS = 2
+# Failed fetches are retried after this long; private/loopback sources are
+# refused unless ALLOW_PRIVATE is on (local development only).
+PORTAL_IMAGE_RETRY_SECONDS = 3600
+PORTAL_IMAGE_ALLOW_PRIVATE = False
+
+# Chunked document uploads (portal/uploads.py)
+PORTAL_UPLOAD_CHUNK_BYTES = 5 * 1024 * 1024
+PORTAL_UPLOAD_MAX_BYTES = 500 * 1024 * 1024
+
+# Document downloads (portal/downloads.py): "", "nginx" or "sendfile"
+PORTAL_DOWNLOAD_ACCEL = ""
+PORTAL_ACCEL_REDIRECT_PREFIX = "/protected/"
+
+# Document / image storage (portal/storage.py). Switch to
+# {"BACKEND": "s3", "BUCKET": "...", "ENDPOINT_URL": None, "REGION": None}
+# for S3 with pre-signed, direct-to-bucket transfers.
+PORTAL_STORAGE = {"BACKEND": "local"}
+PORTAL_SIGNED_URL_TTL = 3600
+PORTAL_SIGNED_URL_MARGIN = 300
+
+# Lofty transaction sync (portal/lofty.py, manage.py sync_lofty)
+PORTAL_LOFTY_API_URL = ""
+PORTAL_LOFTY_API_KEY = ""
+PORTAL_LOFTY_TIMEOUT = 15
+PORTAL_LOFTY_PAGE_SIZE = 100
+PORTAL_LOFTY_BATCH_SIZE = 200
+
+# Outbound webhooks (portal/events.py, portal/webhooks.py,
+# manage.py dispatch_webhooks)
+PORTAL_WEBHOOK_COALESCE_SECONDS = 5
+PORTAL_WEBHOOK_BATCH_MAX = 100
+PORTAL_WEBHOOK_TIMEOUT = 5
+PORTAL_WEBHOOK_MAX_ATTEMPTS = 8
+PORTAL_WEBHOOK_WORKERS = 8
+
+# Live updates over SSE (portal/pubsub.py). Set a Redis URL to fan out
+# across worker processes; otherwise only same-process streams are notified.
+PORTAL_PUBSUB_REDIS_URL = ""
+PORTAL_SSE_HEARTBEAT_SECONDS = 20
+PORTAL_SSE_MAX_SECONDS = 3600
+
+# Static buyer portal snapshots (portal/publish.py, manage.py publish_portals).
+# Serve PORTAL_PUBLISH_DIR at PORTAL_PUBLISH_URL from nginx/a CDN (with CORS
+# for the frontend origin); DEBUG serves it from Django.
+PORTAL_PUBLISH_ENABLED = True
+PORTAL_PUBLISH_DIR = BASE_DIR / "var" / "published"
+PORTAL_PUBLISH_URL = "/published/"
+# Snapshot links expire with the buyer token, and after this long at most.
+# nginx's secure_link_md5 needs the secret (defaults to SECRET_KEY).
+PORTAL_PUBLISH_LINK_SECONDS = 3600
+PORTAL_PUBLISH_LINK_SECRET = ""
+
+# Audit log (portal/audit.py): "buffered" batches inserts off the request
+# path after commit; "transactional" writes them inside the changing
+# transaction.
+PORTAL_AUDIT_MODE = "buffered"
+PORTAL_AUDIT_BATCH_SIZE = 200
+PORTAL_AUDIT_FLUSH_SECONDS = 1.0
+PORTAL_AUDIT_MAX_PENDING = 10_000  # queued entries kept while inserts fail
+
+# Buyer engagement events (portal/engagement.py): buffered in memory and
+# bulk-inserted on size/time thresholds.
+PORTAL_ENGAGEMENT_BUFFER_MAX = 10_000
+PORTAL_ENGAGEMENT_BATCH_SIZE = 500
+PORTAL_ENGAGEMENT_FLUSH_SECONDS = 5.0
+
+# Pilot metric rollups (portal/rollups.py, manage.py rollup_stats): each
+# incremental pass re-reads this far behind its watermark.
+PORTAL_ROLLUP_LATE_SECONDS = 300
+
+# Delta sync (portal/delta.py): tombstones older than this are pruned by
+# manage.py dispatch_webhooks --prune-days, and a ?since= cursor older than
+# this gets the full payload. Keep it above PORTAL_ROLLUP_LATE_SECONDS.
+PORTAL_DELTA_MAX_CURSOR_DAYS = 30
+
+# Due-date reminders (portal/reminders.py, manage.py send_reminders). Digests
+# are emailed with EMAIL_BACKEND/DEFAULT_FROM_EMAIL.
+PORTAL_REMINDER_LEAD_DAYS = 3
+PORTAL_REMINDER_OVERDUE_DAYS = 14
+PORTAL_REMINDER_INACTIVE_STATUSES = ["Closed", "Cancelled", "Canceled"]
+PORTAL_REMINDER_MAX_ATTEMPTS = 5
+
+# Calendar feeds (portal/ics.py): built feeds stay cached until a date they
+# show changes, and at most this long.
+PORTAL_ICS_CACHE_SECONDS = 24 * 3600
+PORTAL_ICS_UID_DOMAIN = "closing-portal"
+
+# Admin changelists on large tables (portal/changelists.py): filtered result
+# counts stop at this many rows.
+PORTAL_ADMIN_COUNT_CAP = 10_000
+
+# Bulk admin actions (portal/bulk.py): selections above the threshold run as
+# background AdminJobs in chunks; with THREAD off only manage.py
+# run_admin_jobs runs them. It also resumes running jobs whose heartbeat
+# (bumped per chunk) is older than STALE_MINUTES, so keep that well above
+# the time one chunk takes.
+PORTAL_ADMIN_JOB_THRESHOLD = 5000
+PORTAL_ADMIN_JOB_CHUNK = 2000
+PORTAL_ADMIN_JOB_THREAD = True
+PORTAL_ADMIN_JOB_TOKEN_HOURS = 72
+PORTAL_ADMIN_JOB_STALE_MINUTES = 10
+
+# Batch transaction fetch for the agent UI (agent/transactions/batch/): most
+# transactions one call may ask for.
+PORTAL_AGENT_BATCH_MAX = 50
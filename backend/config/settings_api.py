@@ -0,0 +1,60 @@
+"""
+API-worker profile: serves only /api/portal/ (and /metrics).
+
+Every portal view authenticates with its own buyer or agent token
+(authentication_classes([]) throughout), so the session, auth, CSRF and
+messages middleware did nothing for them but cost time on every request.
+Without the admin, auth, sessions, messages and staticfiles apps, a worker
+also boots without importing the admin and its forms and templates.
+
+Run API workers with config.wsgi_api / config.asgi_api (or
+DJANGO_SETTINGS_MODULE=config.settings_api). The admin, migrations and
+management commands keep using config.settings, which serves everything as
+before. Route /admin/ to a process on that profile.
+
+manage.py bench_worker compares the two profiles' cold start and
+per-request overhead.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    "rest_framework",
+    "corsheaders",
+    "portal",
+]
+
+MIDDLEWARE = [
+    "portal.metrics.RequestMetricsMiddleware",
+    "portal.profiling.RequestProfilerMiddleware",
+    "portal.querycheck.DuplicateQueryMiddleware",
+    "portal.compression.CompressionMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "portal.audit.AuditActorMiddleware",
+]
+
+ROOT_URLCONF = "config.urls_api"
+
+WSGI_APPLICATION = "config.wsgi_api.application"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": ["django.template.context_processors.request"],
+        },
+    },
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # JSON only: the browsable API needs templates, forms and staticfiles
+    "DEFAULT_RENDERER_CLASSES": ["portal.renderers.FastJSONRenderer"],
+    # No auth app; views get their agent or buyer from the token
+    "UNAUTHENTICATED_USER": None,
+}
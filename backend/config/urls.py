@@ -20,10 +20,18 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from portal.metrics import metrics_view
+from portal.views import published_file
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/portal/", include("portal.urls")),
+    path("metrics", metrics_view),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Snapshot links are signed; nginx checks them with secure_link
+    urlpatterns += [
+        path(f"{settings.PORTAL_PUBLISH_URL.strip('/')}/<str:filename>", published_file)
+    ]
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for API workers (config/settings_api.py), e.g.
+
+    gunicorn config.wsgi_api:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings_api")
+
+application = get_wsgi_application()
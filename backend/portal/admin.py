@@ -1,6 +1,11 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 from .models import (
+    AdminJob,
     Agent,
+    AuditEntry,
+    Brokerage,
     Buyer,
     Transaction,
     PortalToken,
@@ -10,37 +15,83 @@ from .models import (
     Vendor,
     TransactionVendor,
     AgentFAQ,
+    ProfilerArm,
+    ProfileCapture,
+    ReminderDigest,
+    SyncCursor,
+    WebhookEndpoint,
+    WebhookDelivery,
 )
+from . import bulk, dedupe, vendors
+from .changelists import ScalableAdmin
+
+
+def bulk_action(name):
+    """
+    Admin action running bulk.OPERATIONS[name] set-based; large selections
+    are queued as an AdminJob.
+    """
+    fn = bulk.OPERATIONS[name]
+
+    def action(modeladmin, request, queryset):
+        result = bulk.submit(name, queryset, request.user.get_username())
+        if isinstance(result, AdminJob):
+            modeladmin.message_user(
+                request,
+                f"Large selection: queued as job #{result.id}. "
+                "Follow its progress under Admin jobs.",
+            )
+        else:
+            modeladmin.message_user(request, f"{result} row(s) changed.")
+
+    action.__name__ = name
+    return admin.action(description=fn.short_description)(action)
+
+
+@admin.register(Brokerage)
+class BrokerageAdmin(admin.ModelAdmin):
+    list_display = ("name", "created_at")
+    search_fields = ("name",)
 
 
 @admin.register(Agent)
-class AgentAdmin(admin.ModelAdmin):
-    list_display = ("name", "email")
-    search_fields = ("name", "email")
+class AgentAdmin(ScalableAdmin):
+    list_display = ("name", "email", "brokerage")
+    list_filter = ("brokerage",)
+    list_select_related = ("brokerage",)
+    search_fields = ("^name", "^email")
+    autocomplete_fields = ("brokerage",)
+    autocomplete_only = ("id", "name", "email")
 
 
 @admin.register(Buyer)
-class BuyerAdmin(admin.ModelAdmin):
+class BuyerAdmin(ScalableAdmin):
     list_display = ("name", "email")
-    search_fields = ("name", "email")
+    search_fields = ("^name", "^email")
+    autocomplete_only = ("id", "name", "email")
 
 
 @admin.register(PortalToken)
-class PortalTokenAdmin(admin.ModelAdmin):
+class PortalTokenAdmin(ScalableAdmin):
     list_display = ("token", "transaction", "expires_at", "created_at")
-    search_fields = ("token",)
+    list_select_related = ("transaction",)
+    search_fields = ("=token",)
+    autocomplete_fields = ("transaction",)
+    actions = [bulk_action("remint_tokens")]
     list_filter = ("expires_at",)
 
 
 @admin.register(Utility)
-class UtilityAdmin(admin.ModelAdmin):
+class UtilityAdmin(ScalableAdmin):
     list_display = ("category", "provider_name", "phone", "transaction", "due_date")
     list_filter = ("category",)
-    search_fields = ("provider_name", "phone", "website", "notes")
+    list_select_related = ("transaction",)
+    search_fields = ("^provider_name", "^transaction__address")
+    autocomplete_fields = ("transaction",)
 
 
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
+class DocumentAdmin(ScalableAdmin):
     list_display = (
         "title",
         "transaction",
@@ -48,16 +99,22 @@ class DocumentAdmin(admin.ModelAdmin):
         "visible_to_buyer",
         "uploaded_at",
     )
-    search_fields = ("title", "doc_type", "transaction__address")
+    search_fields = ("^title", "=doc_type", "^transaction__address")
     list_filter = ("visible_to_buyer", "doc_type")
+    list_select_related = ("transaction",)
+    autocomplete_fields = ("transaction",)
+    raw_id_fields = ("stored_object",)
+    actions = [bulk_action("hide_documents"), bulk_action("show_documents")]
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ScalableAdmin):
     list_display = ("title", "transaction", "completed", "due_date", "order")
     list_filter = ("completed",)
-    search_fields = ("title", "description")
-    ordering = ("order",)
+    list_select_related = ("transaction",)
+    search_fields = ("^title", "^transaction__address")
+    autocomplete_fields = ("transaction",)
+    actions = [bulk_action("complete_tasks")]
 
 
 class TransactionVendorInline(admin.TabularInline):
@@ -69,24 +126,75 @@ class TransactionVendorInline(admin.TabularInline):
 
 
 @admin.register(Vendor)
-class VendorAdmin(admin.ModelAdmin):
-    list_display = ("name", "agent", "category", "is_favorite", "phone", "website")
-    list_filter = ("category", "is_favorite")
-    search_fields = ("name", "phone", "email", "website", "notes")
-    autocomplete_fields = ("agent",)
+class VendorAdmin(ScalableAdmin):
+    list_display = (
+        "name",
+        "agent",
+        "brokerage",
+        "category",
+        "is_favorite",
+        "phone",
+        "website",
+    )
+    list_filter = ("category", "is_favorite", "brokerage")
+    list_select_related = ("agent", "brokerage")
+    search_fields = ("^name", "^agent__email")
+    autocomplete_fields = ("agent", "brokerage", "overrides")
+    autocomplete_only = ("id", "name", "category")
+    actions = ["share_with_brokerage", "merge_duplicates"]
+
+    @admin.action(description="Move to the agent's brokerage library")
+    def share_with_brokerage(self, request, queryset):
+        shared = sum(vendors.share(v) for v in queryset.select_related("agent"))
+        self.message_user(request, f"{shared} vendor(s) moved to a shared library.")
+
+    @admin.action(description="Merge probable duplicates among selected vendors")
+    def merge_duplicates(self, request, queryset):
+        if not request.POST.get("post"):
+            groups = dedupe.find_duplicates(queryset)
+            if not groups:
+                self.message_user(request, "No probable duplicates found.")
+                return None
+            return TemplateResponse(
+                request,
+                "admin/portal/vendor/merge_duplicates.html",
+                {
+                    **self.admin_site.each_context(request),
+                    "title": "Merge duplicate vendors",
+                    "opts": self.model._meta,
+                    "queryset": queryset,
+                    "groups": groups,
+                    "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+                    "media": self.media,
+                },
+            )
+
+        # Merge exactly the groups that were confirmed
+        id_groups = [
+            [int(i) for i in value.split(",") if i.isdigit()]
+            for value in request.POST.getlist("group")
+        ]
+        stats = dedupe.merge(dedupe.regroup(id_groups, queryset))
+        self.message_user(
+            request,
+            f"{stats['vendors_merged']} vendor(s) merged into {stats['groups']}; "
+            f"{stats['links_repointed']} link(s) repointed, "
+            f"{stats['links_dropped']} duplicate link(s) dropped.",
+        )
 
 
 @admin.register(AgentFAQ)
 class AgentFAQAdmin(admin.ModelAdmin):
     list_display = ("question", "agent", "is_active", "sort_order")
     list_filter = ("is_active",)
+    list_select_related = ("agent",)
     search_fields = ("question", "answer")
     autocomplete_fields = ("agent",)
     ordering = ("agent", "sort_order")
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ScalableAdmin):
     list_display = (
         "id",
         "address",
@@ -97,12 +205,153 @@ class TransactionAdmin(admin.ModelAdmin):
         "lofty_transaction_id",
     )
     list_filter = ("status",)
+    list_select_related = ("agent", "buyer")
     search_fields = (
-        "address",
-        "agent__email",
-        "buyer__email",
-        "buyer__name",
-        "lofty_transaction_id",
+        "^address",
+        "^agent__email",
+        "^buyer__email",
+        "^buyer__name",
+        "=lofty_transaction_id",
     )
     autocomplete_fields = ("agent", "buyer")
+    autocomplete_only = ("id", "address")
     inlines = [TransactionVendorInline]
+    actions = [bulk_action("close_transactions")]
+
+
+@admin.register(ProfilerArm)
+class ProfilerArmAdmin(admin.ModelAdmin):
+    list_display = ("path_prefix", "remaining", "expires_at", "created_at")
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "view",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "sql_ms",
+    )
+    list_filter = ("view", "method")
+    search_fields = ("path",)
+    readonly_fields = [f.name for f in ProfileCapture._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SyncCursor)
+class SyncCursorAdmin(admin.ModelAdmin):
+    list_display = ("name", "cursor", "updated_at")
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ("agent", "url", "is_active", "created_at")
+    list_filter = ("is_active",)
+    list_select_related = ("agent",)
+    autocomplete_fields = ("agent",)
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "endpoint",
+        "event_count",
+        "attempts",
+        "last_status",
+        "next_attempt_at",
+        "delivered_at",
+        "failed_at",
+    )
+    list_select_related = ("endpoint",)
+    readonly_fields = [f.name for f in WebhookDelivery._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "actor",
+        "action",
+        "model",
+        "object_id",
+        "transaction_id",
+    )
+    list_filter = ("action", "model")
+    search_fields = ("actor",)
+    readonly_fields = [f.name for f in AuditEntry._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReminderDigest)
+class ReminderDigestAdmin(admin.ModelAdmin):
+    list_display = (
+        "day",
+        "recipient",
+        "email",
+        "item_count",
+        "sent_at",
+        "attempts",
+    )
+    list_filter = ("recipient", "day")
+    search_fields = ("email",)
+    readonly_fields = [f.name for f in ReminderDigest._meta.fields]
+
+
+@admin.register(AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "operation",
+        "status",
+        "progress",
+        "changed",
+        "requested_by",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "operation")
+    exclude = ("selection",)
+    readonly_fields = [f.name for f in AdminJob._meta.fields if f.name != "selection"]
+    actions = ["requeue"]
+
+    @admin.display(description="Progress")
+    def progress(self, obj):
+        if not obj.total:
+            return f"{obj.processed}"
+        return f"{obj.processed}/{obj.total} ({obj.processed * 100 // obj.total}%)"
+
+    @admin.action(description="Requeue (resumes after the last finished chunk)")
+    def requeue(self, request, queryset):
+        ids = list(
+            queryset.exclude(status=AdminJob.Status.DONE).values_list("id", flat=True)
+        )
+        AdminJob.objects.filter(id__in=ids).update(
+            status=AdminJob.Status.PENDING, error="", finished_at=None
+        )
+        for job_id in ids:
+            bulk.enqueue(job_id)
+        self.message_user(request, f"{len(ids)} job(s) requeued.")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,309 @@
+"""
+Append-only, field-level change log for transactions and their children.
+
+Transaction, Task, Utility, Document and TransactionVendor instances are
+snapshotted on load (post_init, see signals.py). A save records the fields
+that differ from the snapshot as {field: [before, after]}, and a delete
+records the last known values. Bulk paths that skip model signals (Lofty
+sync, bulk_create, vendor merges) call record()/log() directly.
+
+Who made the change comes from a context variable:
+- AuditActorMiddleware seeds it lazily from the admin user.
+- Token-authenticated views set it (e.g. "agent:12").
+- Commands use acting_as().
+- Anything else is "system".
+
+PORTAL_AUDIT_MODE picks how entries are written:
+
+"transactional"
+    bulk-inserted right away, inside the caller's DB transaction.
+"buffered" (default)
+    queued when the caller's transaction commits (rolled-back changes
+    leave no entries). The queue is flushed by a background timer in
+    one bulk INSERT every PORTAL_AUDIT_FLUSH_SECONDS, or as soon as
+    PORTAL_AUDIT_BATCH_SIZE entries are waiting, and again at exit. A
+    failed INSERT puts its entries back in the queue for the next flush;
+    at most PORTAL_AUDIT_MAX_PENDING wait, the oldest are dropped beyond
+    that. A crash can lose the last interval's entries.
+"""
+
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.transaction import on_commit
+from django.utils import timezone
+
+from .models import AuditEntry, Transaction
+
+logger = logging.getLogger("portal.audit")
+
+# Bookkeeping columns that change on every save
+IGNORED_FIELDS = {"id", "created_at", "updated_at", "uploaded_at"}
+
+_actor = ContextVar("portal_audit_actor", default="system")
+_fields_cache = {}
+
+_buffer = []
+_lock = threading.Lock()
+_timer = None
+_timer_due_now = False
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_AUDIT_{name}", default)
+
+
+# -----------------------------
+# Actor
+# -----------------------------
+
+
+def set_actor(actor):
+    """
+    Attribute this context's changes to `actor` (a string, or a callable
+    returning one, resolved only if something is recorded).
+    """
+    return _actor.set(actor)
+
+
+def current_actor():
+    actor = _actor.get()
+    return actor() if callable(actor) else actor
+
+
+@contextmanager
+def acting_as(actor):
+    token = _actor.set(actor)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def _request_actor(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"admin:{user.get_username()}"
+    return "anonymous"
+
+
+class AuditActorMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _actor.set(lambda: _request_actor(request))
+        try:
+            return self.get_response(request)
+        finally:
+            _actor.reset(token)
+
+    async def __acall__(self, request):
+        # The context variable follows the view into sync_to_async threads
+        token = _actor.set(lambda: _request_actor(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            _actor.reset(token)
+
+
+# -----------------------------
+# Capture
+# -----------------------------
+
+
+def _fields(model):
+    fields = _fields_cache.get(model)
+    if fields is None:
+        fields = _fields_cache[model] = [
+            f for f in model._meta.concrete_fields if f.name not in IGNORED_FIELDS
+        ]
+    return fields
+
+
+def snapshot(instance):
+    values = instance.__dict__
+    instance._audit_snapshot = {
+        f.attname: values[f.attname]
+        for f in _fields(type(instance))
+        if f.attname in values
+    }
+
+
+def _clean(field, value):
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        return value
+
+
+def _transaction_id(instance):
+    if isinstance(instance, Transaction):
+        return instance.pk
+    return instance.transaction_id
+
+
+def _entry(instance, action, changes):
+    return AuditEntry(
+        transaction_id=_transaction_id(instance),
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        action=action,
+        changes=changes,
+        actor=current_actor()[:120],
+        created_at=timezone.now(),
+    )
+
+
+def diff(instance, action):
+    """
+    {field: [before, after]} for `instance` against its load-time snapshot.
+    """
+    before = getattr(instance, "_audit_snapshot", {})
+    values = instance.__dict__
+    changes = {}
+    for field in _fields(type(instance)):
+        name = field.attname
+        if action == AuditEntry.Action.DELETE:
+            if name in before:
+                changes[name] = [before[name], None]
+            continue
+        if name not in values:  # deferred
+            continue
+        after = _clean(field, values[name])
+        if action == AuditEntry.Action.CREATE:
+            if after not in (None, ""):
+                changes[name] = [None, after]
+        elif name in before and _clean(field, before[name]) != after:
+            changes[name] = [_clean(field, before[name]), after]
+    return changes
+
+
+def record(instances, action):
+    """
+    Log `action` for each instance; updates with no field changes are
+    skipped. Re-snapshots, so a later save diffs against these values.
+    """
+    entries = []
+    for instance in instances:
+        changes = diff(instance, action)
+        if changes or action != AuditEntry.Action.UPDATE:
+            entries.append(_entry(instance, action, changes))
+        if action != AuditEntry.Action.DELETE:
+            snapshot(instance)
+    write(entries)
+
+
+def log(model, rows):
+    """
+    Log changes made without model instances (queryset updates). `rows` are
+    (object_id, transaction_id, action, changes) tuples.
+    """
+    actor = current_actor()[:120]
+    now = timezone.now()
+    write(
+        [
+            AuditEntry(
+                transaction_id=transaction_id,
+                model=model._meta.model_name,
+                object_id=object_id,
+                action=action,
+                changes=changes,
+                actor=actor,
+                created_at=now,
+            )
+            for object_id, transaction_id, action, changes in rows
+        ]
+    )
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+
+
+def write(entries):
+    if not entries:
+        return
+    if _setting("MODE", "buffered") == "transactional":
+        AuditEntry.objects.bulk_create(entries)
+    else:
+        on_commit(lambda: _enqueue(entries))
+
+
+def _schedule(now):
+    """
+    Start the flush timer unless one that fires soon enough is pending.
+    Call with _lock held.
+    """
+    global _timer, _timer_due_now
+    if _timer is not None:
+        if _timer_due_now or not now:
+            return
+        _timer.cancel()
+    _timer = threading.Timer(0 if now else _setting("FLUSH_SECONDS", 1.0), flush)
+    _timer.daemon = True
+    _timer_due_now = now
+    _timer.start()
+
+
+def _enqueue(entries):
+    with _lock:
+        _buffer.extend(entries)
+        _schedule(now=len(_buffer) >= _setting("BATCH_SIZE", 200))
+
+
+def _requeue(entries):
+    with _lock:
+        room = max(_setting("MAX_PENDING", 10_000) - len(_buffer), 0)
+        kept = entries[len(entries) - room :] if room < len(entries) else entries
+        _buffer[:0] = kept
+        if _buffer:
+            _schedule(now=False)
+    return len(entries) - len(kept)
+
+
+def flush():
+    """
+    Write every queued entry now; returns how many were written.
+    """
+    global _timer, _timer_due_now
+    with _lock:
+        entries = list(_buffer)
+        _buffer.clear()
+        _timer = None
+        _timer_due_now = False
+    if not entries:
+        return 0
+    try:
+        AuditEntry.objects.bulk_create(entries, batch_size=500)
+    except Exception:
+        dropped = _requeue(entries)
+        logger.exception(
+            "audit flush failed; %d entries re-queued, %d dropped",
+            len(entries) - dropped,
+            dropped,
+        )
+        return 0
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()  # timer threads don't outlive the flush
+    return len(entries)
+
+
+atexit.register(flush)
@@ -0,0 +1,310 @@
+"""
+Set-based bulk operations behind the admin's bulk actions.
+
+Each operation handles a whole selection with queryset.update() or
+bulk_create(), never with per-object saves. Those skip model signals, so
+each operation also does what the signals would have done (as the Lofty
+sync and vendor merges do):
+- bump updated_at for delta sync,
+- write audit log entries,
+- republish snapshots,
+- invalidate calendar feeds.
+
+submit() picks where the work runs:
+
+- Selections of up to PORTAL_ADMIN_JOB_THRESHOLD rows run inside the
+  request, in one statement per step.
+- Larger ones become an AdminJob. The selected primary keys are stored
+  on the row (not the query, which a deploy changing the model would
+  break), and the job is run after commit on one background thread.
+  run_job() walks the selection in chunks of PORTAL_ADMIN_JOB_CHUNK
+  rows. Each chunk's changes, the job's progress and its heartbeat
+  commit together, so a job that stops midway resumes from its last
+  chunk. manage.py run_admin_jobs picks up jobs left pending, and
+  reclaims running ones whose heartbeat is older than
+  PORTAL_ADMIN_JOB_STALE_MINUTES (their process died).
+"""
+
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from django.db.models import Q
+from django.db.transaction import on_commit
+from django.utils import timezone
+
+from . import audit, ics, publish
+from .models import AdminJob, AuditEntry, Document, PortalToken, Task, Transaction
+
+logger = logging.getLogger("portal.bulk")
+
+CLOSED_STATUS = "Closed"
+
+OPERATIONS = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_ADMIN_JOB_{name}", default)
+
+
+def operation(model, description):
+    """
+    Register fn(queryset) -> rows changed as a bulk operation on `model`.
+    """
+
+    def register(fn):
+        fn.model = model
+        fn.short_description = description
+        OPERATIONS[fn.__name__] = fn
+        return fn
+
+    return register
+
+
+def _log_changes(model, rows, field, new):
+    # rows: (object_id, transaction_id, old value)
+    audit.log(
+        model,
+        [
+            (object_id, txn_id, AuditEntry.Action.UPDATE, {field: [old, new]})
+            for object_id, txn_id, old in rows
+        ],
+    )
+
+
+# -----------------------------
+# Operations
+# -----------------------------
+
+
+@operation(Transaction, "Close out selected transactions")
+def close_transactions(queryset):
+    rows = list(queryset.exclude(status=CLOSED_STATUS).values_list("id", "status"))
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+    changed = Transaction.objects.filter(id__in=ids).update(
+        status=CLOSED_STATUS, updated_at=timezone.now()
+    )
+    _log_changes(Transaction, [(i, i, old) for i, old in rows], "status", CLOSED_STATUS)
+    publish.schedule(ids)
+    return changed
+
+
+@operation(Task, "Mark selected tasks complete")
+def complete_tasks(queryset):
+    rows = list(
+        queryset.filter(completed=False).values_list(
+            "id", "transaction_id", "transaction__agent_id"
+        )
+    )
+    if not rows:
+        return 0
+    changed = Task.objects.filter(id__in=[row[0] for row in rows]).update(
+        completed=True, updated_at=timezone.now()
+    )
+    _log_changes(Task, [(i, txn_id, False) for i, txn_id, _ in rows], "completed", True)
+    txn_ids = {row[1] for row in rows}
+    publish.schedule(txn_ids)
+    ics.invalidate(txn_ids, {row[2] for row in rows})
+    return changed
+
+
+def _set_visibility(queryset, visible):
+    rows = list(
+        queryset.exclude(visible_to_buyer=visible).values_list(
+            "id", "transaction_id", "visible_to_buyer"
+        )
+    )
+    if not rows:
+        return 0
+    changed = Document.objects.filter(id__in=[row[0] for row in rows]).update(
+        visible_to_buyer=visible, updated_at=timezone.now()
+    )
+    _log_changes(Document, rows, "visible_to_buyer", visible)
+    publish.schedule({row[1] for row in rows})
+    return changed
+
+
+@operation(Document, "Hide selected documents from buyers")
+def hide_documents(queryset):
+    return _set_visibility(queryset, False)
+
+
+@operation(Document, "Show selected documents to buyers")
+def show_documents(queryset):
+    return _set_visibility(queryset, True)
+
+
+@operation(PortalToken, "Re-mint buyer links (expires the selected ones)")
+def remint_tokens(queryset):
+    now = timezone.now()
+    txn_ids = set(queryset.values_list("transaction_id", flat=True))
+    if not txn_ids:
+        return 0
+    queryset.filter(expires_at__gt=now).update(expires_at=now)
+    expires_at = now + timedelta(hours=_setting("TOKEN_HOURS", 72))
+    PortalToken.objects.bulk_create(
+        [
+            PortalToken(
+                token=secrets.token_urlsafe(32),
+                transaction_id=txn_id,
+                expires_at=expires_at,
+            )
+            for txn_id in sorted(txn_ids)
+        ],
+        batch_size=1000,
+    )
+    return len(txn_ids)
+
+
+# -----------------------------
+# Running
+# -----------------------------
+
+
+def submit(name, queryset, requested_by=""):
+    """
+    Run operation `name` over `queryset` now, or queue it as an AdminJob
+    when the selection is large. Returns rows changed, or the job.
+    """
+    fn = OPERATIONS[name]
+    queryset = queryset.order_by().select_related(None)
+    threshold = _setting("THRESHOLD", 5000)
+    if queryset[: threshold + 1].count() <= threshold:
+        with transaction.atomic():
+            return fn(queryset)
+
+    selection = list(queryset.order_by("pk").values_list("pk", flat=True))
+    job = AdminJob.objects.create(
+        operation=name,
+        selection=selection,
+        total=len(selection),
+        requested_by=requested_by[:150],
+    )
+    enqueue(job.id)
+    return job
+
+
+def enqueue(job_id):
+    """
+    Run a pending job on the background thread once the caller commits
+    (unless PORTAL_ADMIN_JOB_THREAD is off; then run_admin_jobs runs it).
+    """
+    if _setting("THREAD", True):
+        on_commit(lambda: _get_executor().submit(_run_in_thread, job_id))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="portal-admin-jobs"
+            )
+    return _executor
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception("admin job %s failed", job_id)
+    finally:
+        close_old_connections()
+
+
+class Reclaimed(Exception):
+    """
+    Another runner took the job over after its heartbeat went stale.
+    """
+
+
+def runnable():
+    """
+    Jobs a runner may claim: pending, or running with a stale heartbeat.
+    """
+    stale = timezone.now() - timedelta(minutes=_setting("STALE_MINUTES", 10))
+    return AdminJob.objects.filter(
+        Q(status=AdminJob.Status.PENDING)
+        | Q(status=AdminJob.Status.RUNNING, heartbeat_at__lt=stale)
+    )
+
+
+def run_job(job_id):
+    """
+    Claim and run one runnable job to completion; returns the job, or None
+    if another live runner has it.
+    """
+    now = timezone.now()
+    claimed = (
+        runnable()
+        .filter(id=job_id)
+        .update(status=AdminJob.Status.RUNNING, started_at=now, heartbeat_at=now)
+    )
+    if not claimed:
+        return None
+    job = AdminJob.objects.get(id=job_id)
+    fn = OPERATIONS.get(job.operation)
+    with audit.acting_as(f"admin:{job.requested_by}" if job.requested_by else "system"):
+        _run(job, fn)
+    return job
+
+
+def _run(job, fn):
+    try:
+        if fn is None:
+            raise LookupError(f"unknown operation {job.operation!r}")
+        remaining = [pk for pk in job.selection if pk > job.cursor]
+        chunk = _setting("CHUNK", 2000)
+        for start in range(0, len(remaining), chunk):
+            _run_chunk(job, fn, remaining[start : start + chunk])
+    except Reclaimed:
+        logger.warning("admin job %s was reclaimed by another runner", job.id)
+        return
+    except Exception as exc:
+        job.status = AdminJob.Status.FAILED
+        job.error = repr(exc)
+        logger.exception("admin job %s (%s) failed", job.id, job.operation)
+    else:
+        job.status = AdminJob.Status.DONE
+    job.finished_at = timezone.now()
+    AdminJob.objects.filter(id=job.id, heartbeat_at=job.heartbeat_at).update(
+        status=job.status, error=job.error, finished_at=job.finished_at
+    )
+
+
+def _run_chunk(job, fn, ids, attempts=3):
+    for attempt in range(1, attempts + 1):
+        try:
+            heartbeat_at = timezone.now()
+            with transaction.atomic():
+                changed = fn(fn.model._default_manager.filter(pk__in=ids))
+                # Progress only lands while this runner still holds the job;
+                # otherwise the chunk rolls back
+                if not AdminJob.objects.filter(
+                    id=job.id, heartbeat_at=job.heartbeat_at
+                ).update(
+                    changed=job.changed + changed,
+                    processed=job.processed + len(ids),
+                    cursor=ids[-1],
+                    heartbeat_at=heartbeat_at,
+                ):
+                    raise Reclaimed(job.id)
+            break
+        except OperationalError:  # lock timeout or deadlock; the chunk rolled back
+            if attempt == attempts:
+                raise
+            time.sleep(attempt)
+    job.changed += changed
+    job.processed += len(ids)
+    job.cursor = ids[-1]
+    job.heartbeat_at = heartbeat_at
@@ -0,0 +1,211 @@
+"""
+Admin changelists that stay fast on million-row tables.
+
+A stock ModelAdmin changelist has three costs that grow with the table:
+
+- two COUNT(*)s per page (the filtered count and the "of N total"),
+- icontains search: LIKE '%term%' that no index can serve, OR-ed across
+  joins (buyer__email, transaction__address),
+- OFFSET pagination, which reads and discards every row before the page.
+
+ScalableAdmin replaces each of them:
+
+Counts
+    show_full_result_count is off. EstimatedCountPaginator estimates an
+    unfiltered table from the planner statistics (PostgreSQL) or MAX(pk).
+    A filtered changelist is counted only up to PORTAL_ADMIN_COUNT_CAP
+    rows.
+Search
+    search_fields may only use Django's "^field" (prefix) and "=field"
+    (exact) forms. A prefix is matched case-insensitively as a range on
+    LOWER(field), which the models' Lower() expression indexes serve.
+    Fields on related models become `fk IN (subquery)`, so each table
+    uses its own index. A numeric term also matches the primary key.
+Paging
+    Rows are listed newest first by pk. "Next" links use ?after=<pk>
+    (WHERE pk < after), which costs the same on any page.
+
+Autocomplete lookups (the widgets on other admins' forms) go through
+get_search_results() and the paginator too. They load only
+`autocomplete_only` columns.
+"""
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils.functional import cached_property
+
+AFTER_VAR = "after"
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_ADMIN_{name}", default)
+
+
+# -----------------------------
+# Counts
+# -----------------------------
+
+
+def estimated_rows(model, using="default"):
+    """
+    Cheap row-count estimate for a whole table.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] > 0:  # -1 until the table is first analyzed
+            return row[0]
+    return model._default_manager.using(using).aggregate(n=Max("pk"))["n"] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count never scans more than PORTAL_ADMIN_COUNT_CAP rows.
+    Pages past the end of an overestimate are simply empty.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not qs.query.where:
+            return estimated_rows(qs.model, qs.db)
+        cap = _setting("COUNT_CAP", 10_000)
+        return qs.order_by()[:cap].count()
+
+
+# -----------------------------
+# Indexed search
+# -----------------------------
+
+
+def _resolve(model, path):
+    """
+    (relation path or "", model owning the field, field name) for `path`.
+    """
+    *relations, name = path.split("__")
+    for part in relations:
+        model = model._meta.get_field(part).related_model
+    return "__".join(relations), model, name
+
+
+def _prefix(name, term):
+    low = term.lower()
+    high = low[:-1] + chr(ord(low[-1]) + 1)
+    return Q(GreaterThanOrEqual(Lower(name), low), LessThan(Lower(name), high))
+
+
+def search_q(model, search_fields, term):
+    """
+    Q for `term` over the "^prefix" / "=exact" search_fields of `model`.
+    """
+    q = Q(pk=int(term)) if term.isdigit() else Q()
+    for spec in search_fields:
+        if spec[0] not in "^=":
+            raise ValueError(f"{model.__name__}: search field {spec!r} is unindexed")
+        relation, target, name = _resolve(model, spec[1:])
+        match = Q(**{name: term}) if spec[0] == "=" else _prefix(name, term)
+        if relation:
+            subquery = target._default_manager.filter(match).values("pk")
+            match = Q(**{f"{relation}__in": subquery})
+        q |= match
+    return q
+
+
+# -----------------------------
+# Keyset pagination
+# -----------------------------
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that also pages by ?after=<pk> and exposes `next_url`.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        try:
+            self.after = int(request.GET.get(AFTER_VAR, ""))
+        except ValueError:
+            self.after = None
+        self.next_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Sorting, filtering and page links start over from the top
+        new_params = {AFTER_VAR: None, **(new_params or {})}
+        return super().get_query_string(new_params, remove)
+
+    def _by_pk(self):
+        return self.after is not None or not self.params.get(ORDER_VAR)
+
+    def get_results(self, request):
+        if self.after is None:
+            super().get_results(request)
+            more = (
+                self.multi_page
+                and not self.show_all
+                and self.page_num < self.paginator.num_pages
+            )
+            rows = self.result_list
+        else:
+            qs = self.queryset.filter(pk__lt=self.after).order_by("-pk")
+            rows = list(qs[: self.list_per_page + 1])
+            more = len(rows) > self.list_per_page
+            rows = rows[: self.list_per_page]
+            self.result_list = rows
+            self.result_count = len(rows)
+            self.full_result_count = None
+            self.show_full_result_count = False
+            self.show_admin_actions = True
+            self.can_show_all = False
+            self.multi_page = False
+            self.paginator = self.model_admin.get_paginator(
+                request, qs, self.list_per_page
+            )
+        rows = list(rows) if more and self._by_pk() else None
+        if rows:
+            self.next_url = self.get_query_string({AFTER_VAR: rows[-1].pk}, [PAGE_VAR])
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Base ModelAdmin for large tables (see the module docstring).
+    """
+
+    ordering = ("-pk",)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    change_list_template = "admin/portal/keyset_change_list.html"
+    # Columns autocomplete results need (whatever __str__ reads)
+    autocomplete_only = None
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        match = request.resolver_match
+        if self.autocomplete_only and match and match.url_name == "autocomplete":
+            qs = qs.only(*self.autocomplete_only)
+        return qs
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term or not self.search_fields:
+            return queryset, False
+        return queryset.filter(search_q(self.model, self.search_fields, term)), False
@@ -0,0 +1,173 @@
+"""
+Response compression with brotli/gzip negotiation.
+
+Brotli is used when the `brotli` package is installed and the client accepts
+it, gzip otherwise. Bodies under PORTAL_COMPRESS_MIN_BYTES are sent as-is.
+Compressed bodies are kept in a small LRU keyed by content hash, so polling
+clients that keep receiving the same payload don't pay for recompression;
+publishers can also call precompress() to write .br/.gz siblings.
+
+Portal payloads put the magic-link token in document URLs next to fields
+the agent or buyer typed, which is what BREACH needs. As in Django's
+GZipMiddleware, gzip responses get a random-length filename in their header
+(up to PORTAL_COMPRESS_MAX_RANDOM_BYTES) so their length doesn't track the
+payload's compressibility. Brotli has no such field, so while padding is on
+responses are only gzipped.
+"""
+
+import gzip
+import hashlib
+import re
+import secrets
+import string
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+    "image/svg+xml",
+)
+
+_ACCEPTS_BR = re.compile(r"\bbr\b")
+_ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+_STRONG_ETAG = re.compile(r'^"')
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(
+            body, quality=getattr(settings, "PORTAL_BROTLI_QUALITY", 5)
+        )
+    return gzip.compress(
+        body, compresslevel=getattr(settings, "PORTAL_GZIP_LEVEL", 6), mtime=0
+    )
+
+
+_PAD_ALPHABET = (string.ascii_letters + string.digits).encode()
+
+
+def pad(compressed, max_random_bytes):
+    """
+    Gzip `compressed` with a random filename of 1..max_random_bytes bytes
+    in its header (see django.utils.text.compress_string).
+    """
+    header = bytearray(compressed[:10])
+    header[3] |= gzip.FNAME
+    filename = bytes(
+        secrets.choice(_PAD_ALPHABET)
+        for _ in range(1 + secrets.randbelow(max_random_bytes))
+    )
+    return bytes(header) + filename + b"\x00" + compressed[10:]
+
+
+def compress(body, encoding):
+    """
+    Compressed `body`, served from the LRU when the same bytes were seen.
+    """
+    size = getattr(settings, "PORTAL_COMPRESS_CACHE_ENTRIES", 256)
+    if not size:
+        return _compress(body, encoding)
+
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+
+    compressed = _compress(body, encoding)
+    with _cache_lock:
+        _cache[key] = compressed
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+    return compressed
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def precompress(body):
+    """
+    {"br": bytes, "gzip": bytes} for static publishing.
+    """
+    return {enc: _compress(body, enc) for enc in available_encodings()}
+
+
+def negotiate(accept_encoding, allow_br=True):
+    if allow_br and brotli is not None and _ACCEPTS_BR.search(accept_encoding):
+        return "br"
+    if _ACCEPTS_GZIP.search(accept_encoding):
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = getattr(settings, "PORTAL_COMPRESS_MIN_BYTES", 1024)
+        self.max_random_bytes = getattr(
+            settings, "PORTAL_COMPRESS_MAX_RANDOM_BYTES", 100
+        )
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < self.min_bytes:
+            return response
+
+        encoding = negotiate(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            allow_br=not self.max_random_bytes,
+        )
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if encoding == "gzip" and self.max_random_bytes:
+            compressed = pad(compressed, self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # The compressed representation differs, so a strong ETag must weaken.
+        etag = response.get("ETag")
+        if etag and _STRONG_ETAG.match(etag):
+            response["ETag"] = f"W/{etag}"
+        return response
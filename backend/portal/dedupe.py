@@ -0,0 +1,282 @@
+"""
+Find and merge probable duplicate vendors.
+
+Vendors are compared only within one owner: an agent's own rows, or a
+brokerage's shared library. Agent overrides of shared entries are left
+out; they follow their shared entry when it is merged. Candidate pairs
+come from blocking keys, not from all pairs:
+
+- normalized phone (last 10 digits),
+- lowercased email,
+- trigrams of the normalized name.
+
+Blocks shared by more than MAX_BLOCK vendors carry no signal and are
+skipped, so the work stays near-linear: trigrams like "ser" in
+"services", and placeholder phones or emails like "000-000-0000".
+
+A candidate pair is a duplicate only if their categories are compatible
+(equal, or one is "other"), and then when:
+- phone or email match exactly and their names are at least
+  CONTACT_NAME_THRESHOLD similar (a shared office line alone is not
+  enough), or
+- their names are at least NAME_THRESHOLD similar, with no conflicting
+  phone or email.
+
+Duplicates are clustered with union-find; two clusters are never joined
+if they hold different categories other than "other", so one loose match
+can't chain unrelated vendors together. Each cluster keeps its most
+linked vendor and folds the others into it. Merging repoints
+TransactionVendor rows in bulk inside one DB transaction. Links that
+would collide on (transaction, vendor, role) are dropped instead.
+"""
+
+import re
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import audit, delta, publish
+from .models import AuditEntry, TransactionVendor, Vendor
+
+MAX_BLOCK = 50
+NAME_THRESHOLD = 0.8
+CONTACT_NAME_THRESHOLD = 0.6
+
+FILL_FIELDS = ("phone", "email", "website", "notes")
+
+_NAME_NOISE = re.compile(
+    r"\b(the|llc|l\.l\.c|inc|pllc|pc|pa|co|corp|company|ltd|group)\b"
+)
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 7 else ""
+
+
+def normalize_name(name):
+    name = _NAME_NOISE.sub(" ", (name or "").lower().replace("&", " and "))
+    return " ".join(_NON_ALNUM.sub(" ", name).split())
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Entry:
+    __slots__ = ("vendor", "phone", "email", "grams")
+
+    def __init__(self, vendor):
+        self.vendor = vendor
+        self.phone = normalize_phone(vendor.phone)
+        self.email = (vendor.email or "").strip().lower()
+        self.grams = trigrams(normalize_name(vendor.name))
+
+
+def _compatible(a, b):
+    # Categories, with "other" (or None) matching anything
+    return a == b or Vendor.Category.OTHER in (a, b) or None in (a, b)
+
+
+def _is_duplicate(a, b):
+    if not _compatible(a.vendor.category, b.vendor.category):
+        return False
+    similarity = _similarity(a.grams, b.grams)
+    if (a.phone and a.phone == b.phone) or (a.email and a.email == b.email):
+        return similarity >= CONTACT_NAME_THRESHOLD
+    if a.phone and b.phone and a.phone != b.phone:
+        return False
+    if a.email and b.email and a.email != b.email:
+        return False
+    return similarity >= NAME_THRESHOLD
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def clusters(vendors):
+    """
+    Group one owner's vendors into duplicate clusters (lists of 2+ vendors).
+    """
+    entries = [_Entry(v) for v in vendors]
+    blocks = defaultdict(list)
+    for i, entry in enumerate(entries):
+        if entry.phone:
+            blocks["p", entry.phone].append(i)
+        if entry.email:
+            blocks["e", entry.email].append(i)
+        for gram in entry.grams:
+            blocks["n", gram].append(i)
+
+    parent = list(range(len(entries)))
+    # Each cluster's category other than "other" (None while it has none)
+    category = [
+        None if e.vendor.category == Vendor.Category.OTHER else e.vendor.category
+        for e in entries
+    ]
+    seen = set()
+    for members in blocks.values():
+        if not 2 <= len(members) <= MAX_BLOCK:
+            continue
+        for i, j in combinations(members, 2):
+            if (i, j) in seen:
+                continue
+            seen.add((i, j))
+            ri, rj = _find(parent, i), _find(parent, j)
+            if (
+                ri != rj
+                and _compatible(category[ri], category[rj])
+                and _is_duplicate(entries[i], entries[j])
+            ):
+                parent[rj] = ri
+                category[ri] = category[ri] or category[rj]
+
+    groups = defaultdict(list)
+    for i, entry in enumerate(entries):
+        groups[_find(parent, i)].append(entry.vendor)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def find_duplicates(queryset=None):
+    """
+    Duplicate clusters across all owners in `queryset` (default: every
+    vendor), leaving out agent overrides. Each cluster is ordered
+    canonical-first: most transaction links, then oldest.
+    """
+    queryset = Vendor.objects.all() if queryset is None else queryset
+    queryset = queryset.filter(overrides__isnull=True)
+    by_owner = defaultdict(list)
+    for vendor in queryset.annotate(link_count=Count("transaction_links")).order_by(
+        "id"
+    ):
+        by_owner[vendor.agent_id, vendor.brokerage_id].append(vendor)
+
+    found = []
+    for owned in by_owner.values():
+        for group in clusters(owned):
+            group.sort(key=lambda v: (-v.link_count, v.id))
+            found.append(group)
+    return found
+
+
+def regroup(id_groups, queryset=None):
+    """
+    Groups of vendors for lists of ids (canonical first), e.g. ones shown
+    for confirmation. Ids no longer in `queryset`, overrides, and vendors
+    of a different owner than their group's canonical are dropped.
+    """
+    queryset = Vendor.objects.all() if queryset is None else queryset
+    wanted = {i for ids in id_groups for i in ids}
+    by_id = queryset.filter(overrides__isnull=True).in_bulk(wanted)
+    groups = []
+    for ids in id_groups:
+        group = [by_id[i] for i in dict.fromkeys(ids) if i in by_id]
+        owner = group and (group[0].agent_id, group[0].brokerage_id)
+        group = [v for v in group if (v.agent_id, v.brokerage_id) == owner]
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+
+@transaction.atomic
+def merge(groups):
+    """
+    Fold each group (canonical first) into its canonical vendor: repoint
+    links and overrides, fill blank contact fields, delete the rest.
+    Returns a Counter of what changed.
+    """
+    stats = Counter()
+    target = {}
+    canonicals = []
+    for canonical, *duplicates in groups:
+        canonicals.append(canonical)
+        for dup in duplicates:
+            target[dup.id] = canonical
+            for field in FILL_FIELDS:
+                if not getattr(canonical, field) and getattr(dup, field):
+                    setattr(canonical, field, getattr(dup, field))
+            canonical.is_favorite = canonical.is_favorite or dup.is_favorite
+    if not target:
+        return stats
+
+    # Links of canonicals and duplicates, canonical's own first, so a
+    # duplicate link colliding on (transaction, role) is the one dropped.
+    vendor_ids = list(target) + [v.id for v in canonicals]
+    links = TransactionVendor.objects.filter(vendor_id__in=vendor_ids).values_list(
+        "id", "transaction_id", "vendor_id", "role"
+    )
+    taken = set()
+    repoint = defaultdict(list)
+    drop = []
+    moved = []
+    txn_ids = set()
+    for link_id, txn_id, vendor_id, role in sorted(
+        links, key=lambda link: link[2] in target
+    ):
+        new_id = target[vendor_id].id if vendor_id in target else vendor_id
+        if (txn_id, new_id, role) in taken:
+            drop.append(link_id)
+        else:
+            taken.add((txn_id, new_id, role))
+            if new_id != vendor_id:
+                repoint[new_id].append(link_id)
+                moved.append((link_id, txn_id, vendor_id, new_id))
+        txn_ids.add(txn_id)
+
+    now = timezone.now()
+    if drop:
+        with delta.collecting_deletes():
+            stats["links_dropped"], _ = TransactionVendor.objects.filter(
+                id__in=drop
+            ).delete()
+    for new_id, link_ids in repoint.items():
+        stats["links_repointed"] += TransactionVendor.objects.filter(
+            id__in=link_ids
+        ).update(vendor_id=new_id)
+    audit.log(
+        TransactionVendor,
+        [
+            (link_id, txn_id, AuditEntry.Action.UPDATE, {"vendor_id": [old, new]})
+            for link_id, txn_id, old, new in moved
+        ],
+    )
+    # Canonicals may have picked up contact fields; resend them on delta sync
+    TransactionVendor.objects.filter(vendor__in=canonicals).update(updated_at=now)
+
+    # Agent overrides of a merged shared entry now override the canonical,
+    # unless the agent already overrides it (then theirs is detached).
+    overridden = set(
+        Vendor.objects.filter(overrides__in=canonicals).values_list(
+            "agent_id", "overrides_id"
+        )
+    )
+    for override in Vendor.objects.filter(overrides_id__in=target):
+        new_id = target[override.overrides_id].id
+        if (override.agent_id, new_id) in overridden:
+            continue
+        overridden.add((override.agent_id, new_id))
+        override.overrides_id = new_id
+        override.save(update_fields=["overrides"])
+        stats["overrides_repointed"] += 1
+
+    Vendor.objects.bulk_update(canonicals, list(FILL_FIELDS) + ["is_favorite"])
+    Vendor.objects.filter(id__in=target).delete()
+    stats["vendors_merged"] = len(target)
+    stats["groups"] = len(canonicals)
+    publish.schedule(txn_ids)
+    return stats
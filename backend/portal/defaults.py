@@ -0,0 +1,93 @@
+"""
+Starter tasks and utilities for new transactions (demo-friendly templates).
+"""
+
+from .models import Task, Utility
+
+DEFAULT_TASK_TEMPLATES = [
+    {
+        "title": "Schedule home inspection",
+        "description": "Coordinate with buyer + inspector.",
+        "order": 10,
+    },
+    {
+        "title": "Review inspection report",
+        "description": "Discuss repairs / concessions.",
+        "order": 20,
+    },
+    {
+        "title": "Confirm appraisal scheduled",
+        "description": "Lender will coordinate appraisal.",
+        "order": 30,
+    },
+    {
+        "title": "Shop homeowners insurance",
+        "description": "Buyer to bind policy before closing.",
+        "order": 40,
+    },
+    {
+        "title": "Set up utilities (power/water/internet)",
+        "description": "Transfer service effective on closing date.",
+        "order": 50,
+    },
+    {
+        "title": "Review Closing Disclosure (CD)",
+        "description": "Buyer signs and confirms cash-to-close.",
+        "order": 60,
+    },
+    {
+        "title": "Final walkthrough",
+        "description": "Confirm property condition before closing.",
+        "order": 70,
+    },
+    {
+        "title": "Bring ID + funds to closing",
+        "description": "Wire/Certified funds per attorney instructions.",
+        "order": 80,
+    },
+]
+
+DEFAULT_UTILITY_TEMPLATES = [
+    {"category": "power", "provider_name": "Power Company (add provider)"},
+    {"category": "water", "provider_name": "Water Company (add provider)"},
+    {"category": "gas", "provider_name": "Gas Company (if applicable)"},
+    {"category": "internet", "provider_name": "Internet Provider (add provider)"},
+    {"category": "trash", "provider_name": "Trash Service (if applicable)"},
+    {"category": "hoa", "provider_name": "HOA Contact (if applicable)"},
+]
+
+
+def create_for(txns):
+    """
+    Bulk-create the template tasks and utilities for saved `txns`. Returns
+    the new rows; no model signals fire, so callers audit them.
+    """
+    tasks = Task.objects.bulk_create(
+        [
+            Task(
+                transaction=txn,
+                title=t["title"],
+                description=t.get("description", ""),
+                order=t.get("order", 0),
+            )
+            for txn in txns
+            for t in DEFAULT_TASK_TEMPLATES
+        ]
+    )
+    utilities = Utility.objects.bulk_create(
+        [
+            Utility(
+                transaction=txn,
+                category=u["category"],
+                provider_name=u["provider_name"],
+                phone="",
+                website="",
+                account_number_hint="",
+                notes="",
+                due_date=None,
+            )
+            for txn in txns
+            for u in DEFAULT_UTILITY_TEMPLATES
+        ]
+    )
+    return tasks + utilities
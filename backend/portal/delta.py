@@ -0,0 +1,123 @@
+"""
+Change tracking for delta sync (`?since=<cursor>` on the buyer and agent
+transaction endpoints).
+
+Task, Utility, Document, TransactionVendor and Transaction carry an indexed
+updated_at; deletes of the children leave a Tombstone (see signals.py). A
+cursor is an opaque timestamp. It is issued CURSOR_OVERLAP behind "now",
+so a write that commits just after a poll, with an updated_at from just
+before it, is still picked up by the next poll. Rows may therefore show up
+twice; clients apply them by id.
+
+Code that deletes many children at once wraps the deletes in
+collecting_deletes(), so their tombstones go in with one bulk insert.
+Tombstones are kept for PORTAL_DELTA_MAX_CURSOR_DAYS (prune() drops older
+ones); a cursor older than that gets the full payload instead of a delta.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Tombstone
+
+CURSOR_OVERLAP = timedelta(seconds=2)
+
+TRACKED = {
+    "task": "tasks",
+    "utility": "utilities",
+    "document": "documents",
+    "transactionvendor": "transaction_vendors",
+}
+
+
+# Tombstones for deletes inside collecting_deletes(), or None outside it
+_collected = ContextVar("delta_collected", default=None)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def max_cursor_age():
+    return timedelta(days=getattr(settings, "PORTAL_DELTA_MAX_CURSOR_DAYS", 30))
+
+
+def is_expired(since, now=None):
+    """
+    Whether tombstones after `since` may already have been pruned.
+    """
+    return since < (now or timezone.now()) - max_cursor_age()
+
+
+def make_cursor(now=None):
+    now = (now or timezone.now()) - CURSOR_OVERLAP
+    return format(int(now.timestamp() * 1_000_000), "x")
+
+
+def parse_cursor(value):
+    try:
+        micros = int(value, 16)
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError) as exc:
+        raise InvalidCursor(f"invalid cursor {value!r}") from exc
+
+
+def changed(queryset, since):
+    return queryset.filter(updated_at__gt=since)
+
+
+def deleted_ids(transaction_id, since):
+    """
+    {"tasks": [ids], "utilities": [...], ...} deleted after `since`.
+    """
+    out = {key: [] for key in TRACKED.values()}
+    for model, object_id in Tombstone.objects.filter(
+        transaction_id=transaction_id, deleted_at__gt=since
+    ).values_list("model", "object_id"):
+        if model in TRACKED:
+            out[TRACKED[model]].append(object_id)
+    return out
+
+
+def _tombstone(instance):
+    return Tombstone(
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        transaction_id=instance.transaction_id,
+    )
+
+
+def record_delete(instance):
+    collected = _collected.get()
+    if collected is not None:
+        collected.append(_tombstone(instance))
+    else:
+        _tombstone(instance).save()
+
+
+@contextmanager
+def collecting_deletes():
+    """
+    Batch the tombstones of the deletes inside the block into one insert
+    at its end (nothing is written if it raises).
+    """
+    collected = []
+    token = _collected.set(collected)
+    try:
+        yield
+    finally:
+        _collected.reset(token)
+    Tombstone.objects.bulk_create(collected, batch_size=1000)
+
+
+def prune(now=None):
+    """
+    Drop tombstones older than any cursor still answered with a delta.
+    """
+    cutoff = (now or timezone.now()) - max_cursor_age()
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,169 @@
+"""
+Serving stored documents without tying up a worker per download.
+
+With a storage backend that pre-signs URLs (S3), the client is redirected to
+the bucket. Otherwise PORTAL_DOWNLOAD_ACCEL selects how bytes leave the box:
+  "nginx"    -> X-Accel-Redirect to PORTAL_ACCEL_REDIRECT_PREFIX + object path
+                (an `internal` nginx location aliased to MEDIA_ROOT)
+  "sendfile" -> X-Sendfile with the absolute path (Apache / lighttpd)
+  ""         -> FileResponse; WSGI servers with wsgi.file_wrapper (gunicorn)
+                use os.sendfile, and single byte ranges are honoured here.
+
+Objects are content-addressed, so the SHA-256 is a strong ETag.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+)
+
+from .storage import get_storage, signed_download_url
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+    """
+    File object limited to [start, start + length). Keeps fileno() so
+    sendfile-capable servers can still use it (they read from the current
+    offset for Content-Length bytes).
+    """
+
+    def __init__(self, fh, start, length):
+        self._fh = fh
+        self._remaining = length
+        fh.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        self._fh.close()
+
+
+def _validators(stored):
+    return f'"{stored.sha256}"', int(stored.created_at.timestamp())
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single satisfiable range, None when the header
+    is absent or unsupported (multi-range), "unsatisfiable" otherwise.
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        suffix = int(last)
+        if suffix == 0:
+            return "unsatisfiable"
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def serve(request, document):
+    stored = document.stored_object
+    etag, last_modified = _validators(stored)
+    filename = document.filename or os.path.basename(stored.path)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+
+    storage = get_storage()
+    if storage.supports_presign:
+        response = HttpResponseRedirect(
+            signed_download_url(stored.path, filename, stored.content_type)
+        )
+        response["Cache-Control"] = "private, max-age=60"
+        return response
+
+    accel = getattr(settings, "PORTAL_DOWNLOAD_ACCEL", "")
+    if accel:
+        content_type = (
+            stored.content_type
+            or mimetypes.guess_type(filename)[0]
+            or "application/octet-stream"
+        )
+        response = HttpResponse(content_type=content_type)
+        if accel == "nginx":
+            prefix = getattr(settings, "PORTAL_ACCEL_REDIRECT_PREFIX", "/protected/")
+            response["X-Accel-Redirect"] = prefix + stored.path
+        else:
+            response["X-Sendfile"] = storage.path(stored.path)
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    else:
+        response = _file_response(request, stored, filename, etag, last_modified)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
+def _file_response(request, stored, filename, etag, last_modified):
+    size = stored.size
+    fh = get_storage().open(stored.path)
+    content_type = stored.content_type or None
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers.get("Range", ""), size)
+
+    if byte_range == "unsatisfiable":
+        fh.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        return FileResponse(fh, filename=filename, content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(
+        _FileRange(fh, start, length),
+        status=206,
+        filename=filename,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
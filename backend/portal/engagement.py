@@ -0,0 +1,133 @@
+"""
+Buyer engagement events: portal opens, document opens, vendor/utility and
+link clicks, and task completions.
+
+record() never touches the database. Events go into a bounded in-memory
+ring buffer (PORTAL_ENGAGEMENT_BUFFER_MAX). If a flush falls behind, the
+oldest events are dropped and counted, so the buffer never blocks a
+request. A background timer bulk-inserts the buffer:
+- every PORTAL_ENGAGEMENT_FLUSH_SECONDS,
+- as soon as PORTAL_ENGAGEMENT_BATCH_SIZE events are waiting,
+- and once more at exit.
+
+A burst of clicks costs one INSERT per batch, not one per click. Losing
+the last few seconds on a crash is acceptable for analytics.
+
+Events carry plain agent/transaction ids (no FKs). daily() groups them per
+agent and day over the (agent_id, occurred_at) index.
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import EngagementEvent
+
+logger = logging.getLogger("portal.engagement")
+
+Kind = EngagementEvent.Kind
+
+# Kinds the buyer client may report; the rest are recorded server-side
+CLIENT_KINDS = {
+    Kind.DOCUMENT_OPEN,
+    Kind.VENDOR_CLICK,
+    Kind.UTILITY_CLICK,
+    Kind.LINK_CLICK,
+}
+
+_buffer = None
+_dropped = 0
+_lock = threading.Lock()
+_timer = None
+_timer_due_now = False
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_ENGAGEMENT_{name}", default)
+
+
+def record(kind, txn, object_id=None, target=""):
+    """
+    Queue one event for `txn` (a Transaction; only its ids are kept).
+    """
+    global _buffer, _dropped, _timer, _timer_due_now
+    event = EngagementEvent(
+        agent_id=txn.agent_id,
+        transaction_id=txn.id,
+        kind=kind,
+        object_id=object_id,
+        target=(target or "")[:40],
+        occurred_at=timezone.now(),
+    )
+    with _lock:
+        if _buffer is None:
+            _buffer = deque(maxlen=_setting("BUFFER_MAX", 10_000))
+        if len(_buffer) == _buffer.maxlen:
+            _dropped += 1
+        _buffer.append(event)
+        full = len(_buffer) >= _setting("BATCH_SIZE", 500)
+        if _timer is not None:
+            # One pending timer at most; a full buffer only brings it forward
+            if _timer_due_now or not full:
+                return
+            _timer.cancel()
+        delay = 0 if full else _setting("FLUSH_SECONDS", 5.0)
+        _timer = threading.Timer(delay, flush)
+        _timer.daemon = True
+        _timer_due_now = full
+        _timer.start()
+
+
+def flush():
+    """
+    Bulk-insert everything buffered; returns how many events were written.
+    """
+    global _dropped, _timer, _timer_due_now
+    with _lock:
+        events = list(_buffer or ())
+        if _buffer is not None:
+            _buffer.clear()
+        dropped, _dropped = _dropped, 0
+        _timer = None
+        _timer_due_now = False
+    if dropped:
+        logger.warning("engagement buffer overflowed; dropped %d events", dropped)
+    if not events:
+        return 0
+    try:
+        EngagementEvent.objects.bulk_create(events, batch_size=1000)
+    except Exception:
+        logger.exception("dropping %d engagement events", len(events))
+        return 0
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()  # timer threads don't outlive the flush
+    return len(events)
+
+
+atexit.register(flush)
+
+
+def daily(agent_id, days=30, transaction_id=None):
+    """
+    [{"date", "kind", "count"}] for the agent's last `days` days, oldest
+    first.
+    """
+    since = timezone.now() - timedelta(days=days)
+    qs = EngagementEvent.objects.filter(agent_id=agent_id, occurred_at__gte=since)
+    if transaction_id is not None:
+        qs = qs.filter(transaction_id=transaction_id)
+    return list(
+        qs.annotate(date=TruncDate("occurred_at"))
+        .values("date", "kind")
+        .annotate(count=Count("id"))
+        .order_by("date", "kind")
+    )
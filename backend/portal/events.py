@@ -0,0 +1,113 @@
+"""
+Transactional outbox for domain events.
+
+Write paths call emit() inside the same atomic block as the change, so an
+event exists if and only if the change committed. Nothing here talks to
+the network; portal/webhooks.py (manage.py dispatch_webhooks) fans events
+out to agents' endpoints later. Once the change commits, open live streams
+on the transaction are notified through portal/pubsub.py.
+
+Event types:
+  transaction.created           {address, status, closing_date, buyer}
+  transaction.updated           {changes: {field: {"from", "to"}}}
+  transaction.vendors_updated   {closing_attorney_vendor_id, preferred_vendor_ids,
+                                 utility_provider_ids}
+  task.completed / task.reopened {task_id, title}
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.transaction import on_commit
+
+from . import pubsub
+from .models import OutboxEvent
+
+
+def _jsonable(data):
+    # Dates/decimals as the API renders them, so stored payloads are plain JSON
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def emit(agent_id, event_type, data, transaction=None, coalesce_key=""):
+    """
+    Record an event. Must be called inside the atomic block of the write it
+    describes.
+    """
+    event = OutboxEvent.objects.create(
+        agent_id=agent_id,
+        transaction=transaction,
+        event_type=event_type,
+        coalesce_key=coalesce_key,
+        data=_jsonable(data),
+    )
+    if transaction is not None:
+        message = {"type": event_type, "id": event.id}
+        on_commit(lambda: pubsub.publish(transaction.id, message))
+    return event
+
+
+def changes(instance, before, fields):
+    """
+    {field: {"from", "to"}} for `fields` that differ from the `before` dict.
+    """
+    out = {}
+    for field in fields:
+        old, new = before.get(field), getattr(instance, field)
+        if old != new:
+            out[field] = {"from": old, "to": new}
+    return out
+
+
+# -----------------------------
+# Helpers used by the write paths
+# -----------------------------
+
+
+def transaction_created(txn):
+    emit(
+        txn.agent_id,
+        "transaction.created",
+        {
+            "address": txn.address,
+            "status": txn.status,
+            "closing_date": txn.closing_date,
+            "buyer": {"name": txn.buyer.name, "email": txn.buyer.email},
+        },
+        transaction=txn,
+    )
+
+
+def transaction_updated(txn, changed):
+    if changed:
+        emit(
+            txn.agent_id,
+            "transaction.updated",
+            {"changes": changed},
+            transaction=txn,
+            coalesce_key=f"transaction.updated:{txn.id}",
+        )
+
+
+def task_toggled(task, txn):
+    emit(
+        txn.agent_id,
+        "task.completed" if task.completed else "task.reopened",
+        {"task_id": task.id, "title": task.title},
+        transaction=txn,
+        coalesce_key=f"task:{task.id}",
+    )
+
+
+def vendors_updated(txn, closing_id, preferred_ids, utility_ids):
+    emit(
+        txn.agent_id,
+        "transaction.vendors_updated",
+        {
+            "closing_attorney_vendor_id": closing_id,
+            "preferred_vendor_ids": list(preferred_ids),
+            "utility_provider_ids": list(utility_ids),
+        },
+        transaction=txn,
+        coalesce_key=f"transaction.vendors_updated:{txn.id}",
+    )
@@ -0,0 +1,259 @@
+"""
+iCalendar (.ics) feeds of closing dates, task due dates and utility
+"set up by" dates: one per agent and one per transaction.
+
+Calendar apps poll these feeds every few minutes, but the dates behind
+them rarely change. So each feed is built once and kept in the cache
+under a version key per scope (agent or transaction):
+
+- A poll reads the version, then the feed stored under it. That is two
+  cache lookups and no queries. The view answers If-None-Match /
+  If-Modified-Since from the cached ETag and Last-Modified.
+- A save that changes a feed field (see FEED_FIELDS and signals.py)
+  bumps the version of the transaction and of its agent, and of the
+  previous ones when the row moved. The next poll rebuilds the feed. Bulk
+  paths that skip signals call invalidate().
+
+Versions only reach every worker through a shared cache backend (see
+CACHES); with per-process LocMemCache other workers keep serving the old
+feed. Entries also expire after PORTAL_ICS_CACHE_SECONDS, which bounds
+anything invalidation misses.
+
+Events are all-day (VALUE=DATE). UIDs are stable per row, so clients
+update events in place instead of duplicating them. Completed tasks are
+left out.
+"""
+
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Task, Transaction, Utility
+
+VERSION_KEY = "portal:ics:ver:{scope}:{id}"
+FEED_KEY = "portal:ics:feed:{scope}:{id}:{version}"
+
+# Fields rendered into feeds; saves that change none of them keep the cache
+FEED_FIELDS = {
+    Transaction: {"address", "closing_date", "agent_id"},
+    Task: {"title", "due_date", "completed", "transaction_id"},
+    Utility: {"category", "provider_name", "due_date", "transaction_id"},
+}
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_ICS_{name}", default)
+
+
+# -----------------------------
+# Cache versions
+# -----------------------------
+
+
+def _version(scope, obj_id):
+    key = VERSION_KEY.format(scope=scope, id=obj_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(transaction_ids=(), agent_ids=()):
+    """
+    Drop the cached feeds of these transactions and agents.
+    """
+    keys = {VERSION_KEY.format(scope="txn", id=i) for i in transaction_ids}
+    keys |= {VERSION_KEY.format(scope="agent", id=i) for i in agent_ids}
+    if keys:
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def invalidate_for(instance):
+    """
+    Invalidate the feeds showing `instance` (a Transaction, Task or Utility),
+    and the ones it showed in before this save if its agent or transaction
+    changed (per the load-time audit snapshot).
+    """
+    before = getattr(instance, "_audit_snapshot", {})
+    if isinstance(instance, Transaction):
+        agent_ids = {instance.agent_id, before.get("agent_id")} - {None}
+        invalidate([instance.id], agent_ids)
+        return
+    txn_ids = {instance.transaction_id, before.get("transaction_id")} - {None}
+    txn = instance._state.fields_cache.get("transaction")
+    if txn is not None and len(txn_ids) == 1:
+        agent_ids = {txn.agent_id}
+    else:
+        agent_ids = set(
+            Transaction.objects.filter(id__in=txn_ids).values_list(
+                "agent_id", flat=True
+            )
+        )
+    invalidate(txn_ids, agent_ids)
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+
+
+def _escape(text):
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    # RFC 5545 3.1: lines are at most 75 octets; continuations start with a space
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # mid UTF-8 char
+            end -= 1
+        parts.append(data[start:end].decode())
+        start, limit = end, 74
+    return "\r\n ".join(parts)
+
+
+def _event(uid, day, summary, description, stamp):
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@{_setting('UID_DOMAIN', 'closing-portal')}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+        f"SUMMARY:{_escape(summary)}",
+        f"DESCRIPTION:{_escape(description)}",
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+
+
+def render(name, transactions, tasks, utilities):
+    """
+    The calendar as text. Arguments are values() rows (see build()).
+    """
+    stamp = datetime.now(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    addresses = {t["id"]: t["address"] for t in transactions}
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Closing Portal//Calendar Feed//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+    ]
+    for t in transactions:
+        if t["closing_date"]:
+            lines += _event(
+                f"closing-{t['id']}",
+                t["closing_date"],
+                f"Closing: {t['address']}",
+                f"Closing date for {t['address']}",
+                stamp,
+            )
+    for task in tasks:
+        address = addresses.get(task["transaction_id"], "")
+        lines += _event(
+            f"task-{task['id']}",
+            task["due_date"],
+            f"{task['title']} ({address})",
+            f"Task due for {address}",
+            stamp,
+        )
+    categories = dict(Utility.Category.choices)
+    for u in utilities:
+        address = addresses.get(u["transaction_id"], "")
+        lines += _event(
+            f"utility-{u['id']}",
+            u["due_date"],
+            f"Set up {categories.get(u['category'], 'utility').lower()}: "
+            f"{u['provider_name']}",
+            f"Utility set-up for {address}",
+            stamp,
+        )
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+def build(transactions, name=None):
+    """
+    Render the feed for a Transaction queryset: three queries, no instances.
+    `name` defaults to the (first) transaction's address.
+    """
+    txns = list(transactions.values("id", "address", "closing_date").order_by("id"))
+    ids = [t["id"] for t in txns]
+    tasks = (
+        Task.objects.filter(
+            transaction_id__in=ids, completed=False, due_date__isnull=False
+        )
+        .values("id", "transaction_id", "title", "due_date")
+        .order_by("due_date", "id")
+    )
+    utilities = (
+        Utility.objects.filter(transaction_id__in=ids, due_date__isnull=False)
+        .values("id", "transaction_id", "category", "provider_name", "due_date")
+        .order_by("due_date", "id")
+    )
+    if name is None:
+        name = txns[0]["address"] if txns else "Closing"
+    return render(name, txns, tasks, utilities)
+
+
+# -----------------------------
+# Cached feeds
+# -----------------------------
+
+
+def _etag(body):
+    # DTSTAMP changes on every build; hash the events only
+    events = "\n".join(
+        line for line in body.split("\r\n") if not line.startswith("DTSTAMP:")
+    )
+    return '"%s"' % hashlib.blake2b(events.encode(), digest_size=16).hexdigest()
+
+
+def _cached(scope, obj_id, transactions, name=None):
+    key = FEED_KEY.format(scope=scope, id=obj_id, version=_version(scope, obj_id))
+    feed = cache.get(key)
+    if feed is None:
+        body = build(transactions, name)
+        feed = {
+            "body": body,
+            "etag": _etag(body),
+            "last_modified": int(time.time()),
+        }
+        cache.set(key, feed, _setting("CACHE_SECONDS", 24 * 3600))
+    return feed
+
+
+def agent_feed(agent):
+    """
+    {"body", "etag", "last_modified"} covering all of the agent's
+    transactions. last_modified is a Unix timestamp.
+    """
+    return _cached(
+        "agent",
+        agent.id,
+        Transaction.objects.filter(agent_id=agent.id),
+        f"{agent.name} - closings",
+    )
+
+
+def transaction_feed(transaction_id):
+    """
+    Like agent_feed(), for one transaction. A cache hit runs no queries.
+    """
+    return _cached("txn", transaction_id, Transaction.objects.filter(id=transaction_id))
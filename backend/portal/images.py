@@ -0,0 +1,323 @@
+"""
+Image proxy for agent-supplied URLs (hero images, agent photos, logos).
+
+Each source URL is fetched once, resized to PORTAL_IMAGE_WIDTHS in WebP and
+JPEG, and stored by content hash under images/<hash>/ in the configured
+storage (portal/storage.py), so two URLs
+pointing at the same bytes share one set of files. Variant URLs contain the
+hash and are served with immutable cache headers. A ~16px JPEG data: URI is
+kept on the ImageAsset row as a blur-up placeholder.
+
+Only URLs that are registered (saved on an Agent or Transaction) are proxied;
+registration schedules a background prefetch so buyers rarely hit a cold
+image. Requests never fetch: until an image is ready (or after it failed)
+the proxy redirects to the original URL, and failed images are retried in
+the background after PORTAL_IMAGE_RETRY_SECONDS. Without Pillow installed
+the proxy always redirects to the original URL.
+
+Source URLs come from agents, so fetch() only talks to public addresses.
+The check runs on the connected socket's peer address, so it covers every
+redirect hop and DNS answers that change between lookup and connect.
+PORTAL_IMAGE_ALLOW_PRIVATE turns it off for local development.
+"""
+
+import base64
+import hashlib
+import http.client
+import io
+import ipaddress
+import logging
+import re
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ImageAsset
+from .storage import get_storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+logger = logging.getLogger("portal.images")
+
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+_executor = None
+_executor_lock = threading.Lock()
+# Source URLs queued or being fetched in this process
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+_CONTENT_HASH = re.compile(r"[0-9a-f]{64}")
+
+
+def widths():
+    return tuple(getattr(settings, "PORTAL_IMAGE_WIDTHS", (320, 640, 1280)))
+
+
+def is_content_hash(value):
+    return bool(_CONTENT_HASH.fullmatch(value))
+
+
+def variant_key(content_hash, width, fmt):
+    return f"images/{content_hash[:2]}/{content_hash}/{width}.{fmt}"
+
+
+def variant_url(content_hash, width, fmt):
+    return f"/api/portal/img/{content_hash}/{width}.{fmt}"
+
+
+def pick_width(requested):
+    available = widths()
+    for w in available:
+        if w >= requested:
+            return w
+    return available[-1]
+
+
+# -----------------------------
+# Fetch + resize
+# -----------------------------
+
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def _check_peer(sock):
+    if getattr(settings, "PORTAL_IMAGE_ALLOW_PRIVATE", False):
+        return
+    ip = ipaddress.ip_address(sock.getpeername()[0])
+    if getattr(ip, "ipv4_mapped", None):
+        ip = ip.ipv4_mapped
+    if not ip.is_global:
+        sock.close()
+        raise UnsafeURL(f"refusing to fetch from non-public address {ip}")
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        super().connect()
+        _check_peer(self.sock)
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _check_peer(self.sock)
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _RedirectHandler(urllib.request.HTTPRedirectHandler):
+    max_redirections = 5
+
+    def http_error_302(self, req, fp, code, msg, headers):
+        location = headers.get("location") or headers.get("uri") or ""
+        newurl = urllib.parse.urljoin(req.full_url, location)
+        if not newurl.lower().startswith(("http://", "https://")):
+            raise UnsafeURL(f"refusing to follow redirect to {newurl[:100]}")
+        return super().http_error_302(req, fp, code, msg, headers)
+
+    http_error_301 = http_error_303 = http_error_307 = http_error_308 = http_error_302
+
+
+def _opener():
+    # No environment proxies: the peer check must see the real origin
+    return urllib.request.build_opener(
+        urllib.request.ProxyHandler({}),
+        _PublicHTTPHandler,
+        _PublicHTTPSHandler,
+        _RedirectHandler,
+    )
+
+
+def fetch(url):
+    if not url.lower().startswith(("http://", "https://")):
+        raise UnsafeURL("only http(s) image URLs are supported")
+
+    max_bytes = getattr(settings, "PORTAL_IMAGE_MAX_BYTES", 20 * 1024 * 1024)
+    req = urllib.request.Request(url, headers={"User-Agent": "realestate-portal"})
+    timeout = getattr(settings, "PORTAL_IMAGE_FETCH_TIMEOUT", 10)
+    with _opener().open(req, timeout=timeout) as resp:
+        data = resp.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError("image is too large")
+    return data
+
+
+def _encode(img, fmt, quality=80):
+    if fmt == "jpeg" and img.mode != "RGB":
+        flat = Image.new("RGB", img.size, (255, 255, 255))
+        rgba = img.convert("RGBA")
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        img = flat
+    buf = io.BytesIO()
+    img.save(buf, format=fmt.upper(), quality=quality)
+    return buf.getvalue()
+
+
+def _resized(img, width):
+    if img.width <= width:
+        return img
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def render_variants(data, content_hash):
+    """
+    Write every width/format for `data`; returns (width, height, lqip).
+    """
+    img = Image.open(io.BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    storage = get_storage()
+    for w in widths():
+        variant = _resized(img, w)
+        for fmt, content_type in FORMATS.items():
+            key = variant_key(content_hash, w, fmt)
+            if not storage.exists(key):
+                storage.save_bytes(key, _encode(variant, fmt), content_type)
+
+    tiny = _encode(_resized(img, 16), "jpeg", quality=40)
+    lqip = "data:image/jpeg;base64," + base64.b64encode(tiny).decode()
+    return img.width, img.height, lqip
+
+
+def process(asset):
+    """
+    Fetch and render a pending `asset`; marks it READY or FAILED.
+    """
+    try:
+        data = fetch(asset.source_url)
+        content_hash = hashlib.sha256(data).hexdigest()
+        asset.width, asset.height, asset.lqip = render_variants(data, content_hash)
+        asset.content_hash = content_hash
+        asset.status = ImageAsset.Status.READY
+        asset.error = ""
+    except Exception as exc:  # network, decode and disk errors alike
+        logger.warning("image fetch failed for %s: %s", asset.source_url, exc)
+        asset.status = ImageAsset.Status.FAILED
+        asset.error = str(exc)[:200]
+    asset.fetched_at = timezone.now()
+    asset.save()
+    return asset
+
+
+# -----------------------------
+# Registration + background prefetch
+# -----------------------------
+
+
+def _prefetch(urls):
+    try:
+        for asset in ImageAsset.objects.filter(
+            source_url__in=urls, status=ImageAsset.Status.PENDING
+        ):
+            process(asset)
+    finally:
+        with _in_flight_lock:
+            _in_flight.difference_update(urls)
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "PORTAL_IMAGE_PREFETCH_WORKERS", 2),
+                thread_name_prefix="portal-images",
+            )
+    return _executor
+
+
+def schedule(urls):
+    """
+    Fetch pending `urls` on the background pool; URLs already queued or
+    being fetched in this process are skipped.
+    """
+    if Image is None or not getattr(settings, "PORTAL_IMAGE_PREFETCH", True):
+        return
+    with _in_flight_lock:
+        urls = [u for u in urls if u not in _in_flight]
+        _in_flight.update(urls)
+    if urls:
+        _get_executor().submit(_prefetch, urls)
+
+
+def register(*urls):
+    """
+    Record proxyable URLs and prefetch their variants after commit.
+    """
+    urls = [u for u in urls if u]
+    if not urls:
+        return
+    ImageAsset.objects.bulk_create(
+        [ImageAsset(source_url=u) for u in urls], ignore_conflicts=True
+    )
+    transaction.on_commit(lambda: schedule(urls))
+
+
+def ensure(asset):
+    """
+    Queue a fetch for an asset a request found not ready: pending ones whose
+    prefetch was lost (e.g. to a restart), and failed ones once
+    PORTAL_IMAGE_RETRY_SECONDS have passed.
+    """
+    if asset.status == ImageAsset.Status.FAILED:
+        retry = timedelta(seconds=getattr(settings, "PORTAL_IMAGE_RETRY_SECONDS", 3600))
+        if asset.fetched_at and asset.fetched_at > timezone.now() - retry:
+            return
+        reset = ImageAsset.objects.filter(
+            id=asset.id, status=ImageAsset.Status.FAILED, fetched_at=asset.fetched_at
+        ).update(status=ImageAsset.Status.PENDING)
+        if not reset:  # another worker got there first
+            return
+    elif asset.status != ImageAsset.Status.PENDING:
+        return
+    schedule([asset.source_url])
+
+
+def variants_for(urls):
+    """
+    {source_url: {"lqip", "width", "height", "srcset": {fmt: "url 320w, ..."}}}
+    for the ready assets among `urls`; one query.
+    """
+    urls = [u for u in urls if u]
+    if not urls:
+        return {}
+    out = {}
+    for asset in ImageAsset.objects.filter(
+        source_url__in=urls, status=ImageAsset.Status.READY
+    ):
+        out[asset.source_url] = {
+            "lqip": asset.lqip,
+            "width": asset.width,
+            "height": asset.height,
+            "srcset": {
+                fmt: ", ".join(
+                    f"{variant_url(asset.content_hash, w, fmt)} {w}w" for w in widths()
+                )
+                for fmt in FORMATS
+            },
+        }
+    return out
@@ -0,0 +1,332 @@
+"""
+Read-only, incremental sync of transactions from Lofty.
+
+Lofty is expected to expose
+
+  GET {PORTAL_LOFTY_API_URL}/transactions
+      ?updated_since=<iso8601>&page=<n>&page_size=<n>
+  -> {"total": <int>, "transactions": [
+         {"id", "updated_at", "address", "status", "closing_date",
+          "agent_email", "buyer_name", "buyer_email"}, ...]}
+
+ordered by updated_at ascending, with `updated_since` inclusive.
+
+Pages are read by keyset, not by offset: each request asks for
+updated_since=<last updated_at read>, page 1, and records already read
+at that timestamp are skipped. (Only when a whole page shares one
+timestamp does the next request page within it.) A record updated
+mid-run moves to the end of the window and is read again there; offset
+paging would instead shift unread records onto pages already fetched and
+miss them. Each request depends on the previous page, so the next page
+is fetched while this thread upserts the current one, in batches of
+PORTAL_LOFTY_BATCH_SIZE, matched on Transaction.lofty_transaction_id.
+Only rows whose synced fields actually differ are written, so a re-run with
+no upstream changes issues no writes at all. New transactions get the same
+starter tasks and utilities as ones created through the API. Agents and
+buyers are matched on email case-insensitively.
+
+The checkpoint (SyncCursor "lofty") moves to the last updated_at read,
+which every earlier record was read before, and only when the run
+finished cleanly. Records sharing that timestamp are fetched again next
+time and come back unchanged.
+"""
+
+import json
+import logging
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import audit, defaults, ics, publish
+from .models import Agent, AuditEntry, Buyer, SyncCursor, Transaction
+
+logger = logging.getLogger("portal.lofty")
+
+CURSOR_NAME = "lofty"
+
+# Lofty field -> Transaction field, for fields Lofty owns
+SYNCED_FIELDS = {
+    "address": "address",
+    "status": "status",
+    "closing_date": "closing_date",
+}
+
+
+class LoftyError(Exception):
+    pass
+
+
+class LoftyClient:
+    def __init__(self, base_url=None, api_key=None, timeout=None, retries=3):
+        self.base_url = (
+            base_url or getattr(settings, "PORTAL_LOFTY_API_URL", "")
+        ).rstrip("/")
+        self.api_key = (
+            api_key
+            if api_key is not None
+            else getattr(settings, "PORTAL_LOFTY_API_KEY", "")
+        )
+        self.timeout = timeout or getattr(settings, "PORTAL_LOFTY_TIMEOUT", 15)
+        self.retries = retries
+        if not self.base_url:
+            raise LoftyError("PORTAL_LOFTY_API_URL is not configured")
+
+    def get(self, path, params):
+        url = f"{self.base_url}/{path}?{urllib.parse.urlencode(params)}"
+        headers = {"Accept": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        for attempt in range(self.retries):
+            try:
+                req = urllib.request.Request(url, headers=headers)
+                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                    return json.loads(resp.read())
+            except urllib.error.HTTPError as exc:
+                if exc.code != 429 and exc.code < 500:
+                    raise LoftyError(f"GET {path} failed: HTTP {exc.code}") from exc
+                error = exc
+            except (urllib.error.URLError, TimeoutError) as exc:
+                error = exc
+            time.sleep(0.5 * 2**attempt)
+        raise LoftyError(f"GET {path} failed after {self.retries} attempts: {error}")
+
+    def transactions_page(self, updated_since, page, page_size):
+        params = {"page": page, "page_size": page_size}
+        if updated_since:
+            params["updated_since"] = updated_since
+        return self.get("transactions", params)
+
+
+# -----------------------------
+# Record mapping
+# -----------------------------
+
+
+def _values(record):
+    """
+    Transaction field values Lofty owns, normalised to model types.
+    """
+    values = {}
+    for source, field in SYNCED_FIELDS.items():
+        if source not in record:
+            continue
+        value = record[source]
+        if field == "closing_date":
+            value = parse_date(value) if value else None
+        else:
+            value = (value or "").strip()
+        values[field] = value
+    return values
+
+
+def _changed_fields(txn, values):
+    changed = []
+    for field, value in values.items():
+        if getattr(txn, field) != value:
+            setattr(txn, field, value)
+            changed.append(field)
+    return changed
+
+
+def _upsert_batch(records, stats, dry_run, buyers):
+    """
+    Match `records` against existing transactions (one query), update only
+    the rows that differ and create the new ones. `buyers` (email -> Buyer)
+    persists across batches of a run.
+    """
+    by_id = {str(r["id"]): r for r in records if r.get("id")}
+    stats["invalid"] += len(records) - len(by_id)
+    existing = {
+        t.lofty_transaction_id: t
+        for t in Transaction.objects.filter(lofty_transaction_id__in=list(by_id))
+    }
+
+    now = timezone.now()
+    to_update, update_fields, to_create = [], set(), []
+    for lofty_id, record in by_id.items():
+        values = _values(record)
+        txn = existing.get(lofty_id)
+        if txn is not None:
+            changed = _changed_fields(txn, values)
+            if changed:
+                txn.updated_at = now  # bulk_update skips auto_now
+                to_update.append(txn)
+                update_fields.update(changed + ["updated_at"])
+            else:
+                stats["unchanged"] += 1
+        else:
+            to_create.append((lofty_id, record, values))
+
+    new_rows = _prepare_creates(to_create, stats, buyers)
+    stats["updated"] += len(to_update)
+    stats["created"] += len(new_rows)
+    if dry_run or not (to_update or new_rows):
+        return
+
+    with transaction.atomic():
+        # No model signals on bulk ops: publish and audit by hand
+        if to_update:
+            Transaction.objects.bulk_update(to_update, sorted(update_fields))
+            publish.schedule([t.id for t in to_update])
+            ics.invalidate([t.id for t in to_update], {t.agent_id for t in to_update})
+            audit.record(to_update, AuditEntry.Action.UPDATE)
+        if new_rows:
+            new_buyers = {id(t.buyer): t.buyer for t in new_rows if t.buyer.pk is None}
+            Buyer.objects.bulk_create(new_buyers.values())
+            Transaction.objects.bulk_create(new_rows)
+            children = defaults.create_for(new_rows)
+            ics.invalidate(agent_ids={t.agent_id for t in new_rows})
+            audit.record(new_rows + children, AuditEntry.Action.CREATE)
+
+
+def _email(value):
+    return (value or "").strip().lower()
+
+
+def _by_email(model, emails):
+    """
+    {lowercased email: row} for `emails` (already lowercased), served by the
+    models' Lower("email") indexes.
+    """
+    if not emails:
+        return {}
+    rows = model.objects.annotate(email_lower=Lower("email")).filter(
+        email_lower__in=emails
+    )
+    # Oldest row wins when emails differ only in case
+    return {row.email_lower: row for row in rows.order_by("-id")}
+
+
+def _prepare_creates(to_create, stats, buyers):
+    """
+    Unsaved Transactions for records not yet in the portal. Records whose
+    agent isn't a portal agent are skipped; buyers are matched by email and
+    created (unsaved) when missing.
+    """
+    if not to_create:
+        return []
+    agents = _by_email(Agent, {_email(r.get("agent_email")) for _, r, _ in to_create})
+    missing = {_email(r.get("buyer_email")) for _, r, _ in to_create} - set(buyers)
+    for email, buyer in _by_email(Buyer, missing - {""}).items():
+        buyers.setdefault(email, buyer)
+
+    rows = []
+    for lofty_id, record, values in to_create:
+        agent = agents.get(_email(record.get("agent_email")))
+        buyer_email = (record.get("buyer_email") or "").strip()
+        if agent is None or not buyer_email or not values.get("address"):
+            stats["skipped"] += 1
+            continue
+        buyer = buyers.get(buyer_email.lower())
+        if buyer is None:
+            buyer = Buyer(
+                name=(record.get("buyer_name") or buyer_email), email=buyer_email
+            )
+            buyers[buyer_email.lower()] = buyer
+            stats["buyers_created"] += 1
+        rows.append(
+            Transaction(
+                agent=agent, buyer=buyer, lofty_transaction_id=lofty_id, **values
+            )
+        )
+    return rows
+
+
+# -----------------------------
+# Sync run
+# -----------------------------
+
+
+def sync(client=None, dry_run=False, full=False, page_size=None):
+    """
+    Pull transactions changed since the stored cursor. Returns a stats dict.
+    """
+    client = client or LoftyClient()
+    page_size = page_size or getattr(settings, "PORTAL_LOFTY_PAGE_SIZE", 100)
+    batch_size = getattr(settings, "PORTAL_LOFTY_BATCH_SIZE", 200)
+
+    cursor = SyncCursor.objects.filter(name=CURSOR_NAME).first()
+    stored = cursor.cursor if cursor is not None else ""
+    since = "" if full else stored
+
+    started = time.perf_counter()
+    stats = Counter()
+    pending = []
+    buyers = {}
+    # Keyset position: the updated_at asked for, the page within it, and
+    # the ids already read at that updated_at
+    position, page, read_at_position = since, 1, set()
+    newest = since
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="portal-lofty") as pool:
+        future = pool.submit(client.transactions_page, position, page, page_size)
+        while future is not None:
+            records = future.result().get("transactions") or []
+            stats["pages"] += 1
+            fresh = [
+                r
+                for r in records
+                if (r.get("updated_at") or "") != position
+                or r.get("id") not in read_at_position
+            ]
+
+            future = None
+            if len(records) >= page_size:
+                stamp = records[-1].get("updated_at") or ""
+                if stamp == position:  # the whole page shares one updated_at
+                    page += 1
+                    read_at_position.update(r.get("id") for r in records)
+                else:
+                    position, page = stamp, 1
+                    read_at_position = {
+                        r.get("id") for r in records if r.get("updated_at") == stamp
+                    }
+                future = pool.submit(
+                    client.transactions_page, position, page, page_size
+                )
+
+            if records:
+                newest = records[-1].get("updated_at") or newest
+            stats["fetched"] += len(fresh)
+            pending.extend(fresh)
+            while len(pending) >= batch_size:
+                _upsert_batch(pending[:batch_size], stats, dry_run, buyers)
+                del pending[:batch_size]
+    if pending:
+        _upsert_batch(pending, stats, dry_run, buyers)
+
+    if not dry_run and newest and newest != stored:
+        SyncCursor.objects.update_or_create(
+            name=CURSOR_NAME, defaults={"cursor": newest}
+        )
+        stats["cursor_advanced"] = 1
+
+    result = {
+        "since": since,
+        "cursor": since if dry_run else newest,
+        "dry_run": dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    for key in (
+        "pages",
+        "fetched",
+        "created",
+        "updated",
+        "unchanged",
+        "skipped",
+        "invalid",
+        "buyers_created",
+    ):
+        result[key] = stats[key]
+    logger.info("lofty sync: %s", result)
+    return result
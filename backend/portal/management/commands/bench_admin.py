@@ -0,0 +1,168 @@
+from time import perf_counter
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from portal.models import Agent, Buyer, Document, Task, Transaction, Vendor
+
+BENCH_EMAIL = "bench-admin@example.com"
+STREETS = ("Peachtree St", "Main St", "Oak Ave", "Maple Dr", "Ponce de Leon Ave")
+SEARCH_TERMS = {
+    Transaction: "1234",
+    Task: "Task 1234",
+    Document: "closing packet 99",
+    Vendor: "Vendor 12",
+}
+
+
+def _seed(rows, stdout):
+    """
+    `rows` tasks plus proportional transactions, documents and vendors.
+    """
+    agents = [
+        Agent.objects.get_or_create(
+            email=BENCH_EMAIL if i == 0 else f"bench-agent{i}@example.com",
+            defaults={"name": f"Bench Agent {i}"},
+        )[0]
+        for i in range(20)
+    ]
+    n_txns = max(rows // 10, 1)
+    batch = 10_000
+    clock = perf_counter()
+    with transaction.atomic():
+        buyers = Buyer.objects.bulk_create(
+            [
+                Buyer(name=f"Buyer {i}", email=f"buyer{i}@example.com")
+                for i in range(n_txns)
+            ],
+            batch_size=batch,
+        )
+        txns = Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    agent=agents[i % len(agents)],
+                    buyer=buyers[i],
+                    address=f"{i} {STREETS[i % len(STREETS)]}",
+                    status=("Active", "Pending", "Closed")[i % 3],
+                    lofty_transaction_id=f"LF-{i:08d}",
+                )
+                for i in range(n_txns)
+            ],
+            batch_size=batch,
+        )
+        for model, count, make in (
+            (
+                Task,
+                rows,
+                lambda i: Task(
+                    transaction=txns[i % n_txns], title=f"Task {i}", order=i % 20
+                ),
+            ),
+            (
+                Document,
+                rows // 2,
+                lambda i: Document(
+                    transaction=txns[i % n_txns],
+                    title=f"Closing packet {i}",
+                    doc_type=("closing", "inspection", "other")[i % 3],
+                ),
+            ),
+            (
+                Vendor,
+                rows // 20,
+                lambda i: Vendor(
+                    agent=agents[i % len(agents)],
+                    name=f"Vendor {i} Services",
+                    category="other",
+                ),
+            ),
+        ):
+            for start in range(0, count, batch):
+                model.objects.bulk_create(
+                    [make(i) for i in range(start, min(start + batch, count))]
+                )
+    stdout.write(f"seeded {rows} tasks in {perf_counter() - clock:.1f}s")
+
+
+def _stock(model_admin):
+    """
+    The same admin with Django's defaults: icontains search, no
+    list_select_related, exact counts and OFFSET paging.
+    """
+    stock = admin.ModelAdmin(model_admin.model, admin.site)
+    stock.list_display = model_admin.list_display
+    stock.list_filter = model_admin.list_filter
+    stock.search_fields = [f.lstrip("^=") for f in model_admin.search_fields]
+    return stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Time admin changelists (first page, deep page, search) for the tuned "
+        "admins against Django's defaults."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Insert the fixture first (--rows tasks, rows/10 transactions, "
+            "rows/2 documents, rows/20 vendors).",
+        )
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument(
+            "--no-stock", action="store_true", help="Skip the default-admin runs."
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            _seed(options["rows"], self.stdout)
+        if not Task.objects.exists():
+            raise CommandError("no data; run with --seed")
+
+        user = get_user_model()(username="bench", is_staff=True, is_superuser=True)
+        factory = RequestFactory()
+
+        def run(model_admin, params):
+            request = factory.get("/", params)
+            request.user = user
+            request._messages = CookieStorage(request)
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                clock = perf_counter()
+                response = model_admin.changelist_view(request)
+                response.render()
+                ms = (perf_counter() - clock) * 1000
+            return ms, len(queries), response.status_code
+
+        run(admin.site._registry[Transaction], {})  # load templates
+        self.stdout.write(
+            f"{'admin':<14}{'case':<14}{'variant':<9}{'ms':>10}{'queries':>9}"
+        )
+        for model in (Transaction, Task, Document, Vendor):
+            tuned = admin.site._registry[model]
+            oldest = model.objects.order_by("pk").values_list("pk", flat=True)[100:101]
+            deep_after = oldest[0] if oldest else 1
+            deep_page = max(model.objects.count() // tuned.list_per_page - 1, 1)
+            term = SEARCH_TERMS[model]
+            cases = (
+                ("first page", {}, {}),
+                ("deep page", {"after": deep_after}, {"p": deep_page}),
+                ("search", {"q": term}, {"q": term}),
+            )
+            for case, tuned_params, stock_params in cases:
+                variants = [("tuned", tuned, tuned_params)]
+                if not options["no_stock"]:
+                    variants.append(("stock", _stock(tuned), stock_params))
+                for variant, model_admin, params in variants:
+                    ms, n, status = run(model_admin, params)
+                    flag = "" if status == 200 else f"  (HTTP {status})"
+                    self.stdout.write(
+                        f"{model.__name__:<14}{case:<14}{variant:<9}"
+                        f"{ms:>10.1f}{n:>9}{flag}"
+                    )
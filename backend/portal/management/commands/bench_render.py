@@ -0,0 +1,145 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from portal import compression, renderers
+
+
+def _large_session_payload(tasks, documents, vendors):
+    """
+    Same shape as portal_session, scaled up.
+    """
+    now = timezone.now()
+    today = date.today()
+
+    def vendor(i):
+        return {
+            "id": i,
+            "name": f"Vendor {i} Closing & Title Services LLC",
+            "category": "closing_attorney",
+            "category_label": "Closing Attorney",
+            "phone": "(555) 010-%04d" % i,
+            "email": f"vendor{i}@example-closing-attorneys.com",
+            "website": f"https://www.example-closing-attorneys.com/offices/{i}",
+            "notes": "Call after 5pm. Ask for the closing coordinator.",
+            "is_favorite": True,
+        }
+
+    return {
+        "buyer": {"name": "Jordan Buyer", "email": "jordan@example.com"},
+        "agent": {
+            "name": "Avery Agent",
+            "email": "avery@example-realty.com",
+            "photo_url": "https://cdn.example-realty.com/agents/avery/photo.jpg",
+            "brokerage_logo_url": "https://cdn.example-realty.com/brand/logo.png",
+        },
+        "property": {
+            "address": "1234 Peachtree St NE, Atlanta, GA 30309",
+            "hero_image_url": "https://photos.example-listings.com/1234/hero.jpg",
+        },
+        "transaction": {
+            "id": 1,
+            "address": "1234 Peachtree St NE, Atlanta, GA 30309",
+            "status": "Active",
+            "closing_date": today + timedelta(days=30),
+            "lofty_transaction_id": "LF-000123",
+            "earnest_money": Decimal("5000.00"),
+        },
+        "tasks": [
+            {
+                "id": i,
+                "title": f"Task {i}: Review inspection report",
+                "description": "Discuss repairs / concessions with your agent.",
+                "due_date": today + timedelta(days=i % 40),
+                "completed": bool(i % 3 == 0),
+            }
+            for i in range(tasks)
+        ],
+        "utilities": [
+            {
+                "id": i,
+                "category": "power",
+                "category_label": "Power",
+                "provider_name": "Georgia Power",
+                "phone": "(888) 660-5890",
+                "website": "https://www.georgiapower.com/residential.html",
+                "account_number_hint": "",
+                "notes": "Transfer service effective on closing date.",
+                "due_date": today + timedelta(days=25),
+            }
+            for i in range(6)
+        ],
+        "documents": [
+            {
+                "id": i,
+                "title": f"Closing packet part {i}",
+                "doc_type": "closing",
+                "url": f"https://docs.example-realty.com/transactions/1/doc-{i}.pdf",
+                "uploaded_at": now - timedelta(hours=i),
+            }
+            for i in range(documents)
+        ],
+        "closing_attorney": vendor(0),
+        "preferred_vendors": [vendor(i) for i in range(1, vendors)],
+        "homestead_exemption_url": "https://example-county.gov/homestead",
+        "review_url": "https://g.page/r/example-review",
+        "faqs": [
+            {"id": i, "q": f"Question {i}?", "a": "An answer. " * 20} for i in range(20)
+        ],
+        "my_documents_url": "https://docs.example-realty.com/transactions/1/",
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON render time and bytes-on-wire for portal_session."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=400)
+        parser.add_argument("--documents", type=int, default=200)
+        parser.add_argument("--vendors", type=int, default=100)
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def _time(self, fn, iterations):
+        fn()
+        start = perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (perf_counter() - start) / iterations * 1000
+
+    def handle(self, *args, **options):
+        data = _large_session_payload(
+            options["tasks"], options["documents"], options["vendors"]
+        )
+        n = options["iterations"]
+
+        self.stdout.write(f"{'renderer':<28}{'ms/render':>12}{'bytes':>12}")
+        stdlib = JSONRenderer()
+        body = stdlib.render(data)
+        ms = self._time(lambda: stdlib.render(data), n)
+        self.stdout.write(f"{'drf JSONRenderer':<28}{ms:>12.3f}{len(body):>12}")
+
+        for backend in ("json", "msgspec", "orjson"):
+            if backend == "orjson" and renderers.orjson is None:
+                continue
+            if backend == "msgspec" and renderers.msgspec is None:
+                continue
+            out = renderers.dumps(data, backend)
+            ms = self._time(lambda: renderers.dumps(data, backend), n)
+            same = "" if out == body else "  (differs from drf)"
+            self.stdout.write(
+                f"{'FastJSONRenderer/' + backend:<28}{ms:>12.3f}{len(out):>12}{same}"
+            )
+
+        self.stdout.write("")
+        self.stdout.write(f"{'encoding':<28}{'ms/compress':>12}{'bytes':>12}")
+        self.stdout.write(f"{'identity':<28}{0:>12.3f}{len(body):>12}")
+        for encoding in compression.available_encodings():
+            out = compression._compress(body, encoding)
+            ms = self._time(lambda: compression._compress(body, encoding), n)
+            self.stdout.write(f"{encoding:<28}{ms:>12.3f}{len(out):>12}")
+            ms = self._time(lambda: compression.compress(body, encoding), n)
+            self.stdout.write(f"{encoding + ' (cached)':<28}{ms:>12.3f}{len(out):>12}")
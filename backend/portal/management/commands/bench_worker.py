@@ -0,0 +1,137 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ["config.settings", "config.settings_api"]
+
+# Each measurement runs in a fresh interpreter, so settings (and the import
+# cache) start clean for every profile.
+BOOT = """
+import json, sys, time
+clock = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns  # otherwise loaded by the first request
+seconds = time.perf_counter() - clock
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+REQUESTS = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+from django.core.wsgi import get_wsgi_application
+
+application = get_wsgi_application()
+path, n = sys.argv[1], int(sys.argv[2])
+
+def call():
+    environ = {"PATH_INFO": path}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    b"".join(body)
+    body.close()
+    return status[0]
+
+status = call()
+clock = time.perf_counter()
+for _ in range(n):
+    call()
+print(json.dumps({"status": status, "us": (time.perf_counter() - clock) / n * 1e6}))
+"""
+
+
+def _run(profile, args, importtime=False):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": profile}
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + args
+    result = subprocess.run(
+        cmd, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise CommandError(f"{profile}: {result.stderr.strip().splitlines()[-1]}")
+    return result
+
+
+def _imports(stderr):
+    """
+    {module: cumulative us} from `python -X importtime` output. Modules
+    loaded with importlib.import_module (apps, admin autodiscovery) are
+    not listed, only what they import in turn.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare settings profiles: cold start (wall time and python -X "
+        "importtime) and per-request overhead through the WSGI stack."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            action="append",
+            dest="profiles",
+            help=f"Settings module to measure (repeatable; default {PROFILES}).",
+        )
+        parser.add_argument(
+            "--path",
+            default="/api/portal/session/",
+            help="Request path. The default fails fast on its missing token, "
+            "so it times the framework and middleware, not the view.",
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--boots", type=int, default=5)
+        parser.add_argument(
+            "--top", type=int, default=10, help="Slowest imports to list."
+        )
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"] or PROFILES
+        rows = []
+        for profile in profiles:
+            boots = [
+                json.loads(_run(profile, ["-c", BOOT]).stdout)
+                for _ in range(options["boots"])
+            ]
+            imports = _imports(_run(profile, ["-c", BOOT], importtime=True).stderr)
+            req = json.loads(
+                _run(
+                    profile,
+                    ["-c", REQUESTS, options["path"], str(options["requests"])],
+                ).stdout
+            )
+            seconds = statistics.median(boot["seconds"] for boot in boots)
+            rows.append((profile, seconds, boots[0]["modules"], imports, req))
+
+        self.stdout.write(
+            f"{'profile':<24}{'boot ms':>10}{'modules':>9}{'admin':>7}"
+            f"{'us/req':>10}  status"
+        )
+        for profile, boot, modules, _, req in rows:
+            # DRF's schema module imports django.contrib.admin code either way;
+            # what the API profile skips is admin setup and our registrations
+            admin = "portal.admin" in modules
+            self.stdout.write(
+                f"{profile:<24}{boot * 1000:>10.1f}{len(modules):>9}"
+                f"{'yes' if admin else 'no':>7}"
+                f"{req['us']:>10.1f}  {req['status']}"
+            )
+
+        for profile, _, _, imports, _ in rows:
+            self.stdout.write(f"\nslowest imports under {profile} (cumulative ms):")
+            top = sorted(imports.items(), key=lambda item: -item[1])
+            for name, us in top[: options["top"]]:
+                self.stdout.write(f"  {us / 1000:>8.1f}  {name}")
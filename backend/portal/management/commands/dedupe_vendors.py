@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from portal import dedupe
+from portal.models import Vendor
+
+
+class Command(BaseCommand):
+    help = "Find probable duplicate vendors per agent/brokerage and merge them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agent", type=int, help="Only this agent's own vendors.")
+        parser.add_argument(
+            "--brokerage", type=int, help="Only this brokerage's shared library."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report the groups, merge nothing."
+        )
+
+    def handle(self, *args, **options):
+        qs = Vendor.objects.all()
+        if options["agent"]:
+            qs = qs.filter(agent_id=options["agent"])
+        if options["brokerage"]:
+            qs = qs.filter(brokerage_id=options["brokerage"])
+
+        groups = dedupe.find_duplicates(qs)
+        for canonical, *duplicates in groups:
+            owner = (
+                f"agent {canonical.agent_id}"
+                if canonical.agent_id
+                else f"brokerage {canonical.brokerage_id}"
+            )
+            self.stdout.write(f"[{owner}] keep #{canonical.id} {canonical.name}")
+            for dup in duplicates:
+                self.stdout.write(f"    merge #{dup.id} {dup.name}")
+
+        if options["dry_run"] or not groups:
+            self.stdout.write(f"{len(groups)} duplicate group(s) found.")
+            return
+
+        stats = dedupe.merge(groups)
+        for key, value in sorted(stats.items()):
+            self.stdout.write(f"{key:<20}{value}")
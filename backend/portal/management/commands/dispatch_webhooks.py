@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portal import delta, webhooks
+
+
+class Command(BaseCommand):
+    help = "Fan outbox events out to agents' webhook endpoints and send them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep running, polling the outbox."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2.0, help="Seconds between passes."
+        )
+        parser.add_argument(
+            "--prune-days",
+            type=int,
+            help=(
+                "Delete dispatched events and finished deliveries older than "
+                "this, and tombstones older than PORTAL_DELTA_MAX_CURSOR_DAYS."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["prune_days"] is not None:
+            events, deliveries = webhooks.prune(options["prune_days"])
+            tombstones = delta.prune()
+            self.stdout.write(
+                f"pruned {events} events, {deliveries} deliveries, "
+                f"{tombstones} tombstones"
+            )
+
+        while True:
+            stats = webhooks.dispatch()
+            if sum(stats.values()):
+                self.stdout.write(
+                    " ".join(f"{k}={v}" for k, v in sorted(stats.items()))
+                )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
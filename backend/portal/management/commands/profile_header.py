@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from portal.profiling import HEADER, make_header_value
+
+
+class Command(BaseCommand):
+    help = "Print a signed header that makes a single request run under the profiler."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--by", default="", help="Who the header is issued to.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{HEADER}: {make_header_value(options['by'])}")
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from portal import publish
+from portal.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Re-render every buyer portal snapshot using a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--transaction",
+            type=int,
+            action="append",
+            dest="transactions",
+            help="Only these transaction ids (repeatable).",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--chunk-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        ids = options["transactions"] or list(
+            Transaction.objects.order_by("id").values_list("id", flat=True)
+        )
+        size = options["chunk_size"]
+        chunks = [ids[i : i + size] for i in range(0, len(ids), size)]
+
+        start = perf_counter()
+        totals = [0, 0, 0]
+        if options["workers"] <= 1 or len(chunks) <= 1:
+            for result in map(publish.publish_chunk, chunks):
+                totals = [a + b for a, b in zip(totals, result)]
+        else:
+            connections.close_all()  # children must not share the parent's
+            with ProcessPoolExecutor(
+                max_workers=options["workers"], initializer=publish.init_worker
+            ) as pool:
+                for result in pool.map(publish.publish_chunk, chunks):
+                    totals = [a + b for a, b in zip(totals, result)]
+
+        published, unchanged, missing = totals
+        self.stdout.write(
+            f"{len(ids)} transactions in {perf_counter() - start:.2f}s: "
+            f"{published} published, {unchanged} unchanged, {missing} missing"
+        )
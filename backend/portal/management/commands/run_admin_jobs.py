@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portal import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Run pending bulk admin jobs (those not picked up by the web process) "
+        "and resume running ones whose runner died."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new jobs."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=10.0, help="Seconds between polls."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            runnable = bulk.runnable().order_by("created_at")
+            for job_id in runnable.values_list("id", flat=True):
+                job = bulk.run_job(job_id)
+                if job is not None:
+                    self.stdout.write(
+                        f"job #{job.id} {job.operation}: {job.status}, "
+                        f"{job.changed} changed of {job.processed}"
+                    )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
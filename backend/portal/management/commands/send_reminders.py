@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from portal import reminders
+
+
+class Command(BaseCommand):
+    help = "Queue today's due-date reminder digests and email the unsent ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=date.fromisoformat, help="Schedule as of YYYY-MM-DD."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count digests, queue nothing."
+        )
+        parser.add_argument(
+            "--no-send", action="store_true", help="Queue digests but don't email."
+        )
+
+    def handle(self, *args, **options):
+        stats = reminders.schedule(today=options["date"], dry_run=options["dry_run"])
+        if not (options["dry_run"] or options["no_send"]):
+            stats.update(reminders.send_pending())
+        for key, value in sorted(stats.items()):
+            self.stdout.write(f"{key:<12}{value}")
@@ -0,0 +1,128 @@
+import asyncio
+import resource
+import statistics
+import urllib.parse
+import urllib.request
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold many SSE streams open against a running (ASGI) server, toggle a "
+        "task and measure how long the change takes to reach every stream."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--token", required=True, help="Buyer portal token.")
+        parser.add_argument("--transaction", type=int, required=True)
+        parser.add_argument("--task", type=int, required=True)
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument("--connect-concurrency", type=int, default=200)
+        parser.add_argument("--timeout", type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if options["connections"] + 50 > soft:
+            wanted = min(hard, options["connections"] + 50)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+            if wanted < options["connections"] + 50:
+                raise CommandError(f"open-file limit {hard} is too low")
+        asyncio.run(self._run(options))
+
+    async def _open(self, host, port, request, sem, connect_ms):
+        async with sem:
+            start = perf_counter()
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("stream closed before ready")
+                if line.startswith(b"event: ready"):
+                    break
+            connect_ms.append((perf_counter() - start) * 1000)
+        return reader, writer
+
+    async def _listen(self, reader, arrivals):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"event: change"):
+                arrivals.append(perf_counter())
+
+    async def _run(self, options):
+        url = urllib.parse.urlsplit(options["base_url"])
+        host, port = url.hostname, url.port or 80
+        path = (
+            f"/api/portal/transaction/{options['transaction']}/events/"
+            f"?t={urllib.parse.quote(options['token'])}"
+        )
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+            "Accept: text/event-stream\r\n\r\n"
+        ).encode()
+        n = options["connections"]
+
+        sem = asyncio.Semaphore(options["connect_concurrency"])
+        connect_ms, arrivals = [], []
+        started = perf_counter()
+        results = await asyncio.gather(
+            *[self._open(host, port, request, sem, connect_ms) for _ in range(n)],
+            return_exceptions=True,
+        )
+        streams = [r for r in results if not isinstance(r, BaseException)]
+        failed = n - len(streams)
+        self.stdout.write(
+            f"connected {len(streams)}/{n} in {perf_counter() - started:.2f}s "
+            f"(failed {failed}); connect p50 {_percentile(connect_ms, 50):.1f} ms, "
+            f"p99 {_percentile(connect_ms, 99):.1f} ms"
+            if streams
+            else f"no streams connected ({failed} failed)"
+        )
+        if not streams:
+            return
+
+        listeners = [
+            asyncio.create_task(self._listen(reader, arrivals)) for reader, _ in streams
+        ]
+        toggle = f"{options['base_url']}/api/portal/tasks/{options['task']}/toggle/"
+
+        for round_no in range(1, options["rounds"] + 1):
+            arrivals.clear()
+            sent = perf_counter()
+            await asyncio.to_thread(
+                urllib.request.urlopen,
+                urllib.request.Request(toggle, data=b"", method="POST"),
+            )
+            deadline = sent + options["timeout"]
+            while len(arrivals) < len(streams) and perf_counter() < deadline:
+                await asyncio.sleep(0.005)
+            latencies = [(t - sent) * 1000 for t in arrivals]
+            if not latencies:
+                self.stdout.write(f"round {round_no}: no stream received the change")
+                continue
+            self.stdout.write(
+                f"round {round_no}: {len(latencies)}/{len(streams)} received; "
+                f"p50 {_percentile(latencies, 50):.1f} ms, "
+                f"p95 {_percentile(latencies, 95):.1f} ms, "
+                f"p99 {_percentile(latencies, 99):.1f} ms, "
+                f"max {max(latencies):.1f} ms, "
+                f"mean {statistics.fmean(latencies):.1f} ms"
+            )
+            await asyncio.sleep(0.2)
+
+        for task in listeners:
+            task.cancel()
+        for _, writer in streams:
+            writer.close()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import audit, lofty
+
+
+class Command(BaseCommand):
+    help = "Pull transactions changed in Lofty since the last run and upsert them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Fetch and diff, but write nothing (cursor included).",
+        )
+        parser.add_argument(
+            "--full", action="store_true", help="Ignore the cursor and re-read all."
+        )
+        parser.add_argument("--base-url", help="Override PORTAL_LOFTY_API_URL.")
+        parser.add_argument("--page-size", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            with audit.acting_as("lofty"):
+                stats = lofty.sync(
+                    client=lofty.LoftyClient(base_url=options["base_url"]),
+                    dry_run=options["dry_run"],
+                    full=options["full"],
+                    page_size=options["page_size"],
+                )
+        except lofty.LoftyError as exc:
+            raise CommandError(str(exc)) from exc
+
+        for key, value in stats.items():
+            self.stdout.write(f"{key:<16}{value}")
@@ -0,0 +1,340 @@
+"""
+Per-view request metrics, exposed in Prometheus text format at /metrics.
+
+Each thread records into its own shard, so the hot path never takes a lock.
+When a thread exits its shard is folded into a shared base, so the shard
+count tracks live threads. Workers periodically dump their merged totals to
+PORTAL_METRICS_DIR and the /metrics view sums every worker's file, so one
+scrape covers all processes.
+Files left by workers that have exited are removed.
+"""
+
+import itertools
+import json
+import os
+import threading
+import weakref
+from bisect import bisect_left
+from time import monotonic, perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .sqltrace import IGNORED_FILES, observing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+UNRESOLVED = "<unresolved>"
+
+# Anything else is counted under OTHER, so the label set stays bounded
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+IGNORED_FILES.add(__file__)
+
+# Indexes into the per-(view, method) stats list.
+_COUNT = 0
+_LATENCY_SUM = 1
+_DB_QUERIES = 2
+_DB_TIME = 3
+_RESPONSE_BYTES = 4
+_STATUS = 5  # 5 slots, one per status class
+_BUCKETS = _STATUS + len(STATUS_CLASSES)  # len(LATENCY_BUCKETS) + 1 slots (+Inf)
+_WIDTH = _BUCKETS + len(LATENCY_BUCKETS) + 1
+
+# shard id -> {(view, method): [counters...]} for live threads
+_shards = {}
+# Totals of threads that have exited
+_retired = {}
+_retired_lock = threading.RLock()
+_shard_ids = itertools.count()
+_local = threading.local()
+_next_flush = 0.0
+
+
+class _Owner:
+    """
+    Lives only in a thread's locals, so it is freed when the thread exits.
+    """
+
+
+def _shard():
+    try:
+        return _local.shard
+    except AttributeError:
+        shard_id = next(_shard_ids)
+        _local.shard = _shards[shard_id] = {}
+        _local.owner = _Owner()
+        weakref.finalize(_local.owner, _retire, shard_id)
+        return _local.shard
+
+
+def _merge(into, key, stats):
+    total = into.get(key)
+    if total is None or len(total) != len(stats):
+        into[key] = list(stats)
+    else:
+        for i, value in enumerate(stats):
+            total[i] += value
+
+
+def _retire(shard_id):
+    with _retired_lock:
+        shard = _shards.pop(shard_id, None)
+        for key, stats in (shard or {}).items():
+            _merge(_retired, key, stats)
+
+
+class _QueryTimer:
+    __slots__ = ("count", "elapsed")
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += perf_counter() - start
+            self.count += 1
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED
+    func = match.func
+    return getattr(func, "view_class", func).__name__
+
+
+def record(view, method, status_code, latency, db_queries, db_time, size):
+    shard = _shard()
+    key = (view, method)
+    stats = shard.get(key)
+    if stats is None:
+        stats = shard[key] = [0] * _WIDTH
+    stats[_COUNT] += 1
+    stats[_LATENCY_SUM] += latency
+    stats[_DB_QUERIES] += db_queries
+    stats[_DB_TIME] += db_time
+    stats[_RESPONSE_BYTES] += size
+    stats[_STATUS + min(max(status_code // 100, 1), 5) - 1] += 1
+    stats[_BUCKETS + bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Should sit first in MIDDLEWARE so latency covers the whole stack. For
+    streaming responses latency ends when the response starts.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        start = perf_counter()
+        with observing(timer):
+            response = self.get_response(request)
+        self._record(request, response, perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        start = perf_counter()
+        with observing(timer):
+            response = await self.get_response(request)
+        self._record(request, response, perf_counter() - start, timer)
+        return response
+
+    def _record(self, request, response, latency, timer):
+        if response.streaming:
+            size = int(response.get("Content-Length") or 0)
+        else:
+            size = len(response.content)
+
+        record(
+            view_label(request),
+            request.method if request.method in METHODS else "OTHER",
+            response.status_code,
+            latency,
+            timer.count,
+            timer.elapsed,
+            size,
+        )
+        _maybe_flush()
+
+
+# -----------------------------
+# Aggregation across threads / workers
+# -----------------------------
+
+
+def snapshot():
+    """
+    Merge every thread's shard into {"view|method": [counters...]}.
+    """
+    merged = {}
+    with _retired_lock:
+        shards = [_retired] + list(_shards.values())
+        for shard in shards:
+            for (view, method), stats in list(shard.items()):
+                _merge(merged, f"{view}|{method}", stats)
+    return merged
+
+
+def _metrics_dir():
+    return getattr(settings, "PORTAL_METRICS_DIR", None)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by another user
+        pass
+    return True
+
+
+def flush():
+    directory = _metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"worker-{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(snapshot(), fh)
+    os.replace(tmp, path)
+
+
+def _maybe_flush():
+    global _next_flush
+    now = monotonic()
+    if now < _next_flush:
+        return
+    _next_flush = now + getattr(settings, "PORTAL_METRICS_FLUSH_SECONDS", 5)
+    flush()
+
+
+def collect():
+    """
+    Totals across all workers that have flushed, plus this process's live view.
+    """
+    directory = _metrics_dir()
+    if not directory or not os.path.isdir(directory):
+        return snapshot()
+
+    flush()
+    merged = {}
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        pid = name[len("worker-") : -len(".json")]
+        if pid.isdigit() and not _alive(int(pid)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as fh:
+                worker = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        for key, stats in worker.items():
+            _merge(merged, key, stats)
+    return merged
+
+
+# -----------------------------
+# Prometheus text exposition
+# -----------------------------
+
+
+def render(merged):
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    rows = []
+    for key, stats in sorted(merged.items()):
+        view, method = key.split("|", 1)
+        rows.append((f'view="{view}",method="{method}"', stats))
+
+    family("portal_http_requests_total", "counter", "Requests by view and status.")
+    for labels, stats in rows:
+        for i, cls in enumerate(STATUS_CLASSES):
+            if stats[_STATUS + i]:
+                lines.append(
+                    f'portal_http_requests_total{{{labels},status="{cls}"}} '
+                    f"{stats[_STATUS + i]}"
+                )
+
+    family(
+        "portal_http_request_duration_seconds",
+        "histogram",
+        "Wall time spent handling the request.",
+    )
+    for labels, stats in rows:
+        cumulative = 0
+        for i, bound in enumerate(LATENCY_BUCKETS + (None,)):
+            cumulative += stats[_BUCKETS + i]
+            le = "+Inf" if bound is None else repr(bound)
+            lines.append(
+                f'portal_http_request_duration_seconds_bucket{{{labels},le="{le}"}} '
+                f"{cumulative}"
+            )
+        lines.append(
+            f"portal_http_request_duration_seconds_sum{{{labels}}} "
+            f"{stats[_LATENCY_SUM]:.6f}"
+        )
+        lines.append(
+            f"portal_http_request_duration_seconds_count{{{labels}}} {stats[_COUNT]}"
+        )
+
+    family("portal_db_queries_total", "counter", "SQL statements executed.")
+    for labels, stats in rows:
+        lines.append(f"portal_db_queries_total{{{labels}}} {stats[_DB_QUERIES]}")
+
+    family("portal_db_seconds_total", "counter", "Time spent inside SQL statements.")
+    for labels, stats in rows:
+        lines.append(f"portal_db_seconds_total{{{labels}}} {stats[_DB_TIME]:.6f}")
+
+    family("portal_http_response_bytes_total", "counter", "Response body bytes.")
+    for labels, stats in rows:
+        lines.append(
+            f"portal_http_response_bytes_total{{{labels}}} {stats[_RESPONSE_BYTES]}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Optional bearer token via PORTAL_METRICS_TOKEN keeps scrapes private.
+    """
+    expected = getattr(settings, "PORTAL_METRICS_TOKEN", "")
+    if expected:
+        auth = request.headers.get("Authorization", "")
+        if auth != f"Bearer {expected}":
+            return HttpResponseForbidden("forbidden\n")
+
+    return HttpResponse(
+        render(collect()), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0019_webhooks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=40)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("transaction_id", models.PositiveBigIntegerField()),
+                ("deleted_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="transactionvendor",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="utility",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["transaction", "updated_at"],
+                name="portal_docu_transac_a955b5_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["transaction", "updated_at"],
+                name="portal_task_transac_7577da_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionvendor",
+            index=models.Index(
+                fields=["transaction", "updated_at"],
+                name="portal_tran_transac_e596b2_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="utility",
+            index=models.Index(
+                fields=["transaction", "updated_at"],
+                name="portal_util_transac_d74abc_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["transaction_id", "deleted_at"],
+                name="portal_tomb_transac_7fc4a1_idx",
+            ),
+        ),
+    ]
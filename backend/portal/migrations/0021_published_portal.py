@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0020_delta_sync"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublishedPortal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("filename", models.CharField(max_length=100)),
+                (
+                    "previous_filename",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                ("size", models.PositiveIntegerField(default=0)),
+                (
+                    "published_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="published",
+                        to="portal.transaction",
+                    ),
+                ),
+            ],
+        ),
+    ]
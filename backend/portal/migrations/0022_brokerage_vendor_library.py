@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0021_published_portal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Brokerage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=160)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="overrides",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="overridden_by",
+                to="portal.vendor",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="vendor",
+            name="agent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="vendors",
+                to="portal.agent",
+            ),
+        ),
+        migrations.AddField(
+            model_name="agent",
+            name="brokerage",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="agents",
+                to="portal.brokerage",
+            ),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="brokerage",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="vendors",
+                to="portal.brokerage",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendor",
+            index=models.Index(
+                fields=["agent", "category", "name"],
+                name="portal_vend_agent_i_e58c40_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendor",
+            index=models.Index(
+                fields=["brokerage", "category", "name"],
+                name="portal_vend_brokera_1dc9a9_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="vendor",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(("agent__isnull", False), ("brokerage__isnull", True)),
+                    models.Q(("agent__isnull", True), ("brokerage__isnull", False)),
+                    _connector="OR",
+                ),
+                name="vendor_single_owner",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="vendor",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("overrides__isnull", False)),
+                fields=("agent", "overrides"),
+                name="vendor_one_override_per_agent",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0023_audit_log"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EngagementEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("agent_id", models.PositiveBigIntegerField()),
+                ("transaction_id", models.PositiveBigIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("portal_open", "Portal opened"),
+                            ("document_open", "Document opened"),
+                            ("vendor_click", "Vendor clicked"),
+                            ("utility_click", "Utility clicked"),
+                            ("link_click", "Link clicked"),
+                            ("task_completed", "Task completed"),
+                            ("task_reopened", "Task reopened"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("target", models.CharField(blank=True, default="", max_length=40)),
+                (
+                    "occurred_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["agent_id", "occurred_at"],
+                        name="portal_enga_agent_i_bc7e79_idx",
+                    ),
+                    models.Index(
+                        fields=["transaction_id", "occurred_at"],
+                        name="portal_enga_transac_55b315_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0024_engagement_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("portal_opens", models.PositiveIntegerField(default=0)),
+                ("document_opens", models.PositiveIntegerField(default=0)),
+                ("vendor_clicks", models.PositiveIntegerField(default=0)),
+                ("utility_clicks", models.PositiveIntegerField(default=0)),
+                ("link_clicks", models.PositiveIntegerField(default=0)),
+                ("tasks_completed", models.PositiveIntegerField(default=0)),
+                ("tasks_reopened", models.PositiveIntegerField(default=0)),
+                ("agent_id", models.PositiveBigIntegerField()),
+                ("day", models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TransactionDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("portal_opens", models.PositiveIntegerField(default=0)),
+                ("document_opens", models.PositiveIntegerField(default=0)),
+                ("vendor_clicks", models.PositiveIntegerField(default=0)),
+                ("utility_clicks", models.PositiveIntegerField(default=0)),
+                ("link_clicks", models.PositiveIntegerField(default=0)),
+                ("tasks_completed", models.PositiveIntegerField(default=0)),
+                ("tasks_reopened", models.PositiveIntegerField(default=0)),
+                ("transaction_id", models.PositiveBigIntegerField()),
+                ("agent_id", models.PositiveBigIntegerField()),
+                ("day", models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TransactionStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("transaction_id", models.PositiveBigIntegerField(unique=True)),
+                ("agent_id", models.PositiveBigIntegerField(db_index=True)),
+                ("tasks_total", models.PositiveIntegerField(default=0)),
+                ("tasks_completed", models.PositiveIntegerField(default=0)),
+                ("portal_opens", models.PositiveIntegerField(default=0)),
+                ("document_opens", models.PositiveIntegerField(default=0)),
+                ("clicks", models.PositiveIntegerField(default=0)),
+                ("days_to_close", models.IntegerField(blank=True, null=True)),
+                (
+                    "refreshed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="closing_date",
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="engagementevent",
+            index=models.Index(
+                fields=["occurred_at"], name="portal_enga_occurre_b30670_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["updated_at"], name="portal_task_updated_8fb8d4_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="agentdailystats",
+            constraint=models.UniqueConstraint(
+                fields=("agent_id", "day"), name="agent_daily_stats_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactiondailystats",
+            index=models.Index(fields=["day"], name="portal_tran_day_3710dd_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="transactiondailystats",
+            constraint=models.UniqueConstraint(
+                fields=("transaction_id", "day"), name="txn_daily_stats_unique"
+            ),
+        ),
+    ]
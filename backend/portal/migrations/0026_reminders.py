@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0025_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReminderDigest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "recipient",
+                    models.CharField(
+                        choices=[("buyer", "Buyer"), ("agent", "Agent")], max_length=10
+                    ),
+                ),
+                ("recipient_id", models.PositiveBigIntegerField()),
+                ("email", models.EmailField(max_length=254)),
+                ("day", models.DateField()),
+                (
+                    "items",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                ("item_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "last_error",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("completed", False)),
+                fields=["due_date"],
+                name="task_open_due_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="utility",
+            index=models.Index(
+                fields=["due_date"], name="portal_util_due_dat_984b26_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reminderdigest",
+            index=models.Index(
+                condition=models.Q(("sent_at__isnull", True)),
+                fields=["created_at"],
+                name="reminder_digest_unsent_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reminderdigest",
+            constraint=models.UniqueConstraint(
+                fields=("recipient", "recipient_id", "day"),
+                name="reminder_digest_once_per_day",
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:55
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0026_reminders"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="document",
+            name="doc_type",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=80
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="status",
+            field=models.CharField(db_index=True, default="Active", max_length=60),
+        ),
+        migrations.AddIndex(
+            model_name="agent",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="agent_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="agent",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="agent_email_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="buyer",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="buyer_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="buyer",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="buyer_email_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                django.db.models.functions.text.Lower("title"),
+                name="document_title_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                django.db.models.functions.text.Lower("title"),
+                name="task_title_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                django.db.models.functions.text.Lower("address"),
+                name="txn_address_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="utility",
+            index=models.Index(
+                django.db.models.functions.text.Lower("provider_name"),
+                name="utility_provider_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendor",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="vendor_name_lower_idx",
+            ),
+        ),
+    ]
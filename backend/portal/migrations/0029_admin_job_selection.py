@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:35
+
+from django.db import migrations, models
+
+
+def fail_unfinished(apps, schema_editor):
+    # Their pickled selections can't be carried over; resubmit them
+    apps.get_model("portal", "AdminJob").objects.filter(
+        status__in=["pending", "running"]
+    ).update(status="failed", error="Selection format changed; resubmit the action.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0028_admin_jobs"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_unfinished, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="adminjob",
+            name="query",
+        ),
+        migrations.AddField(
+            model_name="adminjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adminjob",
+            name="selection",
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -1,15 +1,44 @@
 import secrets
+import uuid
 from datetime import timedelta
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 
+class Brokerage(models.Model):
+    """
+    Groups agents so they can share one vendor library (see portal/vendors.py).
+    """
+
+    name = models.CharField(max_length=160)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Agent(models.Model):
     name = models.CharField(max_length=120)
     email = models.EmailField(unique=True)
     photo_url = models.URLField(blank=True, default="")
     brokerage_logo_url = models.URLField(blank=True, default="")
+    brokerage = models.ForeignKey(
+        Brokerage,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="agents",
+    )
+
+    class Meta:
+        # Admin prefix search (portal/changelists.py)
+        indexes = [
+            models.Index(Lower("name"), name="agent_name_lower_idx"),
+            models.Index(Lower("email"), name="agent_email_lower_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} <{self.email}>"
@@ -19,6 +48,12 @@ class Buyer(models.Model):
     name = models.CharField(max_length=120)
     email = models.EmailField()
 
+    class Meta:
+        indexes = [
+            models.Index(Lower("name"), name="buyer_name_lower_idx"),
+            models.Index(Lower("email"), name="buyer_email_lower_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} <{self.email}>"
 
@@ -32,17 +67,23 @@ class Transaction(models.Model):
     )
 
     address = models.CharField(max_length=200)
-    status = models.CharField(max_length=60, default="Active")
-    closing_date = models.DateField(null=True, blank=True)
+    status = models.CharField(max_length=60, default="Active", db_index=True)
+    closing_date = models.DateField(null=True, blank=True, db_index=True)
     hero_image_url = models.URLField(blank=True, default="")
     homestead_exemption_url = models.URLField(blank=True, default="")
     review_url = models.URLField(blank=True, default="")
     my_documents_url = models.URLField(blank=True, default="")
 
-    # Optional: future Lofty mapping
-    lofty_transaction_id = models.CharField(max_length=64, blank=True, default="")
+    # Lofty mapping; the sync engine (portal/lofty.py) matches on this
+    lofty_transaction_id = models.CharField(
+        max_length=64, blank=True, default="", db_index=True
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(Lower("address"), name="txn_address_lower_idx")]
 
     def __str__(self):
         return f"Txn #{self.id}: {self.address}"
@@ -115,6 +156,14 @@ class Utility(models.Model):
     due_date = models.DateField(null=True, blank=True)  # optional “set up by” date
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["transaction", "updated_at"]),
+            models.Index(fields=["due_date"]),
+            models.Index(Lower("provider_name"), name="utility_provider_lower_idx"),
+        ]
 
     def __str__(self):
         return f"{self.get_category_display()}: {self.provider_name}"
@@ -127,12 +176,28 @@ class Document(models.Model):
 
     title = models.CharField(max_length=200, default="My Documents")
     url = models.URLField(blank=True, default="")  # ✅ URL instead of FileField
+    # Set for uploaded files; identical files share one StoredObject.
+    stored_object = models.ForeignKey(
+        "StoredObject",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="documents",
+    )
+    filename = models.CharField(max_length=255, blank=True, default="")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     # Optional metadata
-    doc_type = models.CharField(max_length=80, blank=True, default="")
+    doc_type = models.CharField(max_length=80, blank=True, default="", db_index=True)
     visible_to_buyer = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["transaction", "updated_at"]),
+            models.Index(Lower("title"), name="document_title_lower_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -149,9 +214,22 @@ class Task(models.Model):
     order = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["completed", "order", "due_date"]
+        indexes = [
+            models.Index(fields=["transaction", "updated_at"]),
+            # Rollups find tasks changed since their watermark
+            models.Index(fields=["updated_at"]),
+            models.Index(Lower("title"), name="task_title_lower_idx"),
+            # Reminders range-scan open tasks by due date
+            models.Index(
+                fields=["due_date"],
+                condition=models.Q(completed=False),
+                name="task_open_due_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -170,7 +248,26 @@ class Vendor(models.Model):
         UTILITY = "utility", "Utility"
         OTHER = "other", "Other"
 
-    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, related_name="vendors")
+    # Owned by exactly one of: an agent (private, or an override of a shared
+    # entry) or a brokerage (shared library).
+    agent = models.ForeignKey(
+        Agent, null=True, blank=True, on_delete=models.CASCADE, related_name="vendors"
+    )
+    brokerage = models.ForeignKey(
+        Brokerage,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="vendors",
+    )
+    # Agent-owned copy of a shared entry; hides that entry for the agent
+    overrides = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="overridden_by",
+    )
 
     category = models.CharField(
         max_length=40, choices=Category.choices, default=Category.OTHER
@@ -186,9 +283,32 @@ class Vendor(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["agent", "category", "name"]),
+            models.Index(fields=["brokerage", "category", "name"]),
+            models.Index(Lower("name"), name="vendor_name_lower_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(agent__isnull=False, brokerage__isnull=True)
+                | models.Q(agent__isnull=True, brokerage__isnull=False),
+                name="vendor_single_owner",
+            ),
+            models.UniqueConstraint(
+                fields=["agent", "overrides"],
+                condition=models.Q(overrides__isnull=False),
+                name="vendor_one_override_per_agent",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.get_category_display()})"
 
+    @property
+    def is_shared(self):
+        return self.brokerage_id is not None
+
 
 class TransactionVendor(models.Model):
     class Role(models.TextChoices):
@@ -212,10 +332,12 @@ class TransactionVendor(models.Model):
     notes_override = models.TextField(blank=True, default="")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["sort_order", "id"]
         unique_together = [("transaction", "vendor", "role")]
+        indexes = [models.Index(fields=["transaction", "updated_at"])]
 
     def __str__(self):
         return f"{self.transaction_id}: {self.vendor.name} ({self.get_role_display()})"
@@ -237,3 +359,476 @@ class AgentFAQ(models.Model):
 
     def __str__(self):
         return self.question
+
+
+class ProfilerArm(models.Model):
+    """
+    Admin toggle: profile the next `remaining` requests whose path starts with
+    `path_prefix` (see portal/profiling.py).
+    """
+
+    path_prefix = models.CharField(max_length=200, default="/api/portal/")
+    remaining = models.PositiveIntegerField(default=1)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.path_prefix} x{self.remaining}"
+
+
+class ProfileCapture(models.Model):
+    view = models.CharField(max_length=120)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=300)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    pstats_path = models.CharField(max_length=300)
+    summary_path = models.CharField(max_length=300)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class ImageAsset(models.Model):
+    """
+    An external image URL (hero photo, agent photo, brokerage logo) that has
+    been fetched once and resized into content-addressed variants on disk.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
+    source_url = models.URLField(max_length=500, unique=True)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    lqip = models.TextField(blank=True, default="")  # tiny data: URI placeholder
+    error = models.CharField(max_length=200, blank=True, default="")
+
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.source_url
+
+
+class StoredObject(models.Model):
+    """
+    A file stored once by content hash; `path` is its storage key
+    ("objects/ab/cd/<sha256>", see portal/storage.py).
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=120, blank=True, default="")
+    path = models.CharField(max_length=300)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked upload in progress (see portal/uploads.py).
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    agent = models.ForeignKey(
+        Agent, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=120, blank=True, default="")
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+
+    # Direct-to-storage uploads declare their checksum up front
+    direct = models.BooleanField(default=False)
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+
+    # Applied to the Document created on completion
+    title = models.CharField(max_length=200, blank=True, default="")
+    doc_type = models.CharField(max_length=80, blank=True, default="")
+    visible_to_buyer = models.BooleanField(default=True)
+
+    document = models.ForeignKey(
+        Document, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size})"
+
+
+class SyncCursor(models.Model):
+    """
+    Persisted checkpoint for an incremental sync (see portal/lofty.py).
+    """
+
+    name = models.CharField(max_length=60, unique=True)
+    cursor = models.CharField(max_length=64, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.cursor or '-'}"
+
+
+def _webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    An agent's CRM webhook; receives batched, HMAC-signed transaction events
+    (see portal/webhooks.py).
+    """
+
+    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, related_name="webhooks")
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=_webhook_secret)
+    # Event types to deliver; empty means all
+    event_types = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def wants(self, event_type):
+        return not self.event_types or event_type in self.event_types
+
+    def __str__(self):
+        return f"{self.agent_id} -> {self.url}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event written in the same DB transaction as the change it
+    describes (see portal/events.py).
+    """
+
+    agent = models.ForeignKey(
+        Agent, on_delete=models.CASCADE, related_name="outbox_events"
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    event_type = models.CharField(max_length=60)
+    # Events sharing a key within one dispatch batch collapse to the latest
+    coalesce_key = models.CharField(max_length=120, blank=True, default="")
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["dispatched_at", "created_at"])]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+
+class WebhookDelivery(models.Model):
+    """
+    One signed POST of a batch of events to one endpoint, retried with
+    backoff until it succeeds or runs out of attempts.
+    """
+
+    endpoint = models.ForeignKey(
+        WebhookEndpoint, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    body = models.TextField()
+    event_count = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_error = models.CharField(max_length=200, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["delivered_at", "failed_at", "next_attempt_at"])
+        ]
+
+    def __str__(self):
+        return f"delivery #{self.id} -> {self.endpoint.url}"
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted transaction child, so delta sync (portal/delta.py)
+    can report deletes. Plain ids, not FKs: the transaction may be going
+    away in the same delete.
+    """
+
+    model = models.CharField(max_length=40)
+    object_id = models.PositiveBigIntegerField()
+    transaction_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["transaction_id", "deleted_at"])]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} (txn {self.transaction_id})"
+
+
+class PublishedPortal(models.Model):
+    """
+    The current static snapshot of a transaction's buyer payload (see
+    portal/publish.py). `filename` is content-hash named under
+    PORTAL_PUBLISH_DIR; `previous_filename` is kept for in-flight readers.
+    """
+
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.CASCADE, related_name="published"
+    )
+    filename = models.CharField(max_length=100)
+    previous_filename = models.CharField(max_length=100, blank=True, default="")
+    size = models.PositiveIntegerField(default=0)
+    published_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"txn {self.transaction_id}: {self.filename}"
+
+
+class AuditEntry(models.Model):
+    """
+    One field-level change to a transaction or one of its children (see
+    portal/audit.py). Append-only: rows are never updated or deleted, and
+    ids are plain integers so history outlives the rows it describes.
+    """
+
+    class Action(models.TextChoices):
+        CREATE = "create", "Create"
+        UPDATE = "update", "Update"
+        DELETE = "delete", "Delete"
+
+    transaction_id = models.PositiveBigIntegerField(null=True)
+    model = models.CharField(max_length=40)
+    object_id = models.PositiveBigIntegerField(null=True)
+    action = models.CharField(max_length=10, choices=Action.choices)
+    # {field: [before, after]}
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    actor = models.CharField(max_length=120, default="system")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["transaction_id", "id"])]
+
+    def __str__(self):
+        return f"{self.action} {self.model} #{self.object_id} by {self.actor}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("audit entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("audit entries are append-only")
+
+
+class EngagementEvent(models.Model):
+    """
+    One buyer interaction (see portal/engagement.py). Plain ids, not FKs:
+    rows are bulk-inserted off the request path and kept for analytics
+    after the transaction is gone.
+    """
+
+    class Kind(models.TextChoices):
+        PORTAL_OPEN = "portal_open", "Portal opened"
+        DOCUMENT_OPEN = "document_open", "Document opened"
+        VENDOR_CLICK = "vendor_click", "Vendor clicked"
+        UTILITY_CLICK = "utility_click", "Utility clicked"
+        LINK_CLICK = "link_click", "Link clicked"
+        TASK_COMPLETED = "task_completed", "Task completed"
+        TASK_REOPENED = "task_reopened", "Task reopened"
+
+    agent_id = models.PositiveBigIntegerField()
+    transaction_id = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    # e.g. which helpful link ("review", "my_documents")
+    target = models.CharField(max_length=40, blank=True, default="")
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["agent_id", "occurred_at"]),
+            models.Index(fields=["transaction_id", "occurred_at"]),
+            models.Index(fields=["occurred_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} (txn {self.transaction_id})"
+
+
+class DailyEngagementCounts(models.Model):
+    """
+    One column per EngagementEvent kind (see portal/rollups.py KIND_COLUMNS).
+    """
+
+    portal_opens = models.PositiveIntegerField(default=0)
+    document_opens = models.PositiveIntegerField(default=0)
+    vendor_clicks = models.PositiveIntegerField(default=0)
+    utility_clicks = models.PositiveIntegerField(default=0)
+    link_clicks = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    tasks_reopened = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class TransactionDailyStats(DailyEngagementCounts):
+    """
+    Engagement per transaction and day; rebuilt a day at a time from
+    EngagementEvent by portal/rollups.py.
+    """
+
+    transaction_id = models.PositiveBigIntegerField()
+    agent_id = models.PositiveBigIntegerField()
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["transaction_id", "day"], name="txn_daily_stats_unique"
+            )
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+
+class AgentDailyStats(DailyEngagementCounts):
+    """
+    TransactionDailyStats summed per agent and day.
+    """
+
+    agent_id = models.PositiveBigIntegerField()
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["agent_id", "day"], name="agent_daily_stats_unique"
+            )
+        ]
+
+
+class TransactionStats(models.Model):
+    """
+    Current per-transaction metrics (task completion, lifetime engagement,
+    days to close); refreshed by portal/rollups.py when the transaction,
+    its tasks or its engagement change.
+    """
+
+    transaction_id = models.PositiveBigIntegerField(unique=True)
+    agent_id = models.PositiveBigIntegerField(db_index=True)
+    tasks_total = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    portal_opens = models.PositiveIntegerField(default=0)
+    document_opens = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    # Set once the closing date has passed
+    days_to_close = models.IntegerField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"stats for txn {self.transaction_id}"
+
+
+class ReminderDigest(models.Model):
+    """
+    One day's due-date reminders for one buyer or agent (see
+    portal/reminders.py). The unique (recipient, recipient_id, day) key
+    makes scheduling idempotent; sent_at marks delivery.
+    """
+
+    class Recipient(models.TextChoices):
+        BUYER = "buyer", "Buyer"
+        AGENT = "agent", "Agent"
+
+    recipient = models.CharField(max_length=10, choices=Recipient.choices)
+    recipient_id = models.PositiveBigIntegerField()
+    email = models.EmailField()
+    day = models.DateField()
+    # {"overdue": [...], "upcoming": [...]}
+    items = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    item_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=200, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipient", "recipient_id", "day"],
+                name="reminder_digest_once_per_day",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(sent_at__isnull=True),
+                name="reminder_digest_unsent_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} {self.recipient_id} reminders for {self.day}"
+
+
+class AdminJob(models.Model):
+    """
+    A bulk admin action too large to run inside the request (see
+    portal/bulk.py). `selection` is the sorted list of selected primary
+    keys; `cursor` is the last one processed, so an interrupted job resumes
+    where it stopped. The runner bumps `heartbeat_at` with every chunk.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    operation = models.CharField(max_length=40)
+    selection = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    cursor = models.BigIntegerField(default=0)
+    requested_by = models.CharField(max_length=150, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Job #{self.id}: {self.operation} ({self.status})"
@@ -0,0 +1,243 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries a valid signed X-Portal-Profile header
+(mint one with `manage.py profile_header`) or matches an active ProfilerArm
+set up in the admin. The request runs under cProfile with every SQL statement
+recorded; a .pstats file and a JSON summary land in PORTAL_PROFILE_DIR and a
+ProfileCapture row is listed in the admin.
+
+Unprofiled requests pay one header lookup and a clock comparison; the arm
+table is only touched when a cached arm with captures left matches.
+
+Under ASGI the SQL of sync views is still recorded (see sqltrace.observing),
+but cProfile only sees the event loop thread, not the worker threads that
+sync views run in; those captures are marked "event_loop_only", and
+requests that overlap one being profiled pass through. Profile against a
+WSGI worker to see a sync view's own frames.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import secrets
+from time import monotonic, perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import view_label
+from .models import ProfileCapture, ProfilerArm
+from .sqltrace import IGNORED_FILES, QueryRecorder, observing
+
+HEADER = "X-Portal-Profile"
+SALT = "portal.profile"
+
+logger = logging.getLogger("portal.profiling")
+
+IGNORED_FILES.add(__file__)
+
+# [id, path_prefix, remaining] per active arm; remaining only counts this
+# process's claims, so the UPDATE in _claim_arm stays authoritative
+_arms = []
+_arms_checked_at = None
+# One cProfile per thread: overlapping requests on the event loop pass through
+_loop_busy = False
+_warned_async = False
+
+
+def make_header_value(issued_by=""):
+    return signing.dumps({"by": issued_by}, salt=SALT, compress=True)
+
+
+def _header_is_valid(value):
+    max_age = getattr(settings, "PORTAL_PROFILE_HEADER_MAX_AGE", 24 * 3600)
+    try:
+        signing.loads(value, salt=SALT, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _poll_due():
+    poll = getattr(settings, "PORTAL_PROFILE_POLL_SECONDS", 10)
+    return _arms_checked_at is None or monotonic() - _arms_checked_at >= poll
+
+
+def _active_arms():
+    """
+    Re-read ProfilerArm rows at most every PORTAL_PROFILE_POLL_SECONDS.
+    """
+    global _arms, _arms_checked_at
+    if _poll_due():
+        _arms_checked_at = monotonic()
+        _arms = [
+            list(arm)
+            for arm in ProfilerArm.objects.filter(
+                remaining__gt=0, expires_at__gt=timezone.now()
+            ).values_list("id", "path_prefix", "remaining")
+        ]
+    return _arms
+
+
+def _may_claim(path):
+    """
+    Whether _claim_arm(path) could succeed, without touching the database.
+    """
+    return _poll_due() or any(
+        remaining > 0 and path.startswith(prefix) for _id, prefix, remaining in _arms
+    )
+
+
+def _claim_arm(path):
+    for arm in _active_arms():
+        arm_id, prefix, remaining = arm
+        if remaining > 0 and path.startswith(prefix):
+            claimed = ProfilerArm.objects.filter(id=arm_id, remaining__gt=0).update(
+                remaining=F("remaining") - 1
+            )
+            # Other processes claim too; once the row says none are left,
+            # stop asking until the next poll
+            arm[2] = remaining - 1 if claimed else 0
+            if claimed:
+                return True
+    return False
+
+
+def _top_functions(profiler, limit=30):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append(
+            {
+                "function": f"{filename}:{line}({func})",
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            }
+        )
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+class RequestProfilerMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        header = request.headers.get(HEADER)
+        if header:
+            wanted = _header_is_valid(header)
+        else:
+            wanted = _may_claim(request.path) and _claim_arm(request.path)
+
+        if not wanted:
+            return self.get_response(request)
+        return self.profile(request)
+
+    async def __acall__(self, request):
+        header = request.headers.get(HEADER)
+        if header:
+            wanted = _header_is_valid(header)
+        else:
+            wanted = _may_claim(request.path) and await sync_to_async(_claim_arm)(
+                request.path
+            )
+
+        if not wanted:
+            return await self.get_response(request)
+        return await self.aprofile(request)
+
+    def profile(self, request):
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        with observing(recorder):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        return self._save(request, response, profiler, recorder, start)
+
+    async def aprofile(self, request):
+        global _loop_busy, _warned_async
+        if _loop_busy:
+            return await self.get_response(request)
+        if not _warned_async:
+            _warned_async = True
+            logger.warning(
+                "profiling under ASGI only sees the event loop thread; sync "
+                "views' own frames are missing from captures (their SQL is kept)"
+            )
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        _loop_busy = True
+        with observing(recorder):
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+                _loop_busy = False
+        return await sync_to_async(self._save)(
+            request, response, profiler, recorder, start
+        )
+
+    def _save(self, request, response, profiler, recorder, start):
+        duration_ms = round((perf_counter() - start) * 1000, 3)
+
+        view = view_label(request)
+        directory = str(
+            getattr(settings, "PORTAL_PROFILE_DIR", settings.BASE_DIR / "profiles")
+        )
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(
+            directory,
+            f"{timezone.now():%Y%m%dT%H%M%S}-{view}-{secrets.token_hex(3)}",
+        )
+        profiler.dump_stats(f"{stem}.pstats")
+
+        summary = {
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status_code": response.status_code,
+            "duration_ms": duration_ms,
+            "query_count": len(recorder.queries),
+            "sql_ms": recorder.total_ms,
+            "queries": recorder.queries,
+            "top_functions": _top_functions(profiler),
+            "event_loop_only": self.async_mode,
+        }
+        with open(f"{stem}.json", "w") as fh:
+            json.dump(summary, fh, indent=2)
+
+        ProfileCapture.objects.create(
+            view=view,
+            method=request.method,
+            path=request.path[:300],
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            query_count=len(recorder.queries),
+            sql_ms=recorder.total_ms,
+            pstats_path=f"{stem}.pstats",
+            summary_path=f"{stem}.json",
+        )
+        response[f"{HEADER}-Capture"] = os.path.basename(stem)
+        return response
@@ -0,0 +1,271 @@
+"""
+Static snapshots of buyer portal payloads.
+
+Each transaction's buyer payload (same shape as portal_session) is rendered
+with the API's JSON renderer and written to
+PORTAL_PUBLISH_DIR/<txn id>-<hash>.json. Next to it go .br and .gz siblings,
+for nginx brotli_static/gzip_static or a CDN origin. The hash is a keyed
+BLAKE2b of the payload, so names are unguessable and change whenever the
+content does. Files can be cached forever; only the small token lookup
+(session/published/) runs Python.
+
+Snapshot URLs stop working with the buyer token that led to them: the
+lookup redirects to a link signed in nginx secure_link's format, valid
+until the token expires and at most PORTAL_PUBLISH_LINK_SECONDS:
+
+    location /published/ {
+        secure_link $arg_md5,$arg_expires;
+        secure_link_md5 "$secure_link_expires$uri <PORTAL_PUBLISH_LINK_SECRET>";
+        if ($secure_link = "") { return 403; }
+        if ($secure_link = "0") { return 410; }
+    }
+
+With DEBUG, views.published_file serves them and checks the same link.
+
+Snapshots are shared by every buyer token of a transaction. Document links
+therefore point at the token-checked download endpoint and end in "?t=",
+and the client appends its own token.
+
+Changes are picked up from model signals (see signals.py). The affected
+transaction ids are collected and re-rendered after commit on one
+background thread, so a burst of edits yields one rebuild. manage.py
+publish_portals rebuilds everything with a process pool.
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.transaction import on_commit
+from django.utils import timezone
+
+from . import compression, renderers
+from .models import PublishedPortal, Transaction
+
+logger = logging.getLogger("portal.publish")
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+SIBLING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def enabled():
+    return getattr(settings, "PORTAL_PUBLISH_ENABLED", False)
+
+
+def publish_dir():
+    return str(getattr(settings, "PORTAL_PUBLISH_DIR", ""))
+
+
+def public_url(filename):
+    return getattr(settings, "PORTAL_PUBLISH_URL", "/published/") + filename
+
+
+def _link_hash(path, expires):
+    secret = getattr(settings, "PORTAL_PUBLISH_LINK_SECRET", "") or settings.SECRET_KEY
+    digest = hashlib.md5(f"{expires}{path} {secret}".encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def signed_url(filename, expires_at):
+    """
+    public_url() for `filename`, valid until `expires_at` and at most
+    PORTAL_PUBLISH_LINK_SECONDS.
+    """
+    ttl = getattr(settings, "PORTAL_PUBLISH_LINK_SECONDS", 3600)
+    expires = int(min(expires_at, timezone.now() + timedelta(seconds=ttl)).timestamp())
+    url = public_url(filename)
+    path = urllib.parse.urlsplit(url).path
+    return f"{url}?md5={_link_hash(path, expires)}&expires={expires}"
+
+
+def link_is_valid(path, md5, expires):
+    """
+    Whether a signed_url() for `path` (the URL's path) checks out and is
+    unexpired.
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    return expires > time.time() and hmac.compare_digest(
+        _link_hash(path, expires), md5 or ""
+    )
+
+
+def _name_for(txn_id, body):
+    key = hashlib.sha256(f"portal.publish:{settings.SECRET_KEY}".encode()).digest()
+    digest = hashlib.blake2b(body, key=key[:32], digest_size=16).hexdigest()
+    return f"{txn_id}-{digest}.json"
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _remove(filename):
+    base = os.path.join(publish_dir(), filename)
+    for path in [base] + [base + s for s in SIBLING_SUFFIXES.values()]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_files(published):
+    for filename in (published.filename, published.previous_filename):
+        if filename:
+            _remove(filename)
+
+
+def render(txn):
+    """
+    (filename, body). The name hashes the payload without its cursor, which
+    differs on every render, so unchanged content keeps its file.
+    """
+    from .views import buyer_session_payload  # views import this module's callers
+
+    payload = buyer_session_payload(txn, None)
+    cursor = payload.pop("cursor")
+    filename = _name_for(txn.id, renderers.dumps(payload))
+    payload["cursor"] = cursor
+    return filename, renderers.dumps(payload)
+
+
+def publish_transaction(txn_id):
+    """
+    Render and write `txn_id`'s snapshot; returns the PublishedPortal, or
+    None when the transaction no longer exists.
+    """
+    txn = Transaction.objects.select_related("buyer", "agent").filter(id=txn_id).first()
+    if txn is None:
+        return None
+
+    filename, body = render(txn)
+    current = PublishedPortal.objects.filter(transaction=txn).first()
+    if current is not None and current.filename == filename:
+        return current
+
+    os.makedirs(publish_dir(), exist_ok=True)
+    path = os.path.join(publish_dir(), filename)
+    for encoding, data in compression.precompress(body).items():
+        _write_atomic(path + SIBLING_SUFFIXES[encoding], data)
+    _write_atomic(path, body)  # last, so a visible .json has its siblings
+
+    # The request path and the background rebuild may both get here for a
+    # transaction not published yet; get_or_create settles which one inserts
+    with transaction.atomic():
+        current, created = PublishedPortal.objects.select_for_update().get_or_create(
+            transaction=txn,
+            defaults={"filename": filename, "size": len(body)},
+        )
+        if created or current.filename == filename:
+            return current
+        stale = current.previous_filename
+        current.previous_filename = current.filename
+        current.filename = filename
+        current.size = len(body)
+        current.published_at = timezone.now()
+        current.save()
+    if stale and stale != filename:
+        _remove(stale)
+    return current
+
+
+# -----------------------------
+# Change-driven rebuilds
+# -----------------------------
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="portal-publish"
+            )
+    return _executor
+
+
+def _drain():
+    try:
+        with _pending_lock:
+            ids = sorted(_pending)
+            _pending.clear()
+        for txn_id in ids:
+            try:
+                publish_transaction(txn_id)
+            except Exception:  # keep going; the next change retries it
+                logger.exception("publishing transaction %s failed", txn_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(transaction_ids):
+    """
+    Re-publish these transactions once the current DB transaction commits.
+    """
+    if not enabled():
+        return
+    ids = {i for i in transaction_ids if i}
+    if not ids:
+        return
+
+    def submit():
+        with _pending_lock:
+            new = ids - _pending
+            _pending.update(new)
+        if new:
+            _get_executor().submit(_drain)
+
+    on_commit(submit)
+
+
+# -----------------------------
+# Rebuild-all (process pool workers)
+# -----------------------------
+
+
+def init_worker():
+    # Spawned/forkserver children need their own setup; forked ones already
+    # have it (the parent closes its DB connections before forking).
+    import django
+
+    django.setup()
+
+
+def publish_chunk(txn_ids):
+    """
+    Process-pool entry point; returns (published, unchanged, missing).
+    """
+    published = unchanged = missing = 0
+    for txn_id in txn_ids:
+        before = (
+            PublishedPortal.objects.filter(transaction_id=txn_id)
+            .values_list("filename", flat=True)
+            .first()
+        )
+        result = publish_transaction(txn_id)
+        if result is None:
+            missing += 1
+        elif result.filename == before:
+            unchanged += 1
+        else:
+            published += 1
+    close_old_connections()
+    return published, unchanged, missing
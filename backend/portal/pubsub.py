@@ -0,0 +1,135 @@
+"""
+Publish/subscribe for live transaction updates (SSE, see views.transaction_events).
+
+Subscribers are asyncio queues living on the ASGI event loop; an idle
+subscriber costs one small queue and one suspended coroutine. publish() is
+safe to call from any thread (the sync write paths call it after commit)
+and hands messages to each subscriber's loop with call_soon_threadsafe.
+
+With PORTAL_PUBSUB_REDIS_URL set, publish() goes through Redis instead and
+each process runs one listener task that fans Redis messages out to its
+local subscribers, so a write on any worker reaches streams on every
+worker. Without it, delivery is limited to the current process.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = aioredis = None
+
+logger = logging.getLogger("portal.pubsub")
+
+CHANNEL_PREFIX = "portal:txn:"
+
+# A subscriber that falls this far behind gets a single "resync" instead
+QUEUE_SIZE = 64
+
+_subscribers = {}  # channel -> set of Subscription
+_lock = threading.Lock()
+_redis = None
+_listener = None
+
+
+def channel_for(transaction_id):
+    return f"{CHANNEL_PREFIX}{transaction_id}"
+
+
+def redis_url():
+    return getattr(settings, "PORTAL_PUBSUB_REDIS_URL", "")
+
+
+class Subscription:
+    __slots__ = ("channel", "loop", "queue")
+
+    def __init__(self, channel, loop):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, message):
+        # Runs on self.loop
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+def subscriber_count():
+    with _lock:
+        return sum(len(subs) for subs in _subscribers.values())
+
+
+def _fan_out(channel, message):
+    with _lock:
+        subs = list(_subscribers.get(channel, ()))
+    for sub in subs:
+        try:
+            sub.loop.call_soon_threadsafe(sub.deliver, message)
+        except RuntimeError:  # loop closed under us
+            pass
+
+
+def publish(transaction_id, message):
+    channel = channel_for(transaction_id)
+    if redis is not None and redis_url():
+        global _redis
+        if _redis is None:
+            _redis = redis.Redis.from_url(redis_url())
+        try:
+            _redis.publish(channel, json.dumps(message))
+            return
+        except redis.RedisError as exc:
+            logger.warning("redis publish failed, delivering locally: %s", exc)
+    _fan_out(channel, message)
+
+
+async def _listen():
+    client = aioredis.Redis.from_url(redis_url())
+    pubsub = client.pubsub()
+    await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+    async for item in pubsub.listen():
+        if item["type"] != "pmessage":
+            continue
+        channel = item["channel"].decode()
+        _fan_out(channel, json.loads(item["data"]))
+
+
+def _ensure_listener():
+    global _listener
+    if aioredis is None or not redis_url():
+        return
+    if _listener is None or _listener.done():
+        _listener = asyncio.get_running_loop().create_task(_listen())
+
+
+def subscribe(transaction_id):
+    """
+    Register a subscription on the running loop; pair with unsubscribe().
+    """
+    _ensure_listener()
+    sub = Subscription(channel_for(transaction_id), asyncio.get_running_loop())
+    with _lock:
+        _subscribers.setdefault(sub.channel, set()).add(sub)
+    return sub
+
+
+def unsubscribe(sub):
+    with _lock:
+        subs = _subscribers.get(sub.channel)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _subscribers[sub.channel]
@@ -0,0 +1,130 @@
+"""
+Duplicate / N+1 query detection.
+
+Every statement is reduced to a fingerprint (literals and IN-lists collapsed),
+so `SELECT ... WHERE agent_id = 1` and `... = 2` count as the same shape. A
+shape executed more than PORTAL_QUERYCHECK_THRESHOLD times in one request is
+reported with the call sites that issued it.
+
+Dev:   DuplicateQueryMiddleware logs reports (on by default when DEBUG).
+CI:    set PORTAL_QUERYCHECK_RAISE = True, or wrap code in
+       `with assert_max_duplicate_queries(threshold=1): ...` inside a test.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .sqltrace import IGNORED_FILES, QueryRecorder, observing
+
+logger = logging.getLogger("portal.querycheck")
+
+IGNORED_FILES.add(__file__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+class DuplicateQueryError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def duplicates(queries, threshold):
+    """
+    [{"fingerprint", "count", "call_sites": {site: count}}] for every shape
+    seen more than `threshold` times, worst first.
+    """
+    shapes = defaultdict(list)
+    for q in queries:
+        shapes[fingerprint(q["sql"])].append(q["origin"])
+
+    report = []
+    for shape, origins in shapes.items():
+        if len(origins) <= threshold:
+            continue
+        sites = defaultdict(int)
+        for origin in origins:
+            sites[origin or "<unknown>"] += 1
+        report.append(
+            {"fingerprint": shape, "count": len(origins), "call_sites": dict(sites)}
+        )
+    report.sort(key=lambda r: r["count"], reverse=True)
+    return report
+
+
+def format_report(report, label=""):
+    lines = [f"{len(report)} repeated query shape(s){' in ' + label if label else ''}:"]
+    for item in report:
+        lines.append(f"  x{item['count']}  {item['fingerprint'][:200]}")
+        for site, count in item["call_sites"].items():
+            lines.append(f"        {count} from {site}")
+    return "\n".join(lines)
+
+
+def _threshold():
+    return getattr(settings, "PORTAL_QUERYCHECK_THRESHOLD", 1)
+
+
+@contextmanager
+def assert_max_duplicate_queries(threshold=None, using=connection):
+    """
+    Test helper: fail if any statement shape runs more than `threshold` times
+    inside the block.
+    """
+    threshold = _threshold() if threshold is None else threshold
+    recorder = QueryRecorder()
+    with using.execute_wrapper(recorder):
+        yield recorder
+    report = duplicates(recorder.queries, threshold)
+    if report:
+        raise DuplicateQueryError(format_report(report))
+
+
+class DuplicateQueryMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PORTAL_QUERYCHECK_ENABLED", settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with observing(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+        return self.process_response(request, response, recorder)
+
+    async def __acall__(self, request):
+        with observing(QueryRecorder()) as recorder:
+            response = await self.get_response(request)
+        return self.process_response(request, response, recorder)
+
+    def process_response(self, request, response, recorder):
+        report = duplicates(recorder.queries, _threshold())
+        if report:
+            message = format_report(report, f"{request.method} {request.path}")
+            if getattr(settings, "PORTAL_QUERYCHECK_RAISE", False):
+                raise DuplicateQueryError(message)
+            logger.warning(message)
+            response["X-Portal-Duplicate-Queries"] = str(len(report))
+        return response
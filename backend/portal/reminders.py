@@ -0,0 +1,218 @@
+"""
+Due-date reminders for tasks and utilities ("set up by" dates).
+
+schedule() runs once per pass (manage.py send_reminders, from cron):
+
+1. Collect: one range query per model over the due-date index finds open
+   tasks and utilities due between PORTAL_REMINDER_OVERDUE_DAYS ago and
+   PORTAL_REMINDER_LEAD_DAYS ahead. Transactions whose status is in
+   PORTAL_REMINDER_INACTIVE_STATUSES are excluded. Rows come back as
+   values() tuples joined to the transaction, buyer and agent. There is
+   no per-transaction loop and no model instances.
+2. Group: items are bucketed into one digest per buyer and one per agent,
+   each split into overdue and upcoming.
+3. Enqueue: digests are bulk-inserted into the ReminderDigest outbox with
+   ignore_conflicts. The unique (recipient, recipient_id, day) key makes
+   reruns on the same day no-ops.
+
+send_pending() then emails unsent digests. Rows are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED, so overlapping runs don't double-send.
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReminderDigest, Task, Utility
+
+logger = logging.getLogger("portal.reminders")
+
+Recipient = ReminderDigest.Recipient
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_REMINDER_{name}", default)
+
+
+# -----------------------------
+# Collect and group
+# -----------------------------
+
+
+def _window(today):
+    return (
+        today - timedelta(days=_setting("OVERDUE_DAYS", 14)),
+        today + timedelta(days=_setting("LEAD_DAYS", 3)),
+    )
+
+
+def inactive_statuses():
+    """
+    Transaction statuses that count as finished: no reminders, and the
+    agent UI's pipeline preload leaves them out.
+    """
+    return _setting("INACTIVE_STATUSES", ["Closed", "Cancelled", "Canceled"])
+
+
+def due_items(today):
+    """
+    (kind, id, title, due_date, transaction_id, address, buyer_id,
+    buyer_name, buyer_email, agent_id, agent_email) for every open task and
+    utility due in the reminder window.
+    """
+    start, end = _window(today)
+    inactive = inactive_statuses()
+    txn_fields = (
+        "transaction_id",
+        "transaction__address",
+        "transaction__buyer_id",
+        "transaction__buyer__name",
+        "transaction__buyer__email",
+        "transaction__agent_id",
+        "transaction__agent__email",
+    )
+    tasks = (
+        Task.objects.filter(completed=False, due_date__gte=start, due_date__lte=end)
+        .exclude(transaction__status__in=inactive)
+        .values_list("id", "title", "due_date", *txn_fields)
+        .order_by()  # skip Task's default ordering sort
+    )
+    utilities = (
+        Utility.objects.filter(due_date__gte=start, due_date__lte=end)
+        .exclude(transaction__status__in=inactive)
+        .values_list("id", "provider_name", "due_date", *txn_fields)
+        .order_by()
+    )
+    for row in tasks.iterator(chunk_size=2000):
+        yield ("task",) + row
+    for row in utilities.iterator(chunk_size=2000):
+        yield ("utility",) + row
+
+
+def build_digests(today):
+    """
+    Unsaved ReminderDigests, one per buyer and one per agent with anything
+    due in the window.
+    """
+    digests = {}
+    for (
+        kind,
+        item_id,
+        title,
+        due_date,
+        txn_id,
+        address,
+        buyer_id,
+        buyer_name,
+        buyer_email,
+        agent_id,
+        agent_email,
+    ) in due_items(today):
+        item = {
+            "kind": kind,
+            "id": item_id,
+            "title": title,
+            "due_date": due_date,
+            "transaction_id": txn_id,
+            "address": address,
+        }
+        bucket = "overdue" if due_date < today else "upcoming"
+        for recipient, recipient_id, email, extra in (
+            (Recipient.BUYER, buyer_id, buyer_email, {}),
+            (Recipient.AGENT, agent_id, agent_email, {"buyer_name": buyer_name}),
+        ):
+            if not email:
+                continue
+            digest = digests.get((recipient, recipient_id))
+            if digest is None:
+                digest = digests[recipient, recipient_id] = ReminderDigest(
+                    recipient=recipient,
+                    recipient_id=recipient_id,
+                    email=email,
+                    day=today,
+                    items={"overdue": [], "upcoming": []},
+                )
+            digest.items[bucket].append({**item, **extra})
+            digest.item_count += 1
+
+    for digest in digests.values():
+        for items in digest.items.values():
+            items.sort(key=lambda i: (i["due_date"], i["transaction_id"], i["id"]))
+    return list(digests.values())
+
+
+def schedule(today=None, dry_run=False):
+    """
+    Build today's digests and enqueue the ones not already queued. Returns
+    a Counter (digests built, enqueued, items).
+    """
+    today = today or timezone.localdate()
+    digests = build_digests(today)
+    stats = Counter(digests=len(digests), items=sum(d.item_count for d in digests))
+    if dry_run or not digests:
+        return stats
+
+    before = ReminderDigest.objects.filter(day=today).count()
+    ReminderDigest.objects.bulk_create(digests, batch_size=1000, ignore_conflicts=True)
+    stats["enqueued"] = ReminderDigest.objects.filter(day=today).count() - before
+    return stats
+
+
+# -----------------------------
+# Delivery
+# -----------------------------
+
+
+def render(digest):
+    """
+    (subject, plain-text body) for one digest.
+    """
+    lines = []
+    for bucket, heading in (("overdue", "Overdue"), ("upcoming", "Coming up")):
+        items = digest.items.get(bucket) or []
+        if not items:
+            continue
+        lines.append(f"{heading}:")
+        for item in items:
+            who = f" ({item['buyer_name']})" if item.get("buyer_name") else ""
+            lines.append(
+                f"  - {item['due_date']}: {item['title']} - {item['address']}{who}"
+            )
+        lines.append("")
+    subject = f"{digest.item_count} closing item(s) need attention"
+    return subject, "\n".join(lines)
+
+
+def send_pending(limit=500):
+    """
+    Email unsent digests; returns a Counter of outcomes.
+    """
+    stats = Counter()
+    max_attempts = _setting("MAX_ATTEMPTS", 5)
+    with transaction.atomic():
+        digests = list(
+            ReminderDigest.objects.select_for_update(skip_locked=True)
+            .filter(sent_at__isnull=True, attempts__lt=max_attempts)
+            .order_by("created_at")[:limit]
+        )
+        for digest in digests:
+            subject, body = render(digest)
+            digest.attempts += 1
+            try:
+                send_mail(subject, body, None, [digest.email])
+            except Exception as exc:  # SMTP errors, refused, timeouts
+                digest.last_error = str(exc)[:200]
+                stats["failed"] += 1
+                logger.warning("reminder digest %s failed: %s", digest.id, exc)
+            else:
+                digest.sent_at = timezone.now()
+                stats["sent"] += 1
+        ReminderDigest.objects.bulk_update(
+            digests, ["attempts", "sent_at", "last_error"]
+        )
+    return stats
@@ -0,0 +1,100 @@
+"""
+Fast JSON rendering for API responses.
+
+Uses orjson or msgspec when installed (dates, datetimes and UUIDs are encoded
+natively) and falls back to the stdlib encoder DRF uses. Anything the fast
+encoders don't know (Decimal, lazy strings, querysets, ...) goes through
+DRF's JSONEncoder.default, so output matches JSONRenderer byte for byte on
+the payloads this app returns.
+
+PORTAL_JSON_BACKEND: "auto" (default), "orjson", "msgspec" or "json".
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    return _fallback.default(obj)
+
+
+def _js_safe(data):
+    # Same as DRF: keep output a strict JavaScript subset.
+    if b"\xe2\x80\xa8" in data or b"\xe2\x80\xa9" in data:
+        data = data.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+    return data
+
+
+def _orjson_dumps(data):
+    return orjson.dumps(
+        data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    )
+
+
+_msgspec_encoder = None
+
+
+def _msgspec_dumps(data):
+    global _msgspec_encoder
+    if _msgspec_encoder is None:
+        _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+    return _msgspec_encoder.encode(data)
+
+
+def _stdlib_dumps(data):
+    return json.dumps(
+        data,
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+def backend_name():
+    wanted = getattr(settings, "PORTAL_JSON_BACKEND", "auto")
+    if wanted in ("auto", "orjson") and orjson is not None:
+        return "orjson"
+    if wanted in ("auto", "msgspec") and msgspec is not None:
+        return "msgspec"
+    return "json"
+
+
+_DUMPS = {"orjson": _orjson_dumps, "msgspec": _msgspec_dumps, "json": _stdlib_dumps}
+
+
+def dumps(data, backend=None):
+    """
+    Compact UTF-8 JSON bytes for `data`.
+    """
+    return _js_safe(_DUMPS[backend or backend_name()](data))
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        # Pretty-printing (browsable API, ?indent) keeps the stdlib path.
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -0,0 +1,325 @@
+"""
+Summary tables for per-agent pilot metrics, kept current incrementally.
+
+Raw EngagementEvents are rolled up a day at a time. recompute_day()
+rebuilds that day's TransactionDailyStats and AgentDailyStats rows from
+the occurred_at range. Replacing whole day partitions keeps reruns and
+late-arriving events (the engagement buffer flushes seconds after the
+fact) idempotent.
+
+TransactionStats holds current per-transaction numbers: task completion,
+lifetime engagement (summed from the daily rows), and days to close.
+It is refreshed only for transactions touched since the watermark:
+- the transaction itself or its tasks changed,
+- a task was deleted,
+- an engagement event arrived,
+- the closing date passed.
+
+refresh() is the incremental pass (manage.py rollup_stats, from cron or
+--loop). The watermark lives in SyncCursor "rollups". Each pass
+re-examines PORTAL_ROLLUP_LATE_SECONDS before it, to catch rows that
+committed late. Everything the stats endpoint reads comes from these
+tables; no raw scans at request time.
+"""
+
+from collections import Counter
+from datetime import datetime, time as dt_time, timedelta
+from statistics import median
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    AgentDailyStats,
+    EngagementEvent,
+    SyncCursor,
+    Task,
+    Tombstone,
+    Transaction,
+    TransactionDailyStats,
+    TransactionStats,
+)
+
+CURSOR_NAME = "rollups"
+
+Kind = EngagementEvent.Kind
+KIND_COLUMNS = {
+    Kind.PORTAL_OPEN: "portal_opens",
+    Kind.DOCUMENT_OPEN: "document_opens",
+    Kind.VENDOR_CLICK: "vendor_clicks",
+    Kind.UTILITY_CLICK: "utility_clicks",
+    Kind.LINK_CLICK: "link_clicks",
+    Kind.TASK_COMPLETED: "tasks_completed",
+    Kind.TASK_REOPENED: "tasks_reopened",
+}
+CLICK_COLUMNS = ("vendor_clicks", "utility_clicks", "link_clicks")
+
+CHUNK = 500
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    return start, start + timedelta(days=1)
+
+
+def days_between(first, last):
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+# -----------------------------
+# Daily engagement partitions
+# -----------------------------
+
+
+def recompute_day(day):
+    """
+    Rebuild `day`'s daily rows from raw events; returns the transaction ids
+    that had events that day.
+    """
+    start, end = _day_bounds(day)
+    rows = (
+        EngagementEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=end)
+        .values_list("agent_id", "transaction_id", "kind")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    per_txn, per_agent = {}, {}
+    for agent_id, txn_id, kind, n in rows:
+        column = KIND_COLUMNS.get(kind)
+        if column is None:
+            continue
+        txn = per_txn.setdefault(
+            txn_id,
+            TransactionDailyStats(transaction_id=txn_id, agent_id=agent_id, day=day),
+        )
+        agent = per_agent.setdefault(
+            agent_id, AgentDailyStats(agent_id=agent_id, day=day)
+        )
+        setattr(txn, column, getattr(txn, column) + n)
+        setattr(agent, column, getattr(agent, column) + n)
+
+    with transaction.atomic():
+        TransactionDailyStats.objects.filter(day=day).delete()
+        AgentDailyStats.objects.filter(day=day).delete()
+        TransactionDailyStats.objects.bulk_create(per_txn.values(), batch_size=CHUNK)
+        AgentDailyStats.objects.bulk_create(per_agent.values(), batch_size=CHUNK)
+    return set(per_txn)
+
+
+# -----------------------------
+# Per-transaction stats
+# -----------------------------
+
+
+def refresh_transactions(transaction_ids, today=None):
+    """
+    Recompute TransactionStats for these ids (rows of deleted transactions
+    are dropped). Returns how many rows were written.
+    """
+    today = today or timezone.localdate()
+    ids = sorted(set(transaction_ids))
+    written = 0
+    for i in range(0, len(ids), CHUNK):
+        chunk = ids[i : i + CHUNK]
+        txns = Transaction.objects.filter(id__in=chunk).values_list(
+            "id", "agent_id", "created_at", "closing_date"
+        )
+        tasks = {
+            row[0]: row[1:]
+            for row in Task.objects.filter(transaction_id__in=chunk)
+            .values_list("transaction_id")
+            .annotate(total=Count("id"), done=Count("id", filter=Q(completed=True)))
+            .order_by()
+        }
+        engagement = {
+            row["transaction_id"]: row
+            for row in TransactionDailyStats.objects.filter(transaction_id__in=chunk)
+            .values("transaction_id")
+            .annotate(
+                portal_opens=Sum("portal_opens"),
+                document_opens=Sum("document_opens"),
+                **{column: Sum(column) for column in CLICK_COLUMNS},
+            )
+            .order_by()
+        }
+
+        now = timezone.now()
+        rows = []
+        for txn_id, agent_id, created_at, closing_date in txns:
+            total, done = tasks.get(txn_id, (0, 0))
+            counts = engagement.get(txn_id, {})
+            closed = closing_date is not None and closing_date <= today
+            rows.append(
+                TransactionStats(
+                    transaction_id=txn_id,
+                    agent_id=agent_id,
+                    tasks_total=total,
+                    tasks_completed=done,
+                    portal_opens=counts.get("portal_opens") or 0,
+                    document_opens=counts.get("document_opens") or 0,
+                    clicks=sum(counts.get(c) or 0 for c in CLICK_COLUMNS),
+                    days_to_close=(
+                        (closing_date - timezone.localdate(created_at)).days
+                        if closed
+                        else None
+                    ),
+                    refreshed_at=now,
+                )
+            )
+        gone = set(chunk) - {row.transaction_id for row in rows}
+        with transaction.atomic():
+            if gone:
+                TransactionStats.objects.filter(transaction_id__in=gone).delete()
+            TransactionStats.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["transaction_id"],
+                update_fields=[
+                    f.name
+                    for f in TransactionStats._meta.concrete_fields
+                    if f.name not in ("id", "transaction_id")
+                ],
+            )
+        written += len(rows)
+    return written
+
+
+# -----------------------------
+# Incremental pass
+# -----------------------------
+
+
+def watermark():
+    cursor = SyncCursor.objects.filter(name=CURSOR_NAME).first()
+    return parse_datetime(cursor.cursor) if cursor and cursor.cursor else None
+
+
+def refresh(now=None):
+    """
+    Roll up everything since the watermark and advance it. The first run
+    covers all history (see manage.py rollup_stats --backfill for a
+    parallel version).
+    """
+    now = now or timezone.now()
+    mark = watermark()
+    if mark is None:
+        first = EngagementEvent.objects.order_by("occurred_at").first()
+        start = first.occurred_at if first else now
+        touched = set(Transaction.objects.values_list("id", flat=True))
+    else:
+        start = mark - timedelta(
+            seconds=getattr(settings, "PORTAL_ROLLUP_LATE_SECONDS", 300)
+        )
+        touched = set()
+
+    stats = Counter()
+    for day in days_between(timezone.localdate(start), timezone.localdate(now)):
+        touched |= recompute_day(day)
+        stats["days"] += 1
+
+    touched |= set(
+        Transaction.objects.filter(updated_at__gte=start).values_list("id", flat=True)
+    )
+    touched |= set(
+        Task.objects.filter(updated_at__gte=start).values_list(
+            "transaction_id", flat=True
+        )
+    )
+    touched |= set(
+        Tombstone.objects.filter(model="task", deleted_at__gte=start).values_list(
+            "transaction_id", flat=True
+        )
+    )
+    # Closing dates that passed since the last run change days_to_close
+    touched |= set(
+        Transaction.objects.filter(
+            closing_date__gte=timezone.localdate(start),
+            closing_date__lte=timezone.localdate(now),
+        ).values_list("id", flat=True)
+    )
+    stats["transactions"] = refresh_transactions(touched, timezone.localdate(now))
+
+    set_watermark(now)
+    return stats
+
+
+def set_watermark(when):
+    SyncCursor.objects.update_or_create(
+        name=CURSOR_NAME, defaults={"cursor": when.isoformat()}
+    )
+
+
+# -----------------------------
+# Backfill (process pool workers)
+# -----------------------------
+
+
+def init_worker():
+    import django
+
+    django.setup()
+
+
+def recompute_days(days):
+    """
+    Process-pool entry point; returns the transaction ids seen on `days`.
+    """
+    touched = set()
+    for day in days:
+        touched |= recompute_day(day)
+    close_old_connections()
+    return touched
+
+
+def refresh_chunk(transaction_ids):
+    written = refresh_transactions(transaction_ids)
+    close_old_connections()
+    return written
+
+
+def agent_summary(agent_id, days=30):
+    """
+    The stats endpoint's payload, read from summary tables only.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    columns = list(KIND_COLUMNS.values())
+    daily = list(
+        AgentDailyStats.objects.filter(agent_id=agent_id, day__gte=since)
+        .order_by("day")
+        .values("day", *columns)
+    )
+    totals = {c: sum(row[c] for row in daily) for c in columns}
+
+    per_txn = list(
+        TransactionStats.objects.filter(agent_id=agent_id)
+        .order_by("transaction_id")
+        .values(
+            "transaction_id",
+            "tasks_total",
+            "tasks_completed",
+            "portal_opens",
+            "document_opens",
+            "clicks",
+            "days_to_close",
+        )
+    )
+    tasks_total = sum(row["tasks_total"] for row in per_txn)
+    tasks_done = sum(row["tasks_completed"] for row in per_txn)
+    closes = [
+        row["days_to_close"] for row in per_txn if row["days_to_close"] is not None
+    ]
+
+    return {
+        "as_of": watermark(),
+        "days": days,
+        "daily": daily,
+        "totals": totals,
+        "task_completion_rate": (
+            round(tasks_done / tasks_total, 4) if tasks_total else None
+        ),
+        "median_days_to_close": median(closes) if closes else None,
+        "transactions": per_txn,
+    }
@@ -0,0 +1,147 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import audit, delta, ics, images, publish
+from .models import (
+    Agent,
+    AgentFAQ,
+    AuditEntry,
+    Document,
+    PublishedPortal,
+    Task,
+    Transaction,
+    TransactionVendor,
+    Utility,
+    Vendor,
+)
+
+
+@receiver(post_save, sender=Agent)
+def agent_saved(sender, instance, **kwargs):
+    images.register(instance.photo_url, instance.brokerage_logo_url)
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    images.register(instance.hero_image_url)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Utility)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=TransactionVendor)
+def transaction_child_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Transaction) or getattr(origin, "model", None) is Transaction:
+        return  # cascade; nobody polls a deleted transaction for deltas
+    delta.record_delete(instance)
+
+
+# -----------------------------
+# Static snapshot rebuilds (portal/publish.py)
+# -----------------------------
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_changed(sender, instance, **kwargs):
+    publish.schedule([instance.id])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Utility)
+@receiver(post_delete, sender=Utility)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=TransactionVendor)
+@receiver(post_delete, sender=TransactionVendor)
+def transaction_child_changed(sender, instance, **kwargs):
+    publish.schedule([instance.transaction_id])
+
+
+@receiver(post_save, sender=Agent)
+@receiver(post_save, sender=AgentFAQ)
+@receiver(post_delete, sender=AgentFAQ)
+def agent_content_changed(sender, instance, **kwargs):
+    if publish.enabled():
+        agent_id = instance.id if sender is Agent else instance.agent_id
+        publish.schedule(
+            Transaction.objects.filter(agent_id=agent_id).values_list("id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Vendor)
+def vendor_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    # Vendor fields are rendered through the links, so bump them for delta
+    # sync (a shared entry's links span every agent of the brokerage).
+    instance.transaction_links.update(updated_at=timezone.now())
+    if publish.enabled():
+        publish.schedule(
+            instance.transaction_links.values_list("transaction_id", flat=True)
+        )
+
+
+@receiver(post_delete, sender=PublishedPortal)
+def published_portal_deleted(sender, instance, **kwargs):
+    publish.remove_files(instance)
+
+
+# -----------------------------
+# Calendar feed caches (portal/ics.py)
+# -----------------------------
+# These compare against the load-time audit snapshot, so they must be
+# connected before audit_saved below re-snapshots the instance.
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Utility)
+def calendar_source_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        changed = audit.diff(instance, AuditEntry.Action.UPDATE)
+        if not ics.FEED_FIELDS[sender].intersection(changed):
+            return
+    ics.invalidate_for(instance)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Utility)
+def calendar_source_deleted(sender, instance, origin=None, **kwargs):
+    if sender is not Transaction and (
+        isinstance(origin, Transaction) or getattr(origin, "model", None) is Transaction
+    ):
+        return  # cascade; the transaction's own delete invalidates both feeds
+    ics.invalidate_for(instance)
+
+
+# -----------------------------
+# Audit log (portal/audit.py)
+# -----------------------------
+
+AUDITED = (Transaction, Task, Utility, Document, TransactionVendor)
+
+
+def audit_loaded(sender, instance, **kwargs):
+    audit.snapshot(instance)
+
+
+def audit_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    action = AuditEntry.Action.CREATE if created else AuditEntry.Action.UPDATE
+    audit.record([instance], action)
+
+
+def audit_deleted(sender, instance, **kwargs):
+    audit.record([instance], AuditEntry.Action.DELETE)
+
+
+for model in AUDITED:
+    post_init.connect(audit_loaded, sender=model)
+    post_save.connect(audit_saved, sender=model)
+    post_delete.connect(audit_deleted, sender=model)
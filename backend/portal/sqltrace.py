@@ -0,0 +1,110 @@
+"""
+SQL capture for diagnostics: every statement with its timing and the first
+project frame that issued it. Only installed on requests being inspected.
+
+observing(wrapper) is connection.execute_wrapper() for a whole context
+rather than one thread's connection. Under ASGI, Django runs sync views
+and ORM calls in worker threads whose connections are not the event
+loop's; context variables follow those calls, so the wrapper still sees
+their queries.
+"""
+
+import functools
+import os
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Modules whose frames never count as the origin of a query (execute wrappers
+# and middleware that only observe). Diagnostic modules add themselves.
+IGNORED_FILES = {__file__}
+
+
+def _project_root():
+    return str(getattr(settings, "BASE_DIR", os.getcwd()))
+
+
+def call_site():
+    """
+    "path:line in func" for the innermost frame that lives in the project
+    (not Django, DRF or one of the IGNORED_FILES).
+    """
+    root = _project_root()
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(root)
+            and filename not in IGNORED_FILES
+            and "site-packages" not in filename
+        ):
+            rel = os.path.relpath(filename, root)
+            return f"{rel}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return ""
+
+
+class QueryRecorder:
+    """
+    Use with connection.execute_wrapper(recorder).
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "sql": sql,
+                    "ms": round((perf_counter() - start) * 1000, 3),
+                    "origin": call_site(),
+                }
+            )
+
+    @property
+    def total_ms(self):
+        return round(sum(q["ms"] for q in self.queries), 3)
+
+
+# -----------------------------
+# Context-wide execute wrappers
+# -----------------------------
+
+_observers = ContextVar("portal_sql_observers", default=())
+
+
+def _observe(execute, sql, params, many, context):
+    for wrapper in _observers.get():
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def _install(connection):
+    # First in the list: execute_wrapper() blocks pop the last entry on exit
+    if _observe not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _observe)
+
+
+@contextmanager
+def observing(wrapper):
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+    token = _observers.set(_observers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _observers.reset(token)
+
+
+connection_created.connect(
+    lambda sender, connection, **kwargs: _install(connection), weak=False
+)
@@ -0,0 +1,233 @@
+"""
+Pluggable storage for uploaded documents and image variants.
+
+Keys are relative paths ("objects/ab/cd/<sha256>", "images/<hash>/640.webp").
+
+PORTAL_STORAGE = {"BACKEND": "local"}                      # MEDIA_ROOT (default)
+PORTAL_STORAGE = {
+    "BACKEND": "s3",
+    "BUCKET": "portal-documents",
+    "PREFIX": "",                 # optional key prefix inside the bucket
+    "ENDPOINT_URL": None,         # e.g. a local moto/minio server
+    "REGION": None,
+}
+
+The S3 backend hands out pre-signed GET/PUT URLs so clients move bytes
+to and from the bucket directly. Signed download URLs are cached (Django
+cache) and reused until PORTAL_SIGNED_URL_MARGIN seconds before expiry, so
+payloads listing many documents don't re-sign on every load.
+"""
+
+import base64
+import hashlib
+import os
+import shutil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import content_disposition_header
+
+_storage = None
+_storage_config = None
+
+
+class LocalStorage:
+    supports_presign = False
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def save_file(self, key, local_path, content_type=""):
+        """
+        Move `local_path` to `key` (atomic on the same filesystem).
+        """
+        dest = self.path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.replace(local_path, dest)
+        except OSError:
+            shutil.move(local_path, dest)
+
+    def save_bytes(self, key, data, content_type=""):
+        dest = self.path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, dest)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage:
+    supports_presign = True
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3  # optional dependency, only needed for this backend
+            from botocore.config import Config
+
+            # SigV4 so the pinned checksum header is part of the signature.
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                region_name=self.region,
+                config=Config(signature_version="s3v4"),
+            )
+        return self._client
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def head(self, key, checksum=False):
+        from botocore.exceptions import ClientError
+
+        kwargs = {"Bucket": self.bucket, "Key": self._key(key)}
+        if checksum:
+            kwargs["ChecksumMode"] = "ENABLED"
+        try:
+            return self.client.head_object(**kwargs)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def exists(self, key):
+        return self.head(key) is not None
+
+    def size(self, key):
+        head = self.head(key)
+        return head["ContentLength"] if head else None
+
+    def open(self, key):
+        obj = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        return obj["Body"]
+
+    def save_file(self, key, local_path, content_type=""):
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.upload_file(
+            local_path, self.bucket, self._key(key), ExtraArgs=extra or None
+        )
+        os.remove(local_path)
+
+    def save_bytes(self, key, data, content_type=""):
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(
+            Bucket=self.bucket, Key=self._key(key), Body=data, **extra
+        )
+
+    def copy(self, src_key, dest_key):
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(dest_key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(src_key)},
+        )
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def presigned_download_url(self, key, expires, filename="", content_type=""):
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition_header(
+                False, filename
+            )
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=expires
+        )
+
+    def presigned_upload_url(self, key, expires, content_type="", sha256=""):
+        """
+        PUT URL; with `sha256` S3 rejects a body whose checksum differs, so
+        the client must send x-amz-checksum-sha256 with the returned value.
+        """
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        headers = {}
+        if content_type:
+            params["ContentType"] = content_type
+            headers["Content-Type"] = content_type
+        if sha256:
+            params["ChecksumSHA256"] = checksum_b64(sha256)
+            headers["x-amz-checksum-sha256"] = params["ChecksumSHA256"]
+        url = self.client.generate_presigned_url(
+            "put_object", Params=params, ExpiresIn=expires
+        )
+        return url, headers
+
+
+def checksum_b64(sha256_hex):
+    return base64.b64encode(bytes.fromhex(sha256_hex)).decode()
+
+
+def get_storage():
+    global _storage, _storage_config
+    config = getattr(settings, "PORTAL_STORAGE", {"BACKEND": "local"})
+    if _storage is None or config != _storage_config:
+        if config.get("BACKEND") == "s3":
+            _storage = S3Storage(
+                bucket=config["BUCKET"],
+                prefix=config.get("PREFIX", ""),
+                endpoint_url=config.get("ENDPOINT_URL"),
+                region=config.get("REGION"),
+            )
+        else:
+            _storage = LocalStorage(config.get("ROOT") or settings.MEDIA_ROOT)
+        _storage_config = dict(config)
+    return _storage
+
+
+# -----------------------------
+# Signed URL cache
+# -----------------------------
+
+
+def signed_url_ttl():
+    return getattr(settings, "PORTAL_SIGNED_URL_TTL", 3600)
+
+
+def signed_download_url(key, filename="", content_type=""):
+    """
+    Pre-signed GET URL for `key`, reused from cache until close to expiry.
+    None when the backend serves files itself.
+    """
+    storage = get_storage()
+    if not storage.supports_presign:
+        return None
+
+    digest = hashlib.blake2b(
+        f"{key}|{filename}|{content_type}".encode(), digest_size=16
+    ).hexdigest()
+    cache_key = f"portal:signed-url:{digest}"
+    url = cache.get(cache_key)
+    if url is None:
+        ttl = signed_url_ttl()
+        url = storage.presigned_download_url(key, ttl, filename, content_type)
+        margin = getattr(settings, "PORTAL_SIGNED_URL_MARGIN", 300)
+        cache.set(cache_key, url, timeout=max(ttl - margin, 1))
+    return url
@@ -0,0 +1,71 @@
+"""
+Small object graphs shared by the portal tests.
+"""
+
+from datetime import date, timedelta
+from itertools import count
+
+from portal.models import (
+    Agent,
+    AgentFAQ,
+    AgentPortalToken,
+    Buyer,
+    Document,
+    PortalToken,
+    Task,
+    Transaction,
+    TransactionVendor,
+    Utility,
+    Vendor,
+)
+
+_seq = count(1)
+
+# Per-process cache for tests that clear or inspect it
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+def make_agent(**fields):
+    n = next(_seq)
+    fields.setdefault("name", f"Agent {n}")
+    fields.setdefault("email", f"agent{n}@example.com")
+    return Agent.objects.create(**fields)
+
+
+def make_transaction(agent=None, tasks=3, utilities=2, documents=2, vendors=2):
+    """
+    A transaction with some of every child row the payloads read.
+    """
+    agent = agent or make_agent()
+    n = next(_seq)
+    buyer = Buyer.objects.create(name=f"Buyer {n}", email=f"buyer{n}@example.com")
+    txn = Transaction.objects.create(
+        agent=agent,
+        buyer=buyer,
+        address=f"{n} Main St",
+        closing_date=date.today() + timedelta(days=30),
+    )
+    for i in range(tasks):
+        Task.objects.create(transaction=txn, title=f"Task {i}", order=i)
+    for i in range(utilities):
+        Utility.objects.create(transaction=txn, provider_name=f"Provider {i}")
+    for i in range(documents):
+        Document.objects.create(
+            transaction=txn, title=f"Doc {i}", url=f"https://example.com/{n}/{i}.pdf"
+        )
+    for i in range(vendors):
+        vendor = Vendor.objects.create(agent=agent, name=f"Vendor {n}-{i}")
+        TransactionVendor.objects.create(transaction=txn, vendor=vendor)
+    if not agent.faqs.exists():
+        AgentFAQ.objects.create(agent=agent, question="When?", answer="Soon.")
+    return txn
+
+
+def agent_token(agent):
+    return AgentPortalToken.mint(agent).token
+
+
+def buyer_token(txn):
+    return PortalToken.mint(txn).token
@@ -0,0 +1,45 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TransactionTestCase, override_settings
+
+from portal import audit, metrics
+
+from .fixtures import buyer_token, make_transaction
+
+
+@override_settings(PORTAL_PUBLISH_ENABLED=False)  # no background rebuilds
+class AsyncMiddlewareTests(TransactionTestCase):
+    """
+    TransactionTestCase: under ASGI the views' queries run on worker
+    threads, which can't see a TestCase's uncommitted rows.
+    """
+
+    @override_settings(DEBUG=True)
+    def test_middleware_chain_needs_no_thread_hops(self):
+        with self.assertLogs("django.request", "DEBUG") as logs:
+            logging.getLogger("django.request").debug("loading middleware")
+            ASGIHandler()
+        self.assertEqual([line for line in logs.output if "adapted" in line], [])
+
+    async def test_queries_on_worker_threads_are_counted(self):
+        key = "portal_session|GET"
+        before = metrics.snapshot().get(key, [0] * metrics._WIDTH)[metrics._DB_QUERIES]
+        response = await self.async_client.get("/api/portal/session/?t=missing")
+        self.assertEqual(response.status_code, 401)
+        after = metrics.snapshot()[key][metrics._DB_QUERIES]
+        self.assertGreater(after, before)
+
+    @override_settings(PORTAL_SSE_MAX_SECONDS=0)
+    async def test_event_stream_is_served_async(self):
+        self.addCleanup(audit.flush)  # before the tables are emptied
+        txn = await sync_to_async(make_transaction)()
+        token = await sync_to_async(buyer_token)(txn)
+        response = await self.async_client.get(
+            f"/api/portal/transaction/{txn.id}/events/?t={token}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertIn(b"event: ready", b"".join(chunks))
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from portal import audit
+from portal.models import AuditEntry
+
+from .fixtures import make_transaction
+
+
+def _entries(txn, n):
+    return [
+        AuditEntry(
+            transaction_id=txn.id,
+            model="task",
+            object_id=i,
+            action=AuditEntry.Action.UPDATE,
+            changes={},
+        )
+        for i in range(n)
+    ]
+
+
+@override_settings(PORTAL_AUDIT_BATCH_SIZE=2)
+class BufferTests(TestCase):
+    def setUp(self):
+        audit.flush()
+        self.txn = make_transaction(tasks=0, utilities=0, documents=0, vendors=0)
+        timers = mock.patch.object(audit.threading, "Timer")
+        self.Timer = timers.start()
+        self.addCleanup(timers.stop)
+        self.addCleanup(audit.flush)
+
+    def test_full_buffer_starts_one_immediate_timer(self):
+        audit._enqueue(_entries(self.txn, 1))
+        for _ in range(20):
+            audit._enqueue(_entries(self.txn, 1))
+        delays = [c.args[0] for c in self.Timer.call_args_list]
+        # The interval timer is brought forward once, not once per entry
+        self.assertEqual(delays, [audit._setting("FLUSH_SECONDS", 1.0), 0])
+        self.Timer.return_value.cancel.assert_called_once()
+
+    def test_failed_insert_requeues_entries(self):
+        audit._enqueue(_entries(self.txn, 1))
+        with mock.patch.object(
+            AuditEntry.objects, "bulk_create", side_effect=RuntimeError("db down")
+        ), self.assertLogs("portal.audit", "ERROR"):
+            self.assertEqual(audit.flush(), 0)
+        self.assertEqual(len(audit._buffer), 1)
+        self.assertEqual(audit.flush(), 1)
+        self.assertEqual(AuditEntry.objects.filter(model="task").count(), 1)
+
+    @override_settings(PORTAL_AUDIT_MAX_PENDING=3)
+    def test_requeue_is_capped(self):
+        audit._enqueue(_entries(self.txn, 5))
+        with mock.patch.object(
+            AuditEntry.objects, "bulk_create", side_effect=RuntimeError("db down")
+        ), self.assertLogs("portal.audit", "ERROR") as logs:
+            audit.flush()
+        self.assertEqual([e.object_id for e in audit._buffer], [2, 3, 4])
+        self.assertIn("3 entries re-queued, 2 dropped", logs.output[0])
@@ -0,0 +1,103 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from portal import audit, bulk
+from portal.models import AdminJob, Task
+
+from .fixtures import make_transaction
+
+
+@override_settings(
+    PORTAL_ADMIN_JOB_THRESHOLD=2,
+    PORTAL_ADMIN_JOB_CHUNK=2,
+    PORTAL_ADMIN_JOB_THREAD=False,
+)
+class AdminJobTests(TestCase):
+    def setUp(self):
+        self.addCleanup(audit.flush)
+        self.txn = make_transaction(tasks=5)
+        self.tasks = list(self.txn.tasks.order_by("pk"))
+
+    def submit(self):
+        job = bulk.submit("complete_tasks", Task.objects.all(), "dana")
+        self.assertIsInstance(job, AdminJob)
+        return job
+
+    def completed(self):
+        return list(
+            Task.objects.filter(completed=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def test_small_selection_runs_inline(self):
+        changed = bulk.submit(
+            "complete_tasks", Task.objects.filter(pk=self.tasks[0].pk)
+        )
+        self.assertEqual(changed, 1)
+        self.assertFalse(AdminJob.objects.exists())
+
+    def test_large_selection_stores_pks_and_runs_in_chunks(self):
+        job = self.submit()
+        self.assertEqual(job.selection, [t.pk for t in self.tasks])
+        self.assertEqual(job.total, 5)
+
+        job = bulk.run_job(job.id)
+        self.assertEqual(job.status, AdminJob.Status.DONE)
+        self.assertEqual((job.processed, job.changed), (5, 5))
+        self.assertEqual(self.completed(), job.selection)
+        self.assertIsNone(bulk.run_job(job.id))
+
+    def test_rows_added_after_submit_are_not_touched(self):
+        job = self.submit()
+        extra = Task.objects.create(transaction=self.txn, title="Late", order=9)
+        bulk.run_job(job.id)
+        extra.refresh_from_db()
+        self.assertFalse(extra.completed)
+
+    def test_stale_running_job_is_resumed(self):
+        job = self.submit()
+        # A runner finished the first chunk, then its process died
+        AdminJob.objects.filter(id=job.id).update(
+            status=AdminJob.Status.RUNNING,
+            cursor=self.tasks[1].pk,
+            processed=2,
+            heartbeat_at=timezone.now() - timedelta(minutes=11),
+        )
+        call_command("run_admin_jobs", stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, AdminJob.Status.DONE)
+        self.assertEqual((job.processed, job.changed), (5, 3))
+        self.assertEqual(self.completed(), [t.pk for t in self.tasks[2:]])
+
+    def test_live_running_job_is_left_alone(self):
+        job = self.submit()
+        AdminJob.objects.filter(id=job.id).update(
+            status=AdminJob.Status.RUNNING,
+            heartbeat_at=timezone.now() - timedelta(minutes=9),
+        )
+        self.assertNotIn(job, bulk.runnable())
+        self.assertIsNone(bulk.run_job(job.id))
+        self.assertEqual(self.completed(), [])
+
+    def test_reclaimed_runner_rolls_back_its_chunk(self):
+        job = self.submit()
+        AdminJob.objects.filter(id=job.id).update(
+            status=AdminJob.Status.RUNNING, heartbeat_at=timezone.now()
+        )
+        job.refresh_from_db()
+        # Another runner claims the job before this one's first chunk commits
+        AdminJob.objects.filter(id=job.id).update(
+            heartbeat_at=job.heartbeat_at + timedelta(seconds=1)
+        )
+        with self.assertLogs("portal.bulk", "WARNING"):
+            bulk._run(job, bulk.OPERATIONS["complete_tasks"])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AdminJob.Status.RUNNING)
+        self.assertEqual((job.processed, job.cursor), (0, 0))
+        self.assertEqual(self.completed(), [])
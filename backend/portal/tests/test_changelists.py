@@ -0,0 +1,141 @@
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from portal import profiling
+from portal.admin import TaskAdmin, TransactionAdmin
+from portal.changelists import search_q
+from portal.models import Task, Transaction
+
+from .fixtures import make_agent, make_transaction
+
+
+def _bare(**kwargs):
+    return make_transaction(tasks=0, utilities=0, documents=0, vendors=0, **kwargs)
+
+
+class SearchQTests(TestCase):
+    def setUp(self):
+        self.main = _bare(agent=make_agent(email="Dana.Reyes@Example.com"))
+        self.oak = _bare(agent=make_agent(email="lee@example.com"))
+        Transaction.objects.filter(pk=self.main.pk).update(address="12 Main St")
+        Transaction.objects.filter(pk=self.oak.pk).update(
+            address="12 Oak Ave", lofty_transaction_id="L9"
+        )
+
+    def search(self, fields, term):
+        return set(Transaction.objects.filter(search_q(Transaction, fields, term)))
+
+    def test_prefix_is_a_case_insensitive_range(self):
+        self.assertEqual(self.search(["^address"], "12 MAIN"), {self.main})
+        self.assertEqual(self.search(["^address"], "12 oak"), {self.oak})
+        self.assertEqual(self.search(["^address"], "12 "), {self.main, self.oak})
+        # Inside the string but not at its start
+        self.assertEqual(self.search(["^address"], "Main"), set())
+
+    def test_range_upper_bound_is_exclusive(self):
+        # "12 oal" is the range's upper bound for "12 oak"
+        Transaction.objects.filter(pk=self.main.pk).update(address="12 Oal Ct")
+        self.assertEqual(self.search(["^address"], "12 oak"), {self.oak})
+
+    def test_related_prefix_is_a_subquery(self):
+        q = search_q(Transaction, ["^agent__email"], "dana.")
+        self.assertIn("IN (SELECT", str(Transaction.objects.filter(q).query))
+        self.assertEqual(self.search(["^agent__email"], "dana."), {self.main})
+
+    def test_exact_and_numeric_terms(self):
+        self.assertEqual(self.search(["=lofty_transaction_id"], "L9"), {self.oak})
+        self.assertEqual(self.search(["=lofty_transaction_id"], "L"), set())
+        self.assertEqual(self.search(["^address"], str(self.oak.pk)), {self.oak})
+
+    def test_unindexed_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            search_q(Transaction, ["address"], "Main")
+
+
+@mock.patch.object(TaskAdmin, "list_per_page", 2)
+@mock.patch.object(TransactionAdmin, "list_per_page", 2)
+class ChangeListTests(TestCase):
+    # Session and user, the paginator's MAX(pk) or capped COUNT, the page
+    # rows with their list_select_related joins, and the status filter's
+    # choices on the transaction list
+    TRANSACTION_QUERIES = 5
+    # No filter choices query; the completed filter is a BooleanField
+    TASK_QUERIES = 4
+
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        agent = make_agent()
+        self.txns = [make_transaction(agent=agent, tasks=2) for _ in range(5)]
+        self.txns.reverse()  # newest first, as the changelist lists them
+        # The profiler re-reads its arms once per poll interval, not per request
+        profiling._active_arms()
+
+    def rows(self, response):
+        return [obj.pk for obj in response.context["cl"].result_list]
+
+    def get(self, model, queries, **params):
+        with self.assertNumQueries(queries):
+            response = self.client.get(f"/admin/portal/{model}/", params)
+            # Rendering iterates the rows and their related columns
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_transaction_list(self):
+        response = self.get("transaction", self.TRANSACTION_QUERIES)
+        self.assertEqual(self.rows(response), [t.pk for t in self.txns[:2]])
+        self.assertEqual(response.context["cl"].next_url, f"?after={self.txns[1].pk}")
+
+    def test_transaction_search(self):
+        txn = self.txns[3]
+        Transaction.objects.filter(pk=txn.pk).update(address="77 Sunset Blvd")
+        response = self.get("transaction", self.TRANSACTION_QUERIES, q="77 sun")
+        self.assertEqual(self.rows(response), [txn.pk])
+        self.assertIsNone(response.context["cl"].next_url)
+
+    def test_transaction_after_pages_by_pk(self):
+        response = self.get("transaction", self.TRANSACTION_QUERIES)
+        pks = self.rows(response)
+        while next_url := response.context["cl"].next_url:
+            after = re.search(r"after=(\d+)", next_url)[1]
+            # No paginator count on keyset pages
+            response = self.get(
+                "transaction", self.TRANSACTION_QUERIES - 1, after=after
+            )
+            pks += self.rows(response)
+        self.assertEqual(pks, [t.pk for t in self.txns])
+
+    def test_transaction_search_and_after(self):
+        response = self.get(
+            "transaction",
+            self.TRANSACTION_QUERIES - 1,
+            q=self.txns[0].agent.email,
+            after=self.txns[1].pk,
+        )
+        self.assertEqual(self.rows(response), [t.pk for t in self.txns[2:4]])
+        self.assertIn(f"after={self.txns[3].pk}", response.context["cl"].next_url)
+        self.assertIn("q=", response.context["cl"].next_url)
+
+    def test_task_list_search_and_after(self):
+        tasks = list(Task.objects.order_by("-pk"))
+        response = self.get("task", self.TASK_QUERIES)
+        self.assertEqual(self.rows(response), [t.pk for t in tasks[:2]])
+
+        response = self.get("task", self.TASK_QUERIES, q=self.txns[0].address)
+        self.assertEqual(
+            set(self.rows(response)), {t.pk for t in self.txns[0].tasks.all()}
+        )
+
+        response = self.get("task", self.TASK_QUERIES - 1, after=tasks[1].pk)
+        self.assertEqual(self.rows(response), [t.pk for t in tasks[2:4]])
+
+        response = self.get(
+            "task", self.TASK_QUERIES - 1, q="Task 1", after=tasks[0].pk
+        )
+        self.assertEqual(
+            self.rows(response), [t.pk for t in tasks[1:] if t.title == "Task 1"][:2]
+        )
@@ -0,0 +1,47 @@
+import gzip
+import json
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from portal import compression
+
+BODY = json.dumps(
+    {"documents": [{"url": f"/doc/{i}/?t=secret-token"} for i in range(100)]}
+).encode()
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, accept="gzip, deflate, br"):
+        middleware = compression.CompressionMiddleware(
+            lambda request: HttpResponse(BODY, content_type="application/json")
+        )
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return middleware(request)
+
+    def test_gzip_length_is_randomized(self):
+        responses = [self.respond() for _ in range(20)]
+        self.assertEqual({r["Content-Encoding"] for r in responses}, {"gzip"})
+        self.assertGreater(len({len(r.content) for r in responses}), 1)
+        for response in responses:
+            self.assertEqual(gzip.decompress(response.content), BODY)
+            self.assertEqual(int(response["Content-Length"]), len(response.content))
+
+    def test_padding_stays_within_the_limit(self):
+        plain = compression.compress(BODY, "gzip")
+        for _ in range(20):
+            extra = len(compression.pad(plain, 100)) - len(plain)
+            self.assertTrue(2 <= extra <= 101)  # filename and its NUL
+
+    @override_settings(PORTAL_COMPRESS_MAX_RANDOM_BYTES=0)
+    def test_unpadded_when_disabled(self):
+        with mock.patch.object(compression, "brotli", None):
+            lengths = {len(self.respond().content) for _ in range(5)}
+        self.assertEqual(lengths, {len(compression.compress(BODY, "gzip"))})
+
+    def test_brotli_is_not_negotiated_while_padding(self):
+        with mock.patch.object(compression, "brotli", object()):
+            self.assertEqual(compression.negotiate("br", allow_br=False), None)
+            self.assertEqual(compression.negotiate("br, gzip", allow_br=False), "gzip")
+            self.assertEqual(compression.negotiate("br, gzip"), "br")
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from portal import audit, dedupe
+from portal.models import Brokerage, TransactionVendor, Vendor
+
+from .fixtures import make_agent, make_transaction
+
+
+class DedupeTests(TestCase):
+    def setUp(self):
+        self.addCleanup(audit.flush)
+        self.agent = make_agent()
+
+    def vendor(self, name, category=Vendor.Category.INSPECTOR, **fields):
+        return Vendor.objects.create(
+            agent=self.agent, name=name, category=category, **fields
+        )
+
+    def groups(self):
+        return [
+            {v.name for v in group}
+            for group in dedupe.find_duplicates(Vendor.objects.all())
+        ]
+
+    def test_similar_names_with_shared_contact_merge(self):
+        self.vendor("Acme Home Inspections", phone="(404) 555-0100")
+        self.vendor("Acme Inspections LLC", phone="404.555.0100")
+        self.assertEqual(
+            self.groups(), [{"Acme Home Inspections", "Acme Inspections LLC"}]
+        )
+
+    def test_shared_office_line_alone_is_not_a_duplicate(self):
+        self.vendor("Acme Home Inspections", phone="404-555-0100")
+        self.vendor("Bob Smith Inspections", phone="404-555-0100")
+        self.vendor("Peachtree Lending", Vendor.Category.LENDER, email="desk@x.com")
+        self.vendor(
+            "Peachtree Law", Vendor.Category.CLOSING_ATTORNEY, email="desk@x.com"
+        )
+        self.assertEqual(self.groups(), [])
+
+    @mock.patch.object(dedupe, "trigrams", lambda name: set())
+    @mock.patch.object(dedupe, "_is_duplicate", lambda a, b: True)
+    def test_crowded_contact_blocks_are_skipped(self):
+        # Only the phone block pairs vendors up, and any pair it makes merges
+        for i in range(dedupe.MAX_BLOCK):
+            self.vendor(f"Vendor {i}", phone="000-000-0000")
+        self.assertEqual(len(self.groups()), 1)
+        self.vendor("One too many", phone="000-000-0000")
+        self.assertEqual(self.groups(), [])
+
+    def test_clusters_do_not_chain_across_categories(self):
+        self.vendor("Peachtree Services", Vendor.Category.INSPECTOR)
+        self.vendor("Peachtree Services", Vendor.Category.OTHER)
+        self.vendor("Peachtree Services", Vendor.Category.LENDER)
+        self.assertEqual(len(self.groups()), 1)
+        (group,) = dedupe.find_duplicates()
+        self.assertEqual(len(group), 2)
+
+    def test_overrides_are_not_candidates(self):
+        brokerage = Brokerage.objects.create(name="Peach Realty")
+        shared = Vendor.objects.create(brokerage=brokerage, name="Ace Plumbing")
+        self.vendor("Ace Plumbing", Vendor.Category.OTHER, overrides=shared)
+        self.vendor("Ace Plumbing Co", Vendor.Category.OTHER)
+        self.assertEqual(self.groups(), [])
+
+
+class MergeActionTests(TestCase):
+    def setUp(self):
+        self.addCleanup(audit.flush)
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+        txn = make_transaction(vendors=0)
+        self.keep, self.dup = (
+            Vendor.objects.create(agent=txn.agent, name=name, phone="404-555-0100")
+            for name in ("Ace Plumbing", "Ace Plumbing Co")
+        )
+        TransactionVendor.objects.create(transaction=txn, vendor=self.keep)
+
+    def post(self, **data):
+        return self.client.post(
+            "/admin/portal/vendor/",
+            {
+                "action": "merge_duplicates",
+                ACTION_CHECKBOX_NAME: [self.keep.id, self.dup.id],
+                **data,
+            },
+        )
+
+    def test_preview_deletes_nothing(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [[v.id for v in g] for g in response.context["groups"]],
+            [[self.keep.id, self.dup.id]],
+        )
+        self.assertEqual(Vendor.objects.count(), 2)
+
+    def test_confirm_merges_the_previewed_groups(self):
+        response = self.post(post="yes", group=f"{self.keep.id},{self.dup.id}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Vendor.objects.all()), [self.keep])
+
+    def test_confirm_without_groups_merges_nothing(self):
+        self.post(post="yes")
+        self.assertEqual(Vendor.objects.count(), 2)
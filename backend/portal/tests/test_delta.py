@@ -0,0 +1,87 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from portal import audit, delta
+from portal.models import Tombstone, TransactionVendor, Vendor
+
+from .fixtures import agent_token, make_transaction
+
+
+class TombstoneTests(TestCase):
+    def setUp(self):
+        self.addCleanup(audit.flush)
+        self.txn = make_transaction(vendors=0)
+        self.token = agent_token(self.txn.agent)
+        for name in ("Ace Plumbing", "Bay Roofing", "Cove Pest"):
+            TransactionVendor.objects.create(
+                transaction=self.txn,
+                vendor=Vendor.objects.create(agent=self.txn.agent, name=name),
+                role=TransactionVendor.Role.PREFERRED_VENDOR,
+            )
+
+    def get(self, **params):
+        return self.client.get(
+            f"/api/portal/agent/transaction/{self.txn.id}/",
+            params,
+            HTTP_X_AGENT_TOKEN=self.token,
+        )
+
+    def test_replacing_vendors_writes_tombstones_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f"/api/portal/agent/transaction/{self.txn.id}/vendors/",
+                {"preferred_vendor_ids": []},
+                content_type="application/json",
+                HTTP_X_AGENT_TOKEN=self.token,
+            )
+        self.assertEqual(response.status_code, 200)
+        inserts = [
+            q for q in queries if q["sql"].startswith('INSERT INTO "portal_tombstone"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Tombstone.objects.filter(model="transactionvendor").count(), 3)
+
+    def test_single_delete_writes_its_tombstone(self):
+        self.txn.tasks.first().delete()
+        self.assertEqual(Tombstone.objects.filter(model="task").count(), 1)
+
+    def test_collected_tombstones_are_dropped_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with delta.collecting_deletes():
+                self.txn.tasks.first().delete()
+                raise RuntimeError
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_transaction_cascade_writes_no_tombstones(self):
+        self.txn.delete()
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_prune_keeps_tombstones_a_cursor_can_still_ask_for(self):
+        self.txn.tasks.first().delete()
+        old = Tombstone.objects.get()
+        self.txn.tasks.first().delete()
+        Tombstone.objects.filter(id=old.id).update(
+            deleted_at=timezone.now() - delta.max_cursor_age() - timedelta(hours=1)
+        )
+        out = io.StringIO()
+        call_command("dispatch_webhooks", prune_days=30, stdout=out)
+        self.assertIn("1 tombstones", out.getvalue())
+        self.assertEqual(Tombstone.objects.count(), 1)
+        self.assertNotEqual(Tombstone.objects.get().id, old.id)
+
+    def test_expired_cursor_gets_the_full_payload(self):
+        recent = delta.make_cursor()
+        self.assertIn("deleted", self.get(since=recent).json())
+
+        expired = delta.make_cursor(
+            timezone.now() - delta.max_cursor_age() - timedelta(hours=1)
+        )
+        body = self.get(since=expired).json()
+        self.assertNotIn("deleted", body)
+        self.assertEqual(len(body["preferred_vendors"]), 3)
@@ -0,0 +1,33 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from portal import engagement
+from portal.models import EngagementEvent
+
+from .fixtures import make_transaction
+
+
+@override_settings(PORTAL_ENGAGEMENT_BATCH_SIZE=2)
+class RecordTests(TestCase):
+    def setUp(self):
+        engagement.flush()
+        self.txn = make_transaction(tasks=0, utilities=0, documents=0, vendors=0)
+        timers = mock.patch.object(engagement.threading, "Timer")
+        self.Timer = timers.start()
+        self.addCleanup(timers.stop)
+        self.addCleanup(engagement.flush)
+
+    def test_full_buffer_starts_one_immediate_timer(self):
+        for _ in range(20):
+            engagement.record(EngagementEvent.Kind.LINK_CLICK, self.txn)
+        delays = [c.args[0] for c in self.Timer.call_args_list]
+        self.assertEqual(delays, [engagement._setting("FLUSH_SECONDS", 5.0), 0])
+        self.Timer.return_value.cancel.assert_called_once()
+
+    def test_flush_resets_the_timer(self):
+        engagement.record(EngagementEvent.Kind.LINK_CLICK, self.txn)
+        engagement.record(EngagementEvent.Kind.LINK_CLICK, self.txn)
+        self.assertEqual(engagement.flush(), 2)
+        engagement.record(EngagementEvent.Kind.LINK_CLICK, self.txn)
+        self.assertEqual(self.Timer.call_count, 3)
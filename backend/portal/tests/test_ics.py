@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from portal import ics
+from portal.models import Task, Transaction
+
+from .fixtures import LOCMEM_CACHES, make_agent, make_transaction
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FeedInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.old_agent, self.new_agent = make_agent(), make_agent()
+        self.txn = make_transaction(self.old_agent, tasks=0, utilities=0)
+
+    def test_cached_feed_runs_no_queries(self):
+        ics.agent_feed(self.old_agent)
+        with self.assertNumQueries(0):
+            ics.agent_feed(self.old_agent)
+
+    def test_moving_a_transaction_refreshes_both_agents(self):
+        closing = f"Closing: {self.txn.address}"
+        self.assertIn(closing, ics.agent_feed(self.old_agent)["body"])
+        self.assertNotIn(closing, ics.agent_feed(self.new_agent)["body"])
+
+        txn = Transaction.objects.get(id=self.txn.id)
+        txn.agent = self.new_agent
+        txn.save()
+
+        self.assertNotIn(closing, ics.agent_feed(self.old_agent)["body"])
+        self.assertIn(closing, ics.agent_feed(self.new_agent)["body"])
+
+    def test_moving_a_task_refreshes_the_old_transaction(self):
+        other = make_transaction(self.new_agent, tasks=0, utilities=0)
+        task = Task.objects.create(
+            transaction=self.txn, title="Wire deposit", due_date=date(2030, 1, 2)
+        )
+        self.assertIn("Wire deposit", ics.transaction_feed(self.txn.id)["body"])
+
+        task = Task.objects.get(id=task.id)
+        task.transaction = other
+        task.save()
+
+        self.assertNotIn("Wire deposit", ics.transaction_feed(self.txn.id)["body"])
+        self.assertNotIn("Wire deposit", ics.agent_feed(self.old_agent)["body"])
+        self.assertIn("Wire deposit", ics.transaction_feed(other.id)["body"])
@@ -0,0 +1,135 @@
+import io
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from portal import images
+from portal.models import ImageAsset
+
+
+def _png():
+    buf = io.BytesIO()
+    images.Image.new("RGB", (40, 30), "red").save(buf, "PNG")
+    return buf.getvalue()
+
+
+class _Origin(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.path == "/photo.png":
+            body = _png()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/hop":
+            self.send_response(302)
+            self.send_header("Location", "/photo.png")
+            self.end_headers()
+        elif self.path == "/to-file":
+            self.send_response(302)
+            self.send_header("Location", "file:///etc/passwd")
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@skipIf(images.Image is None, "Pillow is not installed")
+class ImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Origin)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        storage = override_settings(PORTAL_STORAGE={"ROOT": media.name})
+        storage.enable()
+        self.addCleanup(storage.disable)
+        _Origin.hits = 0
+
+    def test_loopback_sources_are_refused(self):
+        with self.assertRaises(images.UnsafeURL):
+            images.fetch(f"{self.origin}/photo.png")
+        self.assertEqual(_Origin.hits, 0)
+
+    @override_settings(PORTAL_IMAGE_ALLOW_PRIVATE=True)
+    def test_redirects_off_http_are_refused(self):
+        with self.assertRaises(images.UnsafeURL):
+            images.fetch(f"{self.origin}/to-file")
+
+    def test_every_redirect_hop_is_checked(self):
+        checked = []
+        with mock.patch.object(images, "_check_peer", side_effect=checked.append):
+            images.fetch(f"{self.origin}/hop")
+        self.assertEqual(len(checked), 2)
+
+    @override_settings(PORTAL_IMAGE_ALLOW_PRIVATE=True)
+    def test_prefetch_renders_and_releases_url(self):
+        url = f"{self.origin}/photo.png"
+        asset = ImageAsset.objects.create(source_url=url)
+        with images._in_flight_lock:
+            images._in_flight.add(url)
+        images._prefetch([url])
+        asset.refresh_from_db()
+        self.assertEqual(asset.status, ImageAsset.Status.READY)
+        self.assertEqual((asset.width, asset.height), (40, 30))
+        self.assertNotIn(url, images._in_flight)
+
+    def test_pending_image_redirects_without_fetching(self):
+        url = f"{self.origin}/photo.png"
+        ImageAsset.objects.create(source_url=url)
+        with mock.patch.object(images, "schedule") as schedule:
+            response = self.client.get("/api/portal/img/", {"src": url})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], url)
+        schedule.assert_called_once_with([url])
+        self.assertEqual(_Origin.hits, 0)
+
+    def test_failed_image_is_retried_after_window(self):
+        url = f"{self.origin}/photo.png"
+        asset = ImageAsset.objects.create(
+            source_url=url,
+            status=ImageAsset.Status.FAILED,
+            fetched_at=timezone.now(),
+        )
+        with mock.patch.object(images, "schedule") as schedule:
+            self.client.get("/api/portal/img/", {"src": url})
+            schedule.assert_not_called()
+
+            ImageAsset.objects.filter(id=asset.id).update(
+                fetched_at=timezone.now() - timedelta(hours=2)
+            )
+            self.client.get("/api/portal/img/", {"src": url})
+            schedule.assert_called_once_with([url])
+        asset.refresh_from_db()
+        self.assertEqual(asset.status, ImageAsset.Status.PENDING)
+
+    def test_schedule_skips_urls_in_flight(self):
+        url = f"{self.origin}/photo.png"
+        with images._in_flight_lock:
+            images._in_flight.add(url)
+        self.addCleanup(images._in_flight.discard, url)
+        with mock.patch.object(images, "_get_executor") as executor:
+            images.schedule([url])
+        executor.assert_not_called()
@@ -0,0 +1,191 @@
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from portal import lofty
+from portal.defaults import DEFAULT_TASK_TEMPLATES, DEFAULT_UTILITY_TEMPLATES
+from portal.models import Buyer, SyncCursor, Transaction
+
+from .fixtures import make_agent
+
+
+class _Lofty(BaseHTTPRequestHandler):
+    """
+    The slice of the Lofty API the sync reads, over `records`.
+    """
+
+    records = []
+    requests = []
+    # Called after each response is built, e.g. to change records mid-run
+    after_request = None
+
+    def do_GET(self):
+        cls = type(self)
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        cls.requests.append(query)
+        since = query.get("updated_since", "")
+        rows = sorted(
+            (r for r in cls.records if r["updated_at"] >= since),
+            key=lambda r: r["updated_at"],
+        )
+        page, size = int(query["page"]), int(query["page_size"])
+        body = json.dumps(
+            {"total": len(rows), "transactions": rows[(page - 1) * size :][:size]}
+        ).encode()
+        if cls.after_request:
+            cls.after_request(len(cls.requests))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _record(n, agent_email, buyer_email, **fields):
+    return {
+        "id": f"L{n}",
+        "updated_at": f"2026-01-0{n}T12:00:00+00:00",
+        "address": f"{n} Lofty Ln",
+        "status": "Active",
+        "closing_date": "2026-03-01",
+        "agent_email": agent_email,
+        "buyer_name": f"Buyer {n}",
+        "buyer_email": buyer_email,
+        **fields,
+    }
+
+
+@override_settings(PORTAL_LOFTY_BATCH_SIZE=3)
+class LoftySyncTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Lofty)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.agent = make_agent(email="Dana.Reyes@Example.com")
+        self.buyer = Buyer.objects.create(name="Pat", email="Pat@Example.com")
+        # Upstream emails differ in case from the portal's
+        _Lofty.records = [
+            _record(1, "dana.reyes@example.com", "PAT@example.com"),
+            _record(2, "DANA.REYES@EXAMPLE.COM", "pat@example.com"),
+            _record(3, "dana.reyes@example.com", "new.buyer@example.com"),
+            _record(4, "dana.reyes@example.com", "New.Buyer@example.com"),
+            _record(5, "nobody@example.com", "pat@example.com"),
+        ]
+        _Lofty.requests = []
+        _Lofty.after_request = None
+
+    def sync(self, **kwargs):
+        client = lofty.LoftyClient(
+            base_url=f"http://127.0.0.1:{self.server.server_port}", retries=1
+        )
+        return lofty.sync(client=client, page_size=2, **kwargs)
+
+    def test_pages_are_read_by_keyset_and_upserted(self):
+        stats = self.sync()
+        # Each page starts at the last updated_at read; overlaps are skipped
+        self.assertEqual(
+            [q.get("updated_since", "")[:10] for q in _Lofty.requests],
+            ["", "2026-01-02", "2026-01-03", "2026-01-04", "2026-01-05"],
+        )
+        self.assertEqual(stats["pages"], 5)
+        self.assertEqual(stats["fetched"], 5)
+        self.assertEqual((stats["created"], stats["skipped"]), (4, 1))
+        self.assertEqual(
+            SyncCursor.objects.get(name=lofty.CURSOR_NAME).cursor,
+            "2026-01-05T12:00:00+00:00",
+        )
+
+    def test_emails_match_case_insensitively(self):
+        stats = self.sync()
+        self.assertEqual(stats["buyers_created"], 1)
+        self.assertEqual(Buyer.objects.count(), 2)
+        self.assertEqual(
+            Transaction.objects.filter(agent=self.agent, buyer=self.buyer).count(), 2
+        )
+
+    def test_new_transactions_get_default_tasks_and_utilities(self):
+        self.sync()
+        txn = Transaction.objects.get(lofty_transaction_id="L1")
+        self.assertEqual(txn.tasks.count(), len(DEFAULT_TASK_TEMPLATES))
+        self.assertEqual(txn.utilities.count(), len(DEFAULT_UTILITY_TEMPLATES))
+
+    def test_dry_run_reports_without_writing(self):
+        stats = self.sync(dry_run=True)
+        self.assertEqual((stats["created"], stats["buyers_created"]), (4, 1))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(SyncCursor.objects.exists())
+
+    def test_unchanged_rerun_writes_nothing(self):
+        self.sync()
+        for full in (False, True):
+            with self.subTest(full=full):
+                # Cursor read, one match query per batch of 3 records, and
+                # the agent/buyer lookups for the still-unmatched record 5
+                queries = 1 + (2 if full else 1) + 2
+                with CaptureQueriesContext(connection) as captured:
+                    with self.assertNumQueries(queries):
+                        stats = self.sync(full=full)
+                self.assertEqual(stats["created"] + stats["updated"], 0)
+                self.assertTrue(
+                    all(
+                        q["sql"].startswith("SELECT") for q in captured.captured_queries
+                    )
+                )
+
+    def test_changed_records_are_updated(self):
+        self.sync()
+        _Lofty.records[0].update(
+            address="1 Renamed Rd", updated_at="2026-01-09T12:00:00+00:00"
+        )
+        stats = self.sync()
+        self.assertEqual((stats["updated"], stats["created"]), (1, 0))
+        self.assertEqual(
+            Transaction.objects.get(lofty_transaction_id="L1").address, "1 Renamed Rd"
+        )
+
+    def test_record_updated_mid_run_is_not_missed(self):
+        def bump_first_record(served):
+            # Record 1 moves to the end, so under offset paging record 3
+            # shifts onto page 1 (already read) and page 2 starts at record 4
+            if served == 1:
+                _Lofty.records[0].update(
+                    address="1 Moved Rd", updated_at="2026-01-09T12:00:00+00:00"
+                )
+
+        _Lofty.after_request = bump_first_record
+        stats = self.sync()
+        self.assertEqual(
+            set(Transaction.objects.values_list("lofty_transaction_id", flat=True)),
+            {"L1", "L2", "L3", "L4"},
+        )
+        self.assertEqual(
+            Transaction.objects.get(lofty_transaction_id="L1").address, "1 Moved Rd"
+        )
+        self.assertEqual(stats["cursor"], "2026-01-09T12:00:00+00:00")
+
+    def test_records_sharing_a_timestamp_are_paged_within_it(self):
+        for record in _Lofty.records:
+            record["updated_at"] = "2026-01-01T12:00:00+00:00"
+        stats = self.sync()
+        self.assertEqual(stats["fetched"], 5)
+        self.assertEqual(
+            [(q.get("updated_since", "")[:10], q["page"]) for q in _Lofty.requests],
+            [("", "1"), ("2026-01-01", "1"), ("2026-01-01", "2"), ("2026-01-01", "3")],
+        )
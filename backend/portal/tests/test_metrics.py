@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import threading
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from portal import metrics
+
+
+def _record_in_thread(method="GET"):
+    thread = threading.Thread(
+        target=metrics.record, args=("view", method, 200, 0.01, 1, 0.001, 10)
+    )
+    thread.start()
+    thread.join()
+
+
+class ShardTests(SimpleTestCase):
+    def test_exited_threads_fold_into_retired_totals(self):
+        before = metrics.snapshot().get("view|GET", [0])[0]
+        live = len(metrics._shards)
+        for _ in range(20):
+            _record_in_thread()
+        self.assertLessEqual(len(metrics._shards), live)
+        self.assertEqual(metrics.snapshot()["view|GET"][0], before + 20)
+
+
+class MiddlewareTests(TestCase):
+    def test_unknown_methods_share_one_label(self):
+        self.client.generic("BREW", "/api/portal/session/")
+        self.client.generic("PROPFIND", "/api/portal/session/")
+        keys = [key for key in metrics.snapshot() if key.endswith("|OTHER")]
+        self.assertTrue(keys)
+        self.assertFalse(
+            [key for key in metrics.snapshot() if key.endswith(("|BREW", "|PROPFIND"))]
+        )
+
+
+class CollectTests(SimpleTestCase):
+    def test_files_of_exited_workers_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dead = os.path.join(directory, "worker-999999999.json")
+            with open(dead, "w") as fh:
+                json.dump({"gone|GET": [1] * metrics._WIDTH}, fh)
+            with override_settings(PORTAL_METRICS_DIR=directory):
+                merged = metrics.collect()
+            self.assertNotIn("gone|GET", merged)
+            self.assertFalse(os.path.exists(dead))
+            self.assertTrue(
+                os.path.exists(os.path.join(directory, f"worker-{os.getpid()}.json"))
+            )
@@ -0,0 +1,77 @@
+import json
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from portal import profiling
+from portal.models import ProfileCapture, ProfilerArm
+
+
+class ProfileDirMixin:
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        profile_dir = override_settings(PORTAL_PROFILE_DIR=root.name)
+        profile_dir.enable()
+        self.addCleanup(profile_dir.disable)
+        for name, value in (("_arms", []), ("_arms_checked_at", None)):
+            patcher = mock.patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class ArmTests(ProfileDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.arm = ProfilerArm.objects.create(
+            path_prefix="/api/portal/session/",
+            remaining=1,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_exhausted_arm_is_not_updated_again(self):
+        self.client.get("/api/portal/session/?t=missing")
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+        self.arm.refresh_from_db()
+        self.assertEqual(self.arm.remaining, 0)
+
+        self.assertFalse(profiling._may_claim("/api/portal/session/"))
+        with self.assertNumQueries(0):
+            self.assertFalse(profiling._may_claim("/api/portal/session/"))
+
+    def test_arm_claimed_elsewhere_stops_matching(self):
+        profiling._active_arms()
+        ProfilerArm.objects.filter(id=self.arm.id).update(remaining=0)
+        self.assertTrue(profiling._may_claim("/api/portal/session/"))
+        self.assertFalse(profiling._claim_arm("/api/portal/session/"))
+        self.assertFalse(profiling._may_claim("/api/portal/session/"))
+
+    def test_unmatched_path_needs_no_queries(self):
+        profiling._active_arms()
+        with self.assertNumQueries(0):
+            self.assertFalse(profiling._may_claim("/admin/"))
+
+
+@override_settings(PORTAL_PUBLISH_ENABLED=False)
+class AsyncProfileTests(ProfileDirMixin, TransactionTestCase):
+    """
+    TransactionTestCase: under ASGI the views' queries run on worker threads.
+    """
+
+    async def test_asgi_requests_are_profiled(self):
+        header = profiling.make_header_value("dana")
+        with mock.patch.object(profiling, "_warned_async", False):
+            with self.assertLogs("portal.profiling", "WARNING"):
+                response = await self.async_client.get(
+                    "/api/portal/session/?t=missing",
+                    headers={profiling.HEADER: header},
+                )
+        self.assertEqual(response.status_code, 401)
+        capture = await ProfileCapture.objects.aget()
+        self.assertGreater(capture.query_count, 0)
+        with open(capture.summary_path) as fh:
+            self.assertTrue(json.load(fh)["event_loop_only"])
@@ -0,0 +1,83 @@
+import tempfile
+import urllib.parse
+from datetime import timedelta
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from portal import engagement, publish, views
+from portal.models import PortalToken, PublishedPortal
+
+from .fixtures import make_transaction
+
+
+class PublishTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        enabled = override_settings(
+            PORTAL_PUBLISH_ENABLED=True, PORTAL_PUBLISH_DIR=root.name
+        )
+        enabled.enable()
+        self.addCleanup(enabled.disable)
+        self.addCleanup(engagement.flush)
+        self.txn = make_transaction()
+
+    def open(self, token):
+        return self.client.get("/api/portal/session/published/", {"t": token.token})
+
+    def fetch(self, url):
+        split = urllib.parse.urlsplit(url)
+        request = RequestFactory().get(split.path + "?" + split.query)
+        return views.published_file(request, split.path.rsplit("/", 1)[1])
+
+    def test_first_publish_survives_a_concurrent_insert(self):
+        write = publish._write_atomic
+
+        def write_while_other_thread_inserts(path, data):
+            # The background rebuild inserts the row after our first read
+            if not PublishedPortal.objects.exists():
+                PublishedPortal.objects.create(
+                    transaction=self.txn, filename="other.json"
+                )
+            write(path, data)
+
+        with mock.patch.object(
+            publish, "_write_atomic", write_while_other_thread_inserts
+        ):
+            published = publish.publish_transaction(self.txn.id)
+        self.assertEqual(
+            PublishedPortal.objects.filter(transaction=self.txn).count(), 1
+        )
+        self.assertEqual(published.previous_filename, "other.json")
+        self.assertTrue(published.filename.startswith(f"{self.txn.id}-"))
+
+    def test_snapshot_link_expires_with_the_token(self):
+        token = PortalToken.mint(self.txn, hours=0)
+        PortalToken.objects.filter(id=token.id).update(
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        token.refresh_from_db()
+        response = self.open(token)
+        self.assertEqual(response.status_code, 302)
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(response["Location"]).query)
+        self.assertEqual(int(query["expires"][0]), int(token.expires_at.timestamp()))
+
+        self.assertEqual(self.fetch(response["Location"]).status_code, 200)
+        with mock.patch.object(publish.time, "time", return_value=10**10):
+            self.assertEqual(self.fetch(response["Location"]).status_code, 403)
+
+    def test_link_is_capped_and_tamper_proof(self):
+        token = PortalToken.mint(self.txn)
+        location = self.open(token)["Location"]
+        expires = int(urllib.parse.parse_qs(location.split("?")[1])["expires"][0])
+        self.assertLessEqual(expires, timezone.now().timestamp() + 3600)
+
+        longer = location.replace(f"expires={expires}", f"expires={expires + 86400}")
+        self.assertEqual(self.fetch(longer).status_code, 403)
+
+    def test_expired_token_gets_no_link(self):
+        token = PortalToken.mint(self.txn)
+        PortalToken.objects.filter(id=token.id).update(expires_at=timezone.now())
+        self.assertEqual(self.open(token).status_code, 401)
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from portal import pubsub
+
+
+class FanOutTests(SimpleTestCase):
+    async def test_publish_from_another_thread_reaches_each_subscriber(self):
+        before = pubsub.subscriber_count()
+        first, second, other = (
+            pubsub.subscribe(7),
+            pubsub.subscribe(7),
+            pubsub.subscribe(8),
+        )
+        try:
+            self.assertEqual(pubsub.subscriber_count(), before + 3)
+            thread = threading.Thread(
+                target=pubsub.publish, args=(7, {"type": "task.toggled"})
+            )
+            thread.start()
+            thread.join()
+            self.assertEqual(await first.get(1), {"type": "task.toggled"})
+            self.assertEqual(await second.get(1), {"type": "task.toggled"})
+            with self.assertRaises(asyncio.TimeoutError):
+                await other.get(0.05)
+        finally:
+            for sub in (first, second, other):
+                pubsub.unsubscribe(sub)
+        self.assertEqual(pubsub.subscriber_count(), before)
+        self.assertNotIn(pubsub.channel_for(7), pubsub._subscribers)
+
+    async def test_subscriber_that_falls_behind_gets_one_resync(self):
+        sub = pubsub.subscribe(9)
+        try:
+            for n in range(pubsub.QUEUE_SIZE + 1):
+                pubsub.publish(9, {"n": n})
+            await asyncio.sleep(0)  # run the call_soon_threadsafe deliveries
+            self.assertEqual(await sub.get(1), {"type": "resync"})
+            self.assertTrue(sub.queue.empty())
+        finally:
+            pubsub.unsubscribe(sub)
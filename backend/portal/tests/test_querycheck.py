@@ -0,0 +1,73 @@
+from django.test import SimpleTestCase, TestCase
+
+from portal import engagement
+from portal.models import Task
+from portal.querycheck import (
+    DuplicateQueryError,
+    assert_max_duplicate_queries,
+    fingerprint,
+)
+
+from .fixtures import agent_token, buyer_token, make_agent, make_transaction
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'x'"),
+            fingerprint("SELECT * FROM t WHERE id = 22 AND name = 'y'"),
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s)"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s)"),
+        )
+
+
+class AssertMaxDuplicateQueriesTests(TestCase):
+    def test_fails_on_n_plus_one(self):
+        txn = make_transaction(tasks=3)
+        with self.assertRaises(DuplicateQueryError):
+            with assert_max_duplicate_queries(threshold=1):
+                for task in Task.objects.filter(transaction=txn):
+                    task.transaction.address  # one query per task
+
+
+class EndpointQueryGuardTests(TestCase):
+    """
+    Regression guards: the payload endpoints must not repeat a query shape
+    however many children a transaction has.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = make_agent()
+        cls.txns = [
+            make_transaction(cls.agent, tasks=5, utilities=3, documents=4, vendors=3)
+            for _ in range(4)
+        ]
+        cls.agent_token = agent_token(cls.agent)
+        cls.buyer_token = buyer_token(cls.txns[0])
+
+    def test_agent_transaction(self):
+        with assert_max_duplicate_queries(threshold=1):
+            response = self.client.get(
+                f"/api/portal/agent/transaction/{self.txns[0].id}/",
+                HTTP_X_AGENT_TOKEN=self.agent_token,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_portal_session(self):
+        self.addCleanup(engagement.flush)  # the open is buffered
+        with assert_max_duplicate_queries(threshold=1):
+            response = self.client.get(f"/api/portal/session/?t={self.buyer_token}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_agent_transactions_batch(self):
+        ids = ",".join(str(txn.id) for txn in self.txns)
+        with assert_max_duplicate_queries(threshold=1):
+            response = self.client.get(
+                f"/api/portal/agent/transactions/batch/?ids={ids}",
+                HTTP_X_AGENT_TOKEN=self.agent_token,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["transactions"]), len(self.txns))
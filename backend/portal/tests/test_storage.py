@@ -0,0 +1,123 @@
+import hashlib
+import os
+import tempfile
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from portal import storage, uploads
+from portal.models import UploadSession
+
+from .fixtures import LOCMEM_CACHES, make_transaction
+
+try:
+    import boto3
+    import requests
+    from moto import mock_aws
+except ImportError:  # optional test dependencies
+    mock_aws = None
+
+BUCKET = "portal-test"
+S3 = {"BACKEND": "s3", "BUCKET": BUCKET, "PREFIX": "t/", "REGION": "us-east-1"}
+
+
+@skipIf(mock_aws is None, "boto3, requests and moto are required")
+@override_settings(PORTAL_STORAGE=S3, PORTAL_SIGNED_URL_TTL=600, CACHES=LOCMEM_CACHES)
+class S3StorageTests(TestCase):
+    def setUp(self):
+        env = mock.patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+                "AWS_DEFAULT_REGION": "us-east-1",
+            },
+        )
+        env.start()
+        self.addCleanup(env.stop)
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        # A fresh client inside the mock for every test
+        storage._storage = None
+        self.storage = storage.get_storage()
+        self.addCleanup(setattr, storage, "_storage", None)
+
+    def test_presigned_upload_pins_checksum(self):
+        data = b"signed purchase agreement"
+        sha256 = hashlib.sha256(data).hexdigest()
+        url, headers = self.storage.presigned_upload_url(
+            "incoming/1", 600, content_type="application/pdf", sha256=sha256
+        )
+        self.assertEqual(headers["x-amz-checksum-sha256"], storage.checksum_b64(sha256))
+        # The checksum header is signed, so a client can't drop or change it
+        self.assertIn("x-amz-checksum-sha256", url.split("X-Amz-SignedHeaders=")[1])
+        self.assertEqual(requests.put(url, data=data, headers=headers).status_code, 200)
+        self.assertEqual(self.storage.size("incoming/1"), len(data))
+        self.assertIsNone(self.storage.head("incoming/2"))
+
+    def test_direct_upload_completes_to_content_address(self):
+        data = b"inspection report"
+        sha256 = hashlib.sha256(data).hexdigest()
+        upload = UploadSession.objects.create(
+            agent=(txn := make_transaction()).agent,
+            transaction=txn,
+            filename="report.pdf",
+            total_size=len(data),
+            direct=True,
+            sha256=sha256,
+        )
+        with self.assertRaises(uploads.UploadError):
+            uploads.complete(upload)
+
+        url, headers = uploads.direct_upload_target(upload)
+        # moto records the checksum only with the SDK's algorithm header (it
+        # doesn't verify it either); the HEAD comparison is what's tested
+        headers["x-amz-sdk-checksum-algorithm"] = "SHA256"
+        self.assertEqual(requests.put(url, data=data, headers=headers).status_code, 200)
+        document, deduplicated = uploads.complete(upload)
+        self.assertFalse(deduplicated)
+        self.assertEqual(document.stored_object.sha256, sha256)
+        self.assertFalse(self.storage.exists(uploads.incoming_key(upload)))
+        self.assertEqual(self.storage.open(uploads.object_key(sha256)).read(), data)
+
+    def test_save_copy_and_download(self):
+        with tempfile.NamedTemporaryFile(delete=False) as fh:
+            fh.write(b"%PDF-1.7 body")
+        self.storage.save_file("incoming/1", fh.name, "application/pdf")
+        self.assertFalse(os.path.exists(fh.name))
+
+        self.storage.copy("incoming/1", "objects/ab/cd/abcd")
+        self.storage.delete("incoming/1")
+        self.assertFalse(self.storage.exists("incoming/1"))
+        self.assertEqual(self.storage.size("objects/ab/cd/abcd"), 13)
+        self.assertEqual(
+            self.storage.open("objects/ab/cd/abcd").read(), b"%PDF-1.7 body"
+        )
+
+        url = storage.signed_download_url("objects/ab/cd/abcd", filename="offer.pdf")
+        response = requests.get(url)
+        self.assertEqual(response.content, b"%PDF-1.7 body")
+        self.assertIn("offer.pdf", response.headers["Content-Disposition"])
+
+    def test_signed_urls_are_cached_until_margin(self):
+        with mock.patch.object(
+            self.storage, "presigned_download_url", side_effect=["url-1", "url-2"]
+        ) as presign:
+            with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+                first = storage.signed_download_url("objects/a", filename="a.pdf")
+                again = storage.signed_download_url("objects/a", filename="a.pdf")
+                other = storage.signed_download_url("objects/a", filename="b.pdf")
+        self.assertEqual((first, again, other), ("url-1", "url-1", "url-2"))
+        self.assertEqual(presign.call_count, 2)
+        # Reused only until PORTAL_SIGNED_URL_MARGIN (300s) before expiry
+        self.assertEqual(cache_set.call_args.kwargs["timeout"], 300)
+
+    @override_settings(PORTAL_STORAGE={"BACKEND": "local"})
+    def test_local_backend_does_not_sign(self):
+        self.assertIsNone(storage.signed_download_url("objects/a"))
@@ -0,0 +1,94 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from portal import uploads
+from portal.models import Document, UploadSession
+
+from .fixtures import agent_token, make_transaction
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(
+            MEDIA_ROOT=media.name, PORTAL_STORAGE={"ROOT": media.name}
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.txn = make_transaction()
+        self.token = agent_token(self.txn.agent)
+        self.upload = UploadSession.objects.create(
+            agent=self.txn.agent,
+            transaction=self.txn,
+            filename="offer.pdf",
+            total_size=8,
+        )
+
+    def put(self, offset, body):
+        return self.client.put(
+            f"/api/portal/agent/uploads/{self.upload.id}/",
+            body,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_X_AGENT_TOKEN=self.token,
+        )
+
+    def complete(self):
+        return self.client.post(
+            f"/api/portal/agent/uploads/{self.upload.id}/complete/",
+            HTTP_X_AGENT_TOKEN=self.token,
+        )
+
+    def test_chunks_then_complete(self):
+        self.assertEqual(self.put(0, b"abcd").json()["offset"], 4)
+        self.assertEqual(self.put(4, b"efgh").json()["offset"], 8)
+        response = self.complete()
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(transaction=self.txn, filename="offer.pdf")
+        self.assertEqual(
+            document.stored_object.sha256, hashlib.sha256(b"abcdefgh").hexdigest()
+        )
+
+    def test_stale_offset_writes_nothing(self):
+        self.put(0, b"abcd")
+        response = self.put(0, b"WXYZ")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 4)
+        with open(uploads.partial_path(self.upload), "rb") as fh:
+            self.assertEqual(fh.read(), b"abcd")
+
+    def test_stale_instance_is_refreshed_under_lock(self):
+        # A request that loaded the session before another chunk landed
+        stale = UploadSession.objects.get(id=self.upload.id)
+        self.put(0, b"abcd")
+        with self.assertRaises(uploads.OffsetMismatch) as cm:
+            uploads.write_chunk(stale, 0, io.BytesIO(b"WXYZ"), 4)
+        self.assertEqual(cm.exception.expected, 4)
+
+    def test_complete_twice_is_a_no_op(self):
+        stale = UploadSession.objects.get(id=self.upload.id)
+        self.put(0, b"abcdefgh")
+        self.assertEqual(self.complete().status_code, 201)
+
+        stale.received = 8
+        document, deduplicated = uploads.complete(stale)
+        self.assertFalse(deduplicated)
+        self.assertEqual(
+            Document.objects.filter(transaction=self.txn, filename="offer.pdf").count(),
+            1,
+        )
+        self.assertEqual(document.filename, "offer.pdf")
+        self.assertFalse(os.path.exists(uploads.partial_path(self.upload)))
+
+    def test_chunk_after_completion_is_refused(self):
+        stale = UploadSession.objects.get(id=self.upload.id)
+        self.put(0, b"abcdefgh")
+        self.complete()
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(stale, 8, io.BytesIO(b"x"), 1)
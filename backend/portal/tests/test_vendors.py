@@ -0,0 +1,104 @@
+from datetime import date
+
+from django.test import TestCase
+
+from portal import audit, defaults
+from portal.models import OutboxEvent, TransactionVendor, Utility, Vendor
+
+from .fixtures import agent_token, make_transaction
+
+
+class AssignUtilitiesTests(TestCase):
+    def setUp(self):
+        self.addCleanup(audit.flush)
+        self.txn = make_transaction(utilities=0, vendors=0)
+        self.token = agent_token(self.txn.agent)
+        defaults.create_for([self.txn])
+        self.power = self.txn.utilities.get(category=Utility.Category.POWER)
+        self.power.due_date = date(2026, 3, 1)
+        self.power.save()
+        self.electric, self.fiber = (
+            Vendor.objects.create(
+                agent=self.txn.agent,
+                category=Vendor.Category.UTILITY,
+                name=name,
+                phone="555-0100",
+            )
+            for name in ("City Electric", "Fiber Co")
+        )
+
+    def assign(self, *vendors):
+        response = self.client.post(
+            f"/api/portal/agent/transaction/{self.txn.id}/vendors/",
+            {"utility_provider_ids": [v.id for v in vendors]},
+            content_type="application/json",
+            HTTP_X_AGENT_TOKEN=self.token,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def providers(self):
+        return set(
+            self.txn.transaction_vendors.filter(
+                role=TransactionVendor.Role.UTILITY
+            ).values_list("vendor__name", flat=True)
+        )
+
+    def test_default_utilities_are_kept(self):
+        self.assign(self.electric)
+        self.assertEqual(
+            self.txn.utilities.count(), len(defaults.DEFAULT_UTILITY_TEMPLATES) + 1
+        )
+        self.power.refresh_from_db()
+        self.assertEqual(self.power.due_date, date(2026, 3, 1))
+
+        self.assign()
+        self.assertEqual(self.providers(), set())
+        self.assertEqual(
+            self.txn.utilities.count(), len(defaults.DEFAULT_UTILITY_TEMPLATES)
+        )
+        self.assertTrue(Utility.objects.filter(id=self.power.id).exists())
+
+    def test_only_changed_providers_are_written(self):
+        self.assign(self.electric)
+        utility = self.txn.utilities.get(provider_name="City Electric")
+        utility.category = Utility.Category.POWER
+        utility.due_date = date(2026, 2, 15)
+        utility.save()
+
+        self.electric.phone = "555-0199"
+        self.electric.save()
+        self.assign(self.electric, self.fiber)
+        self.assertEqual(self.providers(), {"City Electric", "Fiber Co"})
+
+        utility.refresh_from_db()
+        self.assertEqual(utility.phone, "555-0199")
+        self.assertEqual(utility.category, Utility.Category.POWER)
+        self.assertEqual(utility.due_date, date(2026, 2, 15))
+        self.assertTrue(self.txn.utilities.filter(provider_name="Fiber Co").exists())
+
+        self.assign(self.fiber)
+        self.assertEqual(self.providers(), {"Fiber Co"})
+        self.assertFalse(Utility.objects.filter(id=utility.id).exists())
+
+    def test_leaving_out_utility_ids_keeps_providers(self):
+        self.assign(self.electric)
+        response = self.client.post(
+            f"/api/portal/agent/transaction/{self.txn.id}/vendors/",
+            {"preferred_vendor_ids": []},
+            content_type="application/json",
+            HTTP_X_AGENT_TOKEN=self.token,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.providers(), {"City Electric"})
+        event = OutboxEvent.objects.filter(
+            event_type="transaction.vendors_updated"
+        ).latest("id")
+        self.assertEqual(event.data["utility_provider_ids"], [self.electric.id])
+
+    def test_event_lists_linked_providers(self):
+        self.assign(self.fiber, self.electric)
+        event = OutboxEvent.objects.get(event_type="transaction.vendors_updated")
+        self.assertEqual(
+            event.data["utility_provider_ids"],
+            sorted([self.electric.id, self.fiber.id]),
+        )
@@ -0,0 +1,266 @@
+"""
+Chunked, resumable document uploads with content-hash dedup.
+
+Flow (agent token auth):
+  POST  agent/transaction/<id>/uploads/   {filename, size, ...}  -> upload_id
+  PUT   agent/uploads/<upload_id>/        raw bytes, Upload-Offset: <n>
+  GET   agent/uploads/<upload_id>/        -> current offset (resume point)
+  POST  agent/uploads/<upload_id>/complete/                      -> document
+
+Chunks are streamed from the request to MEDIA_ROOT/uploads/partial/ in small
+blocks and fed to a SHA-256 hasher as they are written, so neither a chunk
+nor the file is ever held in memory. The hasher for each upload is cached
+per process; a chunk arriving at another worker (or after a restart) rebuilds
+it once from the partial file. On completion the file moves to its
+content-addressed home, or is dropped if that content is already stored.
+
+Writing a chunk and completing both hold a row lock on the UploadSession,
+so racing requests for one upload run one at a time and see each other's
+offset and completion.
+
+With a storage backend that pre-signs URLs (S3), clients can instead ask for
+a direct upload: they declare the SHA-256 up front and PUT straight to the
+bucket using a signed URL that pins that checksum, so S3 itself rejects any
+other bytes. Completion then only inspects object metadata and copies the
+object server-side to its content-addressed key (or drops it as a duplicate).
+"""
+
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Document, StoredObject, UploadSession
+from .storage import checksum_b64, get_storage, signed_url_ttl
+
+READ_BLOCK = 64 * 1024
+
+# upload id -> (offset the hasher has consumed, hasher)
+_hashers = {}
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, expected):
+        super().__init__(f"expected offset {expected}")
+        self.expected = expected
+
+
+def is_sha256(value):
+    return bool(_SHA256.fullmatch(value))
+
+
+def chunk_bytes():
+    return getattr(settings, "PORTAL_UPLOAD_CHUNK_BYTES", 5 * 1024 * 1024)
+
+
+def max_bytes():
+    return getattr(settings, "PORTAL_UPLOAD_MAX_BYTES", 500 * 1024 * 1024)
+
+
+def partial_path(upload):
+    return os.path.join(
+        str(settings.MEDIA_ROOT), "uploads", "partial", f"{upload.id}.part"
+    )
+
+
+def object_key(sha256):
+    return f"objects/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def incoming_key(upload):
+    return f"incoming/{upload.id}"
+
+
+def _hasher_at(upload):
+    cached = _hashers.pop(upload.id, None)
+    if cached is not None and cached[0] == upload.received:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    remaining = upload.received
+    if remaining:
+        with open(partial_path(upload), "rb") as fh:
+            while remaining:
+                block = fh.read(min(READ_BLOCK, remaining))
+                if not block:
+                    raise UploadError("partial file is shorter than recorded")
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def _lock(upload):
+    """
+    Row-lock `upload` (inside transaction.atomic()) and refresh its progress.
+    """
+    locked = UploadSession.objects.select_for_update().get(id=upload.id)
+    for field in ("received", "completed_at", "document_id"):
+        setattr(upload, field, getattr(locked, field))
+    return upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Append `length` bytes from `stream` at `offset`. Returns the new offset.
+    """
+    with transaction.atomic():
+        _lock(upload)
+        if upload.completed_at is not None:
+            raise UploadError("upload is already complete")
+        if offset != upload.received:
+            raise OffsetMismatch(upload.received)
+        return _write_locked(upload, offset, stream, length)
+
+
+def _write_locked(upload, offset, stream, length):
+    if length <= 0 or length > chunk_bytes():
+        raise UploadError(f"chunk must be 1..{chunk_bytes()} bytes")
+    if offset + length > upload.total_size:
+        raise UploadError("chunk runs past the declared size")
+
+    hasher = _hasher_at(upload)
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    written = 0
+    with open(path, "r+b" if os.path.exists(path) else "wb") as fh:
+        fh.seek(offset)
+        while written < length:
+            block = stream.read(min(READ_BLOCK, length - written))
+            if not block:
+                break
+            fh.write(block)
+            hasher.update(block)
+            written += len(block)
+    if written != length:
+        raise UploadError("request body ended before Content-Length")
+
+    new_offset = offset + written
+    UploadSession.objects.filter(id=upload.id).update(received=new_offset)
+    upload.received = new_offset
+    _hashers[upload.id] = (new_offset, hasher)
+    return new_offset
+
+
+def _create_stored_object(upload, sha256):
+    try:
+        with transaction.atomic():
+            return (
+                StoredObject.objects.create(
+                    sha256=sha256,
+                    size=upload.total_size,
+                    content_type=upload.content_type,
+                    path=object_key(sha256),
+                ),
+                False,
+            )
+    except IntegrityError:
+        # Same content finished concurrently; the bytes we stored are identical.
+        return StoredObject.objects.get(sha256=sha256), True
+
+
+def _store(upload, sha256):
+    """
+    StoredObject for `sha256`, moving the partial file in only if it is new.
+    """
+    existing = StoredObject.objects.filter(sha256=sha256).first()
+    if existing is not None:
+        os.remove(partial_path(upload))
+        return existing, True
+
+    get_storage().save_file(
+        object_key(sha256), partial_path(upload), upload.content_type
+    )
+    return _create_stored_object(upload, sha256)
+
+
+def attach(upload, stored):
+    document = Document.objects.create(
+        transaction=upload.transaction,
+        title=upload.title or upload.filename,
+        doc_type=upload.doc_type,
+        visible_to_buyer=upload.visible_to_buyer,
+        stored_object=stored,
+        filename=upload.filename,
+    )
+    upload.document = document
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=["document", "completed_at"])
+    return document
+
+
+def complete(upload):
+    """
+    Finish the upload; returns (document, deduplicated). Completing an
+    upload that is already complete returns its document again.
+    """
+    with transaction.atomic():
+        _lock(upload)
+        if upload.completed_at is not None:
+            return upload.document, False
+        return _complete_locked(upload)
+
+
+def _complete_locked(upload):
+    if upload.direct:
+        return _complete_direct(upload)
+    if upload.received != upload.total_size:
+        raise UploadError(
+            f"upload incomplete: {upload.received}/{upload.total_size} bytes"
+        )
+
+    sha256 = _hasher_at(upload).hexdigest()
+    stored, deduplicated = _store(upload, sha256)
+    return attach(upload, stored), deduplicated
+
+
+# -----------------------------
+# Direct-to-storage uploads
+# -----------------------------
+
+
+def direct_upload_target(upload):
+    """
+    (url, headers) the client must PUT the whole file to.
+    """
+    return get_storage().presigned_upload_url(
+        incoming_key(upload),
+        signed_url_ttl(),
+        content_type=upload.content_type,
+        sha256=upload.sha256,
+    )
+
+
+def _complete_direct(upload):
+    storage = get_storage()
+    key = incoming_key(upload)
+    head = storage.head(key, checksum=True)
+    if head is None:
+        raise UploadError("file has not been uploaded to storage yet")
+    if head.get("ContentLength") != upload.total_size or head.get(
+        "ChecksumSHA256"
+    ) != checksum_b64(upload.sha256):
+        storage.delete(key)
+        raise UploadError("stored file does not match the declared size/checksum")
+
+    existing = StoredObject.objects.filter(sha256=upload.sha256).first()
+    if existing is not None:
+        storage.delete(key)
+        stored, deduplicated = existing, True
+    else:
+        storage.copy(key, object_key(upload.sha256))
+        storage.delete(key)
+        stored, deduplicated = _create_stored_object(upload, upload.sha256)
+
+    upload.received = upload.total_size
+    upload.save(update_fields=["received"])
+    return attach(upload, stored), deduplicated
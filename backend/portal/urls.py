@@ -5,17 +5,39 @@ urlpatterns = [
     # --- Buyer Portal ---
     path("invite/<int:transaction_id>/", views.invite_buyer),
     path("session/", views.portal_session),
+    path("session/published/", views.published_session),
     path("tasks/<int:task_id>/toggle/", views.toggle_task),
+    path("documents/<int:document_id>/download/", views.document_download),
+    path("engagement/", views.engagement_ingest),
+    # --- Images (proxied, resized, content-addressed) ---
+    path("img/", views.image_proxy),
+    path(
+        "img/<str:content_hash>/<int:width>.<str:fmt>",
+        views.image_variant,
+    ),
     # --- Agent Portal ---
     path("agent/signup/", views.agent_signup),
     path("agent/invite/<int:agent_id>/", views.invite_agent),
     path("agent/session/", views.agent_session),
+    path("agent/engagement/", views.agent_engagement),
+    path("agent/stats/", views.agent_stats),
+    path("agent/calendar.ics", views.agent_calendar),
     # Transactions
     path("agent/transaction/create/", views.agent_transaction_create),
     path("agent/transaction/<int:transaction_id>/", views.agent_transaction),
+    path("agent/transactions/batch/", views.agent_transactions_batch),
+    path(
+        "agent/transaction/<int:transaction_id>/save/",
+        views.agent_transaction_save,
+    ),
+    path(
+        "agent/transaction/<int:transaction_id>/history/",
+        views.agent_transaction_history,
+    ),
     # Vendors & Utilities
     path("agent/vendors/", views.agent_vendors),
     path("agent/vendor/create/", views.agent_vendor_create),
+    path("agent/vendors/<int:vendor_id>/", views.agent_vendor),
     path(
         "agent/transaction/<int:transaction_id>/vendors/",
         views.agent_set_transaction_vendors,
@@ -25,4 +47,15 @@ urlpatterns = [
         "agent/transaction/<int:transaction_id>/utilities/set/",
         views.agent_set_transaction_vendors,
     ),
+    # Document uploads
+    path(
+        "agent/transaction/<int:transaction_id>/uploads/",
+        views.agent_upload_create,
+    ),
+    path("agent/uploads/<uuid:upload_id>/", views.agent_upload),
+    path("agent/uploads/<uuid:upload_id>/complete/", views.agent_upload_complete),
+    # Calendar feeds
+    path("transaction/<int:transaction_id>/calendar.ics", views.transaction_calendar),
+    # Live updates (SSE)
+    path("transaction/<int:transaction_id>/events/", views.transaction_events),
 ]
@@ -0,0 +1,91 @@
+"""
+Vendor library resolution: an agent's own vendors plus their brokerage's
+shared library.
+
+Shared entries (Vendor.brokerage set) are stored once per brokerage, and
+TransactionVendor links point at them directly. Editing a shared entry as
+an agent is copy-on-write: the agent gets a private copy with
+`overrides=<shared entry>`, and from then on that copy hides the shared
+entry in the agent's library. Hiding a shared entry is an override with
+is_favorite=False.
+
+library() resolves all of this in one query. Agent rows come from the
+(agent, category, name) index. Shared rows come from the (brokerage,
+category, name) index, minus those with an override, found through the
+partial unique (agent, overrides) index.
+"""
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import TransactionVendor, Vendor
+
+EDITABLE_FIELDS = (
+    "name",
+    "category",
+    "phone",
+    "email",
+    "website",
+    "notes",
+    "is_favorite",
+)
+
+
+def library(agent):
+    """
+    Every vendor `agent` can see and link: own rows, plus shared rows of
+    their brokerage that they haven't overridden.
+    """
+    visible = Q(agent_id=agent.id)
+    if agent.brokerage_id:
+        shadowed = Vendor.objects.filter(agent_id=agent.id, overrides=OuterRef("pk"))
+        visible |= Q(brokerage_id=agent.brokerage_id) & ~Exists(shadowed)
+    return Vendor.objects.filter(visible)
+
+
+@transaction.atomic
+def update_for_agent(agent, vendor, changes):
+    """
+    Apply `changes` (a subset of EDITABLE_FIELDS) as `agent`. Own rows are
+    updated in place. A shared row is copied into an override, and the
+    agent's transaction links move to the copy. Returns the row written.
+    """
+    changes = {f: v for f, v in changes.items() if f in EDITABLE_FIELDS}
+    if vendor.agent_id == agent.id:
+        for field, value in changes.items():
+            setattr(vendor, field, value)
+        vendor.save()
+        return vendor
+
+    copy = Vendor(
+        agent=agent,
+        overrides=vendor,
+        **{f: getattr(vendor, f) for f in EDITABLE_FIELDS},
+    )
+    for field, value in changes.items():
+        setattr(copy, field, value)
+    copy.save()
+    for link in TransactionVendor.objects.filter(
+        vendor=vendor, transaction__agent=agent
+    ):
+        # Saved one by one so updated_at and the change signals fire
+        link.vendor = copy
+        link.save(update_fields=["vendor", "updated_at"])
+    return copy
+
+
+@transaction.atomic
+def share(vendor):
+    """
+    Move an agent's own vendor into their brokerage's library; returns False
+    when it can't be shared (no brokerage, already shared, or an override).
+    """
+    if vendor.agent_id is None or vendor.overrides_id is not None:
+        return False
+    brokerage_id = vendor.agent.brokerage_id
+    if brokerage_id is None:
+        return False
+    vendor.agent = None
+    vendor.brokerage_id = brokerage_id
+    vendor.save(update_fields=["agent", "brokerage"])
+    return True
@@ -1,3 +1,25 @@
+import asyncio
+import json
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseNotFound,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from django.views.static import serve
 from rest_framework.decorators import (
     api_view,
     authentication_classes,
@@ -9,6 +31,8 @@ from rest_framework import status
 
 from .models import (
     Agent,
+    AgentFAQ,
+    AuditEntry,
     Buyer,
     AgentPortalToken,
     Transaction,
@@ -18,65 +42,43 @@ from .models import (
     Task,
     TransactionVendor,
     Vendor,
+    ImageAsset,
+    UploadSession,
+)
+from . import (
+    audit,
+    defaults,
+    delta,
+    downloads,
+    engagement,
+    events,
+    ics,
+    images,
+    publish,
+    pubsub,
+    reminders,
+    rollups,
+    uploads,
+    vendors,
 )
 from .serializers import TransactionSerializer
+from .storage import get_storage, signed_download_url
 
 
 # -----------------------------
 # Buyer Portal (magic link)
 # -----------------------------
-# ---------- Defaults for new Transactions (demo-friendly templates) ----------
-
-DEFAULT_TASK_TEMPLATES = [
-    {
-        "title": "Schedule home inspection",
-        "description": "Coordinate with buyer + inspector.",
-        "order": 10,
-    },
-    {
-        "title": "Review inspection report",
-        "description": "Discuss repairs / concessions.",
-        "order": 20,
-    },
-    {
-        "title": "Confirm appraisal scheduled",
-        "description": "Lender will coordinate appraisal.",
-        "order": 30,
-    },
-    {
-        "title": "Shop homeowners insurance",
-        "description": "Buyer to bind policy before closing.",
-        "order": 40,
-    },
-    {
-        "title": "Set up utilities (power/water/internet)",
-        "description": "Transfer service effective on closing date.",
-        "order": 50,
-    },
-    {
-        "title": "Review Closing Disclosure (CD)",
-        "description": "Buyer signs and confirms cash-to-close.",
-        "order": 60,
-    },
-    {
-        "title": "Final walkthrough",
-        "description": "Confirm property condition before closing.",
-        "order": 70,
-    },
-    {
-        "title": "Bring ID + funds to closing",
-        "description": "Wire/Certified funds per attorney instructions.",
-        "order": 80,
-    },
-]
-
-DEFAULT_UTILITY_TEMPLATES = [
-    {"category": "power", "provider_name": "Power Company (add provider)"},
-    {"category": "water", "provider_name": "Water Company (add provider)"},
-    {"category": "gas", "provider_name": "Gas Company (if applicable)"},
-    {"category": "internet", "provider_name": "Internet Provider (add provider)"},
-    {"category": "trash", "provider_name": "Trash Service (if applicable)"},
-    {"category": "hoa", "provider_name": "HOA Contact (if applicable)"},
+# Most buyer UI events accepted per engagement request
+ENGAGEMENT_MAX_EVENTS = 20
+
+# Transaction fields whose changes are reported as transaction.updated events
+TRANSACTION_EVENT_FIELDS = [
+    "address",
+    "closing_date",
+    "hero_image_url",
+    "homestead_exemption_url",
+    "my_documents_url",
+    "review_url",
 ]
 
 
@@ -132,51 +134,298 @@ def portal_session(request):
 
     txn = pt.transaction
 
-    tasks = [
-        {
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "due_date": task.due_date,
-            "completed": task.completed,
-        }
-        for task in txn.tasks.all()
-    ]
+    since, err = _parse_since(request)
+    if err:
+        return err
+    if since is not None:
+        return _delta_response(txn, since, token_value, for_buyer=True)
+    engagement.record(engagement.Kind.PORTAL_OPEN, txn)
+    return Response(buyer_session_payload(txn, token_value))
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def engagement_ingest(request):
+    """
+    Buyer UI click tracking: ?t=TOKEN with
+    {"events": [{"kind": "vendor_click", "object_id": 3, "target": ""}]}.
+    Events are buffered in memory, not written per request.
+    """
+    token_value = request.query_params.get("t", "")
+    if not token_value:
+        return Response({"error": "missing token"}, status=status.HTTP_400_BAD_REQUEST)
+
+    pt = (
+        PortalToken.objects.select_related("transaction")
+        .filter(token=token_value)
+        .first()
+    )
+    if pt is None or not pt.is_valid():
+        return Response({"error": "invalid token"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = request.data if isinstance(request.data, dict) else {}
+    items = data.get("events") or []
+    if not isinstance(items, list) or len(items) > ENGAGEMENT_MAX_EVENTS:
+        return Response(
+            {"error": f"events must be a list of at most {ENGAGEMENT_MAX_EVENTS}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    accepted = 0
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if item.get("kind") not in engagement.CLIENT_KINDS:
+            continue
+        object_id = item.get("object_id")
+        if not isinstance(object_id, int) or object_id <= 0:
+            object_id = None
+        engagement.record(
+            item["kind"],
+            pt.transaction,
+            object_id=object_id,
+            target=str(item.get("target") or ""),
+        )
+        accepted += 1
+    return Response({"accepted": accepted}, status=status.HTTP_202_ACCEPTED)
+
+
+@require_GET
+def published_session(request):
+    """
+    ?t=TOKEN -> redirect to the transaction's static snapshot (see
+    portal/publish.py), so the payload itself is served without Python.
+    The link is signed to expire with the token. Falls back to the live
+    session endpoint when publishing is off.
+    """
+    token_value = request.GET.get("t", "")
+    if not token_value:
+        return JsonResponse({"error": "missing token"}, status=400)
+
+    pt = (
+        PortalToken.objects.select_related("transaction__published")
+        .filter(token=token_value)
+        .first()
+    )
+    if pt is None:
+        return JsonResponse({"error": "invalid token"}, status=401)
+    if not pt.is_valid():
+        return JsonResponse({"error": "expired token"}, status=401)
+
+    published = getattr(pt.transaction, "published", None)
+    if published is None and publish.enabled():
+        published = publish.publish_transaction(pt.transaction_id)
+    if published is None:
+        target = f"/api/portal/session/?t={token_value}"  # counts the open
+    else:
+        target = publish.signed_url(published.filename, pt.expires_at)
+        engagement.record(engagement.Kind.PORTAL_OPEN, pt.transaction)
+
+    response = HttpResponseRedirect(target)
+    # The target changes with every edit; only the snapshot is cacheable
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@require_GET
+def published_file(request, filename):
+    """
+    A snapshot behind a publish.signed_url() link. Stands in for nginx's
+    secure_link check under DEBUG (see config/urls.py).
+    """
+    if not publish.link_is_valid(
+        request.path, request.GET.get("md5"), request.GET.get("expires")
+    ):
+        return HttpResponseForbidden()
+    return serve(request, filename, document_root=publish.publish_dir())
+
+
+# Everything transaction_payload() reads, in one query per relation. A
+# batch shares them, so N transactions cost the same queries as one.
+TRANSACTION_DETAIL_PREFETCHES = (
+    "tasks",
+    Prefetch(
+        "utilities",
+        queryset=Utility.objects.order_by("category", "provider_name"),
+        to_attr="sorted_utilities",
+    ),
+    Prefetch(
+        "documents",
+        queryset=Document.objects.filter(visible_to_buyer=True)
+        .select_related("stored_object")
+        .order_by("-uploaded_at"),
+        to_attr="buyer_documents",
+    ),
+    Prefetch(
+        "transaction_vendors",
+        queryset=TransactionVendor.objects.select_related("vendor"),
+        to_attr="vendor_links",
+    ),
+    Prefetch(
+        "agent__faqs",
+        queryset=AgentFAQ.objects.filter(is_active=True).order_by("sort_order", "id"),
+        to_attr="active_faqs",
+    ),
+)
+
+
+def transaction_version(txn):
+    """
+    Opaque stamp of `txn`'s last save, for agent_transaction_save's
+    stale-write check.
+    """
+    return format(int(txn.updated_at.timestamp() * 1_000_000), "x")
+
+
+def _prefetched(obj, attr, queryset):
+    """
+    The list a TRANSACTION_DETAIL_PREFETCHES entry left on `obj`, or
+    `queryset` when it wasn't prefetched.
+    """
+    return getattr(obj, attr) if hasattr(obj, attr) else queryset
 
+
+def transaction_payload(txn, token_value, for_buyer):
+    """
+    The full payload for `txn`: the buyer portal's, or with for_buyer=False
+    the agent UI's (which adds utility_providers and version). Load `txn` with
+    select_related("buyer", "agent") and TRANSACTION_DETAIL_PREFETCHES.
+    """
+    cursor = delta.make_cursor()
+
+    tasks = [_session_task(task) for task in txn.tasks.all()]
     utilities = [
-        {
-            "id": u.id,
-            "category": u.category,
-            "category_label": u.get_category_display(),
-            "provider_name": u.provider_name,
-            "phone": u.phone,
-            "website": u.website,
-            "account_number_hint": u.account_number_hint,
-            "notes": u.notes,
-            "due_date": u.due_date,
-        }
-        for u in txn.utilities.order_by("category", "provider_name")
+        _session_utility(u)
+        for u in _prefetched(
+            txn, "sorted_utilities", txn.utilities.order_by("category", "provider_name")
+        )
     ]
-
     documents = [
-        {
-            "id": d.id,
-            "title": d.title,
-            "doc_type": getattr(d, "doc_type", ""),
-            "url": (
-                getattr(d, "url", "")
-                or (d.file.url if hasattr(d, "file") and getattr(d, "file") else "")
-            ),
-            "uploaded_at": d.uploaded_at,
-        }
-        for d in txn.documents.filter(visible_to_buyer=True).order_by("-uploaded_at")
+        _session_document(d, token_value)
+        for d in _prefetched(
+            txn,
+            "buyer_documents",
+            txn.documents.filter(visible_to_buyer=True)
+            .select_related("stored_object")
+            .order_by("-uploaded_at"),
+        )
+    ]
+
+    closing_attorney, preferred_vendors, utility_providers = _vendor_sections(txn)
+
+    faqs = [
+        {"id": f.id, "q": f.question, "a": f.answer}
+        for f in _prefetched(
+            txn.agent,
+            "active_faqs",
+            txn.agent.faqs.filter(is_active=True).order_by("sort_order", "id"),
+        )
     ]
 
+    body = {
+        "buyer": {"name": txn.buyer.name, "email": txn.buyer.email},
+        "agent": {
+            "name": txn.agent.name,
+            "email": txn.agent.email,
+            "photo_url": getattr(txn.agent, "photo_url", ""),
+            "brokerage_logo_url": getattr(txn.agent, "brokerage_logo_url", ""),
+        },
+        "property": {"address": txn.address, "hero_image_url": txn.hero_image_url},
+        "transaction": TransactionSerializer(txn).data,
+        "tasks": tasks,
+        "utilities": utilities,
+        "documents": documents,
+        "closing_attorney": closing_attorney,
+        "preferred_vendors": preferred_vendors,
+    }
+    if not for_buyer:
+        body["utility_providers"] = utility_providers
+        body["version"] = transaction_version(txn)
+    body["homestead_exemption_url"] = getattr(txn, "homestead_exemption_url", "")
+    body["review_url"] = getattr(txn, "review_url", "")
+    body["faqs"] = faqs
+    body["my_documents_url"] = getattr(txn, "my_documents_url", "")
+    if for_buyer:
+        body["images"] = images.variants_for(
+            [txn.hero_image_url, txn.agent.photo_url, txn.agent.brokerage_logo_url]
+        )
+    body["cursor"] = cursor
+    return body
+
+
+def buyer_session_payload(txn, token_value):
+    """
+    The buyer portal payload for `txn` (also rendered to static snapshots
+    by portal/publish.py, with token_value=None).
+    """
+    return transaction_payload(txn, token_value, for_buyer=True)
+
+
+def document_download_url(document, token_value):
+    """
+    Direct (pre-signed, cached) storage URL when the backend supports it,
+    otherwise the token-checked download endpoint. With token_value=None
+    (shared snapshots) it is always the endpoint, ending in "?t=" for the
+    client to append its own token.
+    """
+    if not document.stored_object_id:
+        return ""
+    if token_value is None:
+        return f"/api/portal/documents/{document.id}/download/?t="
+    stored = document.stored_object
+    signed = signed_download_url(stored.path, document.filename, stored.content_type)
+    if signed:
+        return signed
+    return f"/api/portal/documents/{document.id}/download/?t={token_value}"
+
+
+def _session_task(task):
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "due_date": task.due_date,
+        "completed": task.completed,
+    }
+
+
+def _session_utility(u):
+    return {
+        "id": u.id,
+        "category": u.category,
+        "category_label": u.get_category_display(),
+        "provider_name": u.provider_name,
+        "phone": u.phone,
+        "website": u.website,
+        "account_number_hint": u.account_number_hint,
+        "notes": u.notes,
+        "due_date": u.due_date,
+    }
+
+
+def _session_document(d, token_value):
+    return {
+        "id": d.id,
+        "title": d.title,
+        "doc_type": getattr(d, "doc_type", ""),
+        "url": getattr(d, "url", "") or document_download_url(d, token_value),
+        "uploaded_at": d.uploaded_at,
+    }
+
+
+def _vendor_sections(txn):
+    """
+    (closing_attorney, preferred_vendors, utility_providers) for `txn`.
+    """
     closing_attorney = None
     preferred_vendors = []
+    utility_providers = []
 
-    tv_qs = txn.transaction_vendors.select_related("vendor").all()
-    for tv in tv_qs:
+    links = _prefetched(
+        txn, "vendor_links", txn.transaction_vendors.select_related("vendor")
+    )
+    for tv in links:
         v = tv.vendor
         payload = {
             "id": v.id,
@@ -189,43 +438,103 @@ def portal_session(request):
             "notes": tv.notes_override or v.notes,
             "is_favorite": v.is_favorite,
         }
+
         if tv.role == TransactionVendor.Role.CLOSING_ATTORNEY:
             closing_attorney = payload
         elif tv.role == TransactionVendor.Role.PREFERRED_VENDOR:
             if str(v.category) != "utility":
                 preferred_vendors.append(payload)
+        elif tv.role == TransactionVendor.Role.UTILITY:
+            utility_providers.append(payload)
 
-    faqs = (
-        [
-            {"id": f.id, "q": f.question, "a": f.answer}
-            for f in txn.agent.faqs.filter(is_active=True).order_by("sort_order", "id")
-        ]
-        if hasattr(txn.agent, "faqs")
-        else []
-    )
+    return closing_attorney, preferred_vendors, utility_providers
 
-    return Response(
-        {
-            "buyer": {"name": txn.buyer.name, "email": txn.buyer.email},
-            "agent": {
-                "name": txn.agent.name,
-                "email": txn.agent.email,
-                "photo_url": getattr(txn.agent, "photo_url", ""),
-                "brokerage_logo_url": getattr(txn.agent, "brokerage_logo_url", ""),
-            },
-            "property": {"address": txn.address, "hero_image_url": txn.hero_image_url},
-            "transaction": TransactionSerializer(txn).data,
-            "tasks": tasks,
-            "utilities": utilities,
-            "documents": documents,
-            "closing_attorney": closing_attorney,
-            "preferred_vendors": preferred_vendors,
-            "homestead_exemption_url": getattr(txn, "homestead_exemption_url", ""),
-            "review_url": getattr(txn, "review_url", ""),
-            "faqs": faqs,
-            "my_documents_url": getattr(txn, "my_documents_url", ""),
+
+def _agent_vendor(v):
+    """
+    A vendor as listed in the agent's library.
+    """
+    return {
+        "id": v.id,
+        "name": v.name,
+        "category": v.category,
+        "category_label": v.get_category_display(),
+        "phone": v.phone,
+        "email": v.email,
+        "website": v.website,
+        "notes": v.notes,
+        "is_favorite": v.is_favorite,
+        "shared": v.is_shared,
+    }
+
+
+def _parse_since(request):
+    """
+    (since datetime or None, error Response or None) from ?since=.
+    """
+    value = request.query_params.get("since", "")
+    if not value:
+        return None, None
+    try:
+        since = delta.parse_cursor(value)
+    except delta.InvalidCursor:
+        return None, Response(
+            {"error": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    if delta.is_expired(since):
+        return None, None  # its tombstones may be pruned; send everything
+    return since, None
+
+
+def _delta_response(txn, since, token_value, for_buyer):
+    """
+    Only what changed on `txn` after `since`: changed rows, deleted ids and
+    a new cursor. Transaction fields and the vendor sections are included
+    (whole) only when they changed.
+    """
+    cursor = delta.make_cursor()
+    deleted = delta.deleted_ids(txn.id, since)
+
+    documents = []
+    for d in delta.changed(txn.documents.select_related("stored_object"), since):
+        if not d.visible_to_buyer:
+            deleted["documents"].append(d.id)  # hidden, as in the full payload
+        else:
+            documents.append(_session_document(d, token_value))
+
+    body = {
+        "cursor": cursor,
+        "tasks": [_session_task(t) for t in delta.changed(txn.tasks.all(), since)],
+        "utilities": [
+            _session_utility(u) for u in delta.changed(txn.utilities.all(), since)
+        ],
+        "documents": documents,
+    }
+
+    if txn.updated_at > since:
+        body["property"] = {
+            "address": txn.address,
+            "hero_image_url": txn.hero_image_url,
         }
-    )
+        body["transaction"] = TransactionSerializer(txn).data
+        body["homestead_exemption_url"] = txn.homestead_exemption_url
+        body["review_url"] = txn.review_url
+        body["my_documents_url"] = txn.my_documents_url
+
+    # Vendor links are keyed by vendor id in the payload, so any change to
+    # them resends the (small) vendor sections instead of link ids.
+    if (
+        deleted.pop("transaction_vendors")
+        or delta.changed(txn.transaction_vendors.all(), since).exists()
+    ):
+        closing_attorney, preferred_vendors, utility_providers = _vendor_sections(txn)
+        body["closing_attorney"] = closing_attorney
+        body["preferred_vendors"] = preferred_vendors
+        if not for_buyer:
+            body["utility_providers"] = utility_providers
+
+    body["deleted"] = deleted
+    return Response(body)
 
 
 # -----------------------------
@@ -267,6 +576,7 @@ def _get_agent_from_token(request):
             {"error": "expired token"}, status=status.HTTP_401_UNAUTHORIZED
         )
 
+    audit.set_actor(f"agent:{at.agent_id}")
     return at.agent, None
 
 
@@ -312,23 +622,10 @@ def agent_session(request):
         for txn in txns
     ]
 
-    favs_qs = Vendor.objects.filter(agent=agent, is_favorite=True).order_by(
-        "category", "name"
+    favs_qs = (
+        vendors.library(agent).filter(is_favorite=True).order_by("category", "name")
     )
-    favorites = [
-        {
-            "id": v.id,
-            "name": v.name,
-            "category": v.category,
-            "category_label": v.get_category_display(),
-            "phone": v.phone,
-            "email": v.email,
-            "website": v.website,
-            "notes": v.notes,
-            "is_favorite": v.is_favorite,
-        }
-        for v in favs_qs
-    ]
+    favorites = [_agent_vendor(v) for v in favs_qs]
 
     return Response(
         {
@@ -345,6 +642,34 @@ def agent_session(request):
     )
 
 
+def _update_transaction(txn, payload):
+    """
+    Apply the editable fields present in `payload` to `txn` and save it.
+    Call inside transaction.atomic() (the event is written with the save).
+    """
+    before = {f: getattr(txn, f) for f in TRANSACTION_EVENT_FIELDS}
+
+    if "address" in payload:
+        txn.address = payload.get("address", "") or ""
+    if "closing_date" in payload:
+        txn.closing_date = payload.get("closing_date") or None
+    if "hero_image_url" in payload:
+        txn.hero_image_url = payload.get("hero_image_url", "") or ""
+    if "homestead_exemption_url" in payload:
+        txn.homestead_exemption_url = payload.get("homestead_exemption_url", "") or ""
+    if "my_documents_url" in payload:
+        txn.my_documents_url = payload.get("my_documents_url", "") or ""
+    if "review_url" in payload:
+        txn.review_url = payload.get("review_url", "") or ""
+
+    txn.save()
+    # Re-read so closing_date is a date, not the posted string
+    txn.refresh_from_db(fields=TRANSACTION_EVENT_FIELDS)
+    events.transaction_updated(
+        txn, events.changes(txn, before, TRANSACTION_EVENT_FIELDS)
+    )
+
+
 @api_view(["GET", "PATCH"])
 @authentication_classes([])
 @permission_classes([AllowAny])
@@ -352,142 +677,172 @@ def agent_transaction(request, transaction_id):
     agent, err = _get_agent_from_token(request)
     if err:
         return err
+    token_value = _extract_agent_token(request)
 
+    since, err = _parse_since(request)
+    if err:
+        return err
+    if request.method != "GET":
+        since = None
+
+    qs = Transaction.objects.select_related("buyer", "agent")
+    if since is None:
+        qs = qs.prefetch_related(*TRANSACTION_DETAIL_PREFETCHES)
     try:
-        txn = (
-            Transaction.objects.select_related("buyer", "agent")
-            .prefetch_related(
-                "tasks", "utilities", "documents", "transaction_vendors__vendor"
-            )
-            .get(id=transaction_id, agent=agent)
-        )
+        txn = qs.get(id=transaction_id, agent=agent)
     except Transaction.DoesNotExist:
         return Response(
             {"error": "transaction not found"}, status=status.HTTP_404_NOT_FOUND
         )
 
+    if since is not None:
+        return _delta_response(txn, since, token_value, for_buyer=False)
+
     if request.method == "PATCH":
-        payload = request.data or {}
-
-        if "address" in payload:
-            txn.address = payload.get("address", "") or ""
-        if "closing_date" in payload:
-            txn.closing_date = payload.get("closing_date") or None
-        if "hero_image_url" in payload:
-            txn.hero_image_url = payload.get("hero_image_url", "") or ""
-        if "homestead_exemption_url" in payload:
-            txn.homestead_exemption_url = (
-                payload.get("homestead_exemption_url", "") or ""
-            )
-        if "my_documents_url" in payload:
-            txn.my_documents_url = payload.get("my_documents_url", "") or ""
-        if "review_url" in payload:
-            txn.review_url = payload.get("review_url", "") or ""
+        with transaction.atomic():
+            _update_transaction(txn, request.data or {})
 
-        txn.save()
+    return Response(transaction_payload(txn, token_value, for_buyer=False))
 
-    tasks = [
-        {
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "due_date": task.due_date,
-            "completed": task.completed,
-        }
-        for task in txn.tasks.all()
-    ]
 
-    utilities = [
-        {
-            "id": u.id,
-            "category": u.category,
-            "category_label": u.get_category_display(),
-            "provider_name": u.provider_name,
-            "phone": u.phone,
-            "website": u.website,
-            "account_number_hint": u.account_number_hint,
-            "notes": u.notes,
-            "due_date": u.due_date,
-        }
-        for u in txn.utilities.order_by("category", "provider_name")
-    ]
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_transactions_batch(request):
+    """
+    Full payloads for several of the agent's transactions in one call:
+    ?ids=1,2,3, or no ids for the active pipeline (newest first). Queries
+    don't grow with the number of transactions. At most
+    PORTAL_AGENT_BATCH_MAX are returned; ids the agent can't see are
+    listed under "missing".
+    """
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+    token_value = _extract_agent_token(request)
+    limit = getattr(settings, "PORTAL_AGENT_BATCH_MAX", 50)
 
-    documents = [
+    qs = (
+        Transaction.objects.filter(agent=agent)
+        .select_related("buyer", "agent")
+        .prefetch_related(*TRANSACTION_DETAIL_PREFETCHES)
+    )
+    raw = request.query_params.get("ids", "")
+    if raw:
+        try:
+            ids = list(dict.fromkeys(int(i) for i in raw.split(",") if i.strip()))
+        except ValueError:
+            return Response(
+                {"error": "ids must be comma-separated integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > limit:
+            return Response(
+                {"error": f"at most {limit} ids per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        txns = {txn.id: txn for txn in qs.filter(id__in=ids)}
+        ordered = [txns[i] for i in ids if i in txns]
+        missing = [i for i in ids if i not in txns]
+    else:
+        pipeline = qs.exclude(status__in=reminders.inactive_statuses())
+        ordered = list(pipeline.order_by("-created_at")[:limit])
+        missing = []
+
+    cursor = delta.make_cursor()
+    return Response(
         {
-            "id": d.id,
-            "title": d.title,
-            "doc_type": getattr(d, "doc_type", ""),
-            "url": (
-                getattr(d, "url", "")
-                or (d.file.url if hasattr(d, "file") and getattr(d, "file") else "")
-            ),
-            "uploaded_at": d.uploaded_at,
+            "transactions": [
+                transaction_payload(txn, token_value, for_buyer=False)
+                for txn in ordered
+            ],
+            "missing": missing,
+            "cursor": cursor,
         }
-        for d in txn.documents.filter(visible_to_buyer=True).order_by("-uploaded_at")
-    ]
+    )
 
-    closing_attorney = None
-    preferred_vendors = []
-    utility_providers = []
 
-    tv_qs = txn.transaction_vendors.select_related("vendor").all()
-    for tv in tv_qs:
-        v = tv.vendor
-        payload = {
-            "id": v.id,
-            "name": v.name,
-            "category": v.category,
-            "category_label": v.get_category_display(),
-            "phone": v.phone,
-            "email": v.email,
-            "website": v.website,
-            "notes": tv.notes_override or v.notes,
-            "is_favorite": v.is_favorite,
-        }
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_transaction_history(request, transaction_id):
+    """
+    Audit trail for one transaction, newest first. Pages by id:
+    ?before=<next from the previous page>&limit=<1..200, default 50>.
+    """
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+    if not Transaction.objects.filter(id=transaction_id, agent=agent).exists():
+        return Response(
+            {"error": "transaction not found"}, status=status.HTTP_404_NOT_FOUND
+        )
 
-        if tv.role == TransactionVendor.Role.CLOSING_ATTORNEY:
-            closing_attorney = payload
-        elif tv.role == TransactionVendor.Role.PREFERRED_VENDOR:
-            if str(v.category) != "utility":
-                preferred_vendors.append(payload)
-        elif (
-            hasattr(TransactionVendor.Role, "UTILITY_PROVIDER")
-            and tv.role == TransactionVendor.Role.UTILITY_PROVIDER
-        ):
-            utility_providers.append(payload)
+    try:
+        limit = min(max(int(request.query_params.get("limit") or 50), 1), 200)
+        before = int(request.query_params.get("before") or 0)
+    except ValueError:
+        return Response(
+            {"error": "before and limit must be integers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    faqs = (
-        [
-            {"id": f.id, "q": f.question, "a": f.answer}
-            for f in txn.agent.faqs.filter(is_active=True).order_by("sort_order", "id")
-        ]
-        if hasattr(txn.agent, "faqs")
-        else []
+    qs = AuditEntry.objects.filter(transaction_id=transaction_id).order_by("-id")
+    if before:
+        qs = qs.filter(id__lt=before)
+    rows = list(
+        qs.values(
+            "id", "model", "object_id", "action", "changes", "actor", "created_at"
+        )[: limit + 1]
     )
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return Response({"entries": rows, "next": rows[-1]["id"] if more else None})
 
-    return Response(
-        {
-            "buyer": {"name": txn.buyer.name, "email": txn.buyer.email},
-            "agent": {
-                "name": txn.agent.name,
-                "email": txn.agent.email,
-                "photo_url": getattr(txn.agent, "photo_url", ""),
-                "brokerage_logo_url": getattr(txn.agent, "brokerage_logo_url", ""),
-            },
-            "property": {"address": txn.address, "hero_image_url": txn.hero_image_url},
-            "transaction": TransactionSerializer(txn).data,
-            "tasks": tasks,
-            "utilities": utilities,
-            "documents": documents,
-            "closing_attorney": closing_attorney,
-            "preferred_vendors": preferred_vendors,
-            "utility_providers": utility_providers,
-            "homestead_exemption_url": getattr(txn, "homestead_exemption_url", ""),
-            "review_url": getattr(txn, "review_url", ""),
-            "faqs": faqs,
-            "my_documents_url": getattr(txn, "my_documents_url", ""),
-        }
-    )
+
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_engagement(request):
+    """
+    Buyer engagement per day and kind: ?days=<1..365, default 30> and
+    optionally ?transaction=<id>.
+    """
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+    try:
+        days = min(max(int(request.query_params.get("days") or 30), 1), 365)
+        txn_id = request.query_params.get("transaction")
+        txn_id = int(txn_id) if txn_id else None
+    except ValueError:
+        return Response(
+            {"error": "days and transaction must be integers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({"days": days, "daily": engagement.daily(agent.id, days, txn_id)})
+
+
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_stats(request):
+    """
+    Pilot metrics from the rollup tables (portal/rollups.py): daily
+    engagement for ?days=<1..365, default 30>, task completion rate,
+    median days to close and per-transaction counts. "as_of" is the
+    rollup watermark.
+    """
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+    try:
+        days = min(max(int(request.query_params.get("days") or 30), 1), 365)
+    except ValueError:
+        return Response(
+            {"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(rollups.agent_summary(agent.id, days))
 
 
 @api_view(["GET"])
@@ -498,23 +853,8 @@ def agent_vendors(request):
     if err:
         return err
 
-    qs = Vendor.objects.filter(agent=agent, is_favorite=True).order_by(
-        "category", "name"
-    )
-    favorites = [
-        {
-            "id": v.id,
-            "name": v.name,
-            "category": v.category,
-            "category_label": v.get_category_display(),
-            "phone": v.phone,
-            "email": v.email,
-            "website": v.website,
-            "notes": v.notes,
-            "is_favorite": v.is_favorite,
-        }
-        for v in qs
-    ]
+    qs = vendors.library(agent).filter(is_favorite=True).order_by("category", "name")
+    favorites = [_agent_vendor(v) for v in qs]
     return Response({"favorites": favorites})
 
 
@@ -543,54 +883,128 @@ def agent_vendor_create(request):
         is_favorite=bool(request.data.get("is_favorite", True)),
     )
 
-    return Response(
-        {
-            "id": vendor.id,
-            "name": vendor.name,
-            "category": vendor.category,
-            "category_label": vendor.get_category_display(),
-            "phone": vendor.phone,
-            "email": vendor.email,
-            "website": vendor.website,
-            "notes": vendor.notes,
-            "is_favorite": vendor.is_favorite,
-        },
-        status=status.HTTP_201_CREATED,
-    )
+    return Response(_agent_vendor(vendor), status=status.HTTP_201_CREATED)
 
 
-@api_view(["POST"])
+@api_view(["PATCH"])
 @authentication_classes([])
 @permission_classes([AllowAny])
-def agent_set_transaction_vendors(request, transaction_id):
+def agent_vendor(request, vendor_id):
+    """
+    Edit a vendor from the agent's library. Shared (brokerage) entries are
+    copy-on-write: the response is the agent's override, with a new id.
+    """
     agent, err = _get_agent_from_token(request)
     if err:
         return err
 
     try:
-        txn = Transaction.objects.get(id=transaction_id, agent=agent)
-    except Transaction.DoesNotExist:
+        vendor = vendors.library(agent).get(id=vendor_id)
+    except Vendor.DoesNotExist:
+        return Response({"error": "vendor not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    payload = request.data or {}
+    changes = {f: payload.get(f) or "" for f in vendors.EDITABLE_FIELDS if f in payload}
+    if "is_favorite" in payload:
+        changes["is_favorite"] = bool(payload.get("is_favorite"))
+    if "name" in changes:
+        changes["name"] = changes["name"].strip()
+        if not changes["name"]:
+            return Response(
+                {"error": "name is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+    if "category" in changes and changes["category"] not in Vendor.Category.values:
         return Response(
-            {"error": "transaction not found"}, status=status.HTTP_404_NOT_FOUND
+            {"error": "invalid category"}, status=status.HTTP_400_BAD_REQUEST
         )
 
-    payload = request.data or {}
+    vendor = vendors.update_for_agent(agent, vendor, changes)
+    return Response(_agent_vendor(vendor))
+
+
+def _assign_utilities(txn, agent, utility_ids):
+    """
+    Link `txn` to exactly the utility providers in `utility_ids`, with one
+    utility per provider. Utilities made from unlinked providers are
+    removed and new providers get one; the rest, including the default
+    utilities, keep their category, due date and notes. Returns the linked
+    provider ids.
+    """
+    links = {
+        tv.vendor_id: tv
+        for tv in txn.transaction_vendors.filter(
+            role=TransactionVendor.Role.UTILITY
+        ).select_related("vendor")
+    }
+    selected = {
+        v.id: v
+        for v in vendors.library(agent).filter(id__in=utility_ids, category="utility")
+    }
+    dropped = [tv for vendor_id, tv in links.items() if vendor_id not in selected]
+    for vendor_id, v in selected.items():
+        if vendor_id not in links:
+            TransactionVendor.objects.create(
+                transaction=txn, vendor=v, role=TransactionVendor.Role.UTILITY
+            )
+
+    utilities = {u.provider_name.lower(): u for u in txn.utilities.all()}
+    kept = {v.name.lower() for v in selected.values()}
+    gone = {tv.vendor.name.lower() for tv in dropped} - kept
+    with delta.collecting_deletes():
+        TransactionVendor.objects.filter(id__in=[tv.id for tv in dropped]).delete()
+        Utility.objects.filter(
+            id__in=[utilities[name].id for name in gone if name in utilities]
+        ).delete()
+
+    created = []
+    for v in selected.values():
+        contact = {"phone": v.phone or "", "website": v.website or ""}
+        utility = utilities.get(v.name.lower())
+        if utility is None:
+            created.append(
+                Utility(
+                    transaction=txn,
+                    category=Utility.Category.OTHER,
+                    provider_name=v.name,
+                    notes=v.notes or "",
+                    **contact,
+                )
+            )
+            continue
+        changed = [f for f, value in contact.items() if getattr(utility, f) != value]
+        if changed:
+            for f in changed:
+                setattr(utility, f, contact[f])
+            utility.save(update_fields=[*changed, "updated_at"])
+    if created:
+        Utility.objects.bulk_create(created)
+        audit.record(created, AuditEntry.Action.CREATE)  # no signals
+    return list(selected)
+
+
+def _assign_vendors(txn, agent, payload):
+    """
+    Set `txn`'s closing attorney and preferred vendors to those in
+    `payload`, and its utility providers too when "utility_provider_ids"
+    is present. Call inside transaction.atomic(); returns an error Response
+    (the caller must roll back) or None.
+    """
     closing_id = payload.get("closing_attorney_vendor_id")
     preferred_ids = payload.get("preferred_vendor_ids") or []
+    set_utilities = "utility_provider_ids" in payload
     utility_ids = payload.get("utility_provider_ids") or []
 
-    roles_to_clear = [
-        TransactionVendor.Role.CLOSING_ATTORNEY,
-        TransactionVendor.Role.PREFERRED_VENDOR,
-    ]
-    if hasattr(TransactionVendor.Role, "UTILITY_PROVIDER"):
-        roles_to_clear.append(TransactionVendor.Role.UTILITY_PROVIDER)
-
-    txn.transaction_vendors.filter(role__in=roles_to_clear).delete()
+    with delta.collecting_deletes():
+        txn.transaction_vendors.filter(
+            role__in=[
+                TransactionVendor.Role.CLOSING_ATTORNEY,
+                TransactionVendor.Role.PREFERRED_VENDOR,
+            ]
+        ).delete()
 
     if closing_id:
         try:
-            v = Vendor.objects.get(id=closing_id, agent=agent)
+            v = vendors.library(agent).get(id=closing_id)
         except Vendor.DoesNotExist:
             return Response(
                 {"error": "closing attorney vendor not found"},
@@ -604,9 +1018,7 @@ def agent_set_transaction_vendors(request, transaction_id):
         )
 
     if preferred_ids:
-        bad = Vendor.objects.filter(
-            id__in=preferred_ids, agent=agent, category="utility"
-        )
+        bad = vendors.library(agent).filter(id__in=preferred_ids, category="utility")
         if bad.exists():
             return Response(
                 {
@@ -615,55 +1027,117 @@ def agent_set_transaction_vendors(request, transaction_id):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        vendors = Vendor.objects.filter(id__in=preferred_ids, agent=agent).exclude(
-            category="utility"
+        preferred = (
+            vendors.library(agent)
+            .filter(id__in=preferred_ids)
+            .exclude(category="utility")
         )
-        for v in vendors:
+        for v in preferred:
             TransactionVendor.objects.create(
                 transaction=txn,
                 vendor=v,
                 role=TransactionVendor.Role.PREFERRED_VENDOR,
             )
 
-    if hasattr(TransactionVendor.Role, "UTILITY_PROVIDER"):
-        if utility_ids:
-            utility_vendors = Vendor.objects.filter(
-                id__in=utility_ids, agent=agent, category="utility"
+    if set_utilities:
+        utility_ids = _assign_utilities(txn, agent, utility_ids)
+    else:
+        # Coalesced webhooks keep only the latest event, so it carries the
+        # current providers rather than leaving them out
+        utility_ids = txn.transaction_vendors.filter(
+            role=TransactionVendor.Role.UTILITY
+        ).values_list("vendor_id", flat=True)
+
+    events.vendors_updated(txn, closing_id, preferred_ids, sorted(utility_ids))
+    return None
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@transaction.atomic
+def agent_set_transaction_vendors(request, transaction_id):
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+
+    try:
+        txn = Transaction.objects.get(id=transaction_id, agent=agent)
+    except Transaction.DoesNotExist:
+        return Response(
+            {"error": "transaction not found"}, status=status.HTTP_404_NOT_FOUND
+        )
+
+    err = _assign_vendors(txn, agent, request.data or {})
+    if err:
+        transaction.set_rollback(True)
+        return err
+    return Response({"ok": True})
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_transaction_save(request, transaction_id):
+    """
+    The setup screen's Save in one request and one DB transaction:
+
+        {"version": "...",
+         "transaction": {"address": ..., "closing_date": ..., ...},
+         "vendors": {"closing_attorney_vendor_id": 3,
+                     "preferred_vendor_ids": [...],
+                     "utility_provider_ids": [...]}}
+
+    Sections left out are not touched. With "version" (from an earlier
+    payload) the save is refused with 409 if the transaction was saved
+    since. Returns the updated agent payload with its new version.
+    """
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+    token_value = _extract_agent_token(request)
+    payload = request.data or {}
+
+    with transaction.atomic():
+        try:
+            txn = Transaction.objects.select_for_update().get(
+                id=transaction_id, agent=agent
+            )
+        except Transaction.DoesNotExist:
+            return Response(
+                {"error": "transaction not found"}, status=status.HTTP_404_NOT_FOUND
             )
-            for v in utility_vendors:
-                TransactionVendor.objects.create(
-                    transaction=txn,
-                    vendor=v,
-                    role=TransactionVendor.Role.UTILITY_PROVIDER,
-                )
 
-            txn.utilities.all().delete()
-            Utility.objects.bulk_create(
-                [
-                    Utility(
-                        transaction=txn,
-                        category=Utility.Category.OTHER
-                        if hasattr(Utility, "Category")
-                        else "other",
-                        provider_name=v.name,
-                        phone=v.phone or "",
-                        website=v.website or "",
-                        account_number_hint="",
-                        notes=v.notes or "",
-                        due_date=None,
-                    )
-                    for v in utility_vendors
-                ]
+        expected = payload.get("version")
+        if expected and expected != transaction_version(txn):
+            return Response(
+                {
+                    "error": "transaction changed since it was loaded",
+                    "version": transaction_version(txn),
+                },
+                status=status.HTTP_409_CONFLICT,
             )
-        else:
-            txn.utilities.all().delete()
 
-    return Response({"ok": True})
+        if payload.get("vendors") is not None:
+            err = _assign_vendors(txn, agent, payload["vendors"])
+            if err:
+                transaction.set_rollback(True)
+                return err
+        # Always saved, so the version moves with vendor-only saves too
+        _update_transaction(txn, payload.get("transaction") or {})
+
+    txn = (
+        Transaction.objects.select_related("buyer", "agent")
+        .prefetch_related(*TRANSACTION_DETAIL_PREFETCHES)
+        .get(id=txn.id)
+    )
+    return Response(transaction_payload(txn, token_value, for_buyer=False))
 
 
 @api_view(["POST"])
 @authentication_classes([])
 @permission_classes([AllowAny])
+@transaction.atomic
 def agent_transaction_create(request):
     agent, err = _get_agent_from_token(request)
     if err:
@@ -705,34 +1179,10 @@ def agent_transaction_create(request):
     create_defaults = data.get("create_defaults", True)
 
     if create_defaults:
-        Task.objects.bulk_create(
-            [
-                Task(
-                    transaction=txn,
-                    title=t["title"],
-                    description=t.get("description", ""),
-                    order=t.get("order", 0),
-                )
-                for t in DEFAULT_TASK_TEMPLATES
-            ]
-        )
-
-        Utility.objects.bulk_create(
-            [
-                Utility(
-                    transaction=txn,
-                    category=u["category"],
-                    provider_name=u["provider_name"],
-                    phone="",
-                    website="",
-                    account_number_hint="",
-                    notes="",
-                    due_date=None,
-                )
-                for u in DEFAULT_UTILITY_TEMPLATES
-            ]
-        )
+        children = defaults.create_for([txn])
+        audit.record(children, AuditEntry.Action.CREATE)  # no signals
 
+    events.transaction_created(txn)
     return Response(
         {
             "transaction": {
@@ -754,12 +1204,23 @@ def agent_transaction_create(request):
 @permission_classes([AllowAny])
 def toggle_task(request, task_id):
     try:
-        task = Task.objects.get(id=task_id)
+        task = Task.objects.select_related("transaction").get(id=task_id)
     except Task.DoesNotExist:
         return Response({"error": "task not found"}, status=status.HTTP_404_NOT_FOUND)
 
     task.completed = not task.completed
-    task.save(update_fields=["completed"])
+    with transaction.atomic():
+        task.save(update_fields=["completed", "updated_at"])
+        events.task_toggled(task, task.transaction)
+    engagement.record(
+        (
+            engagement.Kind.TASK_COMPLETED
+            if task.completed
+            else engagement.Kind.TASK_REOPENED
+        ),
+        task.transaction,
+        object_id=task.id,
+    )
     return Response({"id": task.id, "completed": task.completed})
 
 
@@ -797,3 +1258,417 @@ def agent_signup(request):
         },
         status=status.HTTP_201_CREATED,
     )
+
+
+# -----------------------------
+# Image proxy
+# -----------------------------
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@require_GET
+def image_proxy(request):
+    """
+    /img/?src=<registered url>&w=640[&fmt=webp|jpeg]
+
+    Redirects to the content-addressed variant, or to the original URL
+    while the image isn't ready (the fetch happens in the background).
+    Unregistered URLs are refused so this is not an open proxy.
+    """
+    src = request.GET.get("src", "")
+    try:
+        asset = ImageAsset.objects.get(source_url=src)
+    except ImageAsset.DoesNotExist:
+        return HttpResponseNotFound("unknown image")
+
+    if images.Image is None:
+        return HttpResponseRedirect(src)
+    if asset.status != ImageAsset.Status.READY:
+        images.ensure(asset)
+        response = HttpResponseRedirect(src)
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    try:
+        width = images.pick_width(int(request.GET.get("w", "640")))
+    except ValueError:
+        return HttpResponseBadRequest("w must be an integer")
+
+    fmt = request.GET.get("fmt", "")
+    if fmt not in images.FORMATS:
+        fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+
+    response = HttpResponseRedirect(images.variant_url(asset.content_hash, width, fmt))
+    response["Cache-Control"] = "public, max-age=300"
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+@require_GET
+def image_variant(request, content_hash, width, fmt):
+    if (
+        not images.is_content_hash(content_hash)
+        or fmt not in images.FORMATS
+        or width not in images.widths()
+    ):
+        return HttpResponseNotFound("unknown variant")
+
+    key = images.variant_key(content_hash, width, fmt)
+    storage = get_storage()
+    if storage.supports_presign:
+        response = HttpResponseRedirect(
+            signed_download_url(key, content_type=images.FORMATS[fmt])
+        )
+        response["Cache-Control"] = "public, max-age=60"
+        return response
+
+    try:
+        fh = storage.open(key)
+    except FileNotFoundError:
+        return HttpResponseNotFound("unknown variant")
+
+    response = FileResponse(fh, content_type=images.FORMATS[fmt])
+    response["Cache-Control"] = IMMUTABLE
+    response["ETag"] = f'"{content_hash[:16]}-{width}-{fmt}"'
+    return response
+
+
+# -----------------------------
+# Document uploads (chunked, resumable)
+# -----------------------------
+
+
+def _upload_payload(upload):
+    payload = {
+        "upload_id": str(upload.id),
+        "filename": upload.filename,
+        "size": upload.total_size,
+        "offset": upload.received,
+        "chunk_size": uploads.chunk_bytes(),
+        "complete": upload.completed_at is not None,
+        "direct": upload.direct,
+    }
+    if upload.direct and upload.completed_at is None:
+        url, headers = uploads.direct_upload_target(upload)
+        payload["upload_url"] = url
+        payload["upload_headers"] = headers
+    return payload
+
+
+def _document_payload(d, token_value):
+    return {
+        "id": d.id,
+        "title": d.title,
+        "doc_type": d.doc_type,
+        "url": d.url or document_download_url(d, token_value),
+        "uploaded_at": d.uploaded_at,
+        "visible_to_buyer": d.visible_to_buyer,
+    }
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_upload_create(request, transaction_id):
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+
+    try:
+        txn = Transaction.objects.get(id=transaction_id, agent=agent)
+    except Transaction.DoesNotExist:
+        return Response(
+            {"error": "transaction not found"}, status=status.HTTP_404_NOT_FOUND
+        )
+
+    data = request.data or {}
+    filename = os.path.basename((data.get("filename") or "").strip())
+    try:
+        size = int(data.get("size") or 0)
+    except (TypeError, ValueError):
+        size = 0
+
+    if not filename or size <= 0:
+        return Response(
+            {"error": "filename and size are required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if size > uploads.max_bytes():
+        return Response(
+            {"error": f"files are limited to {uploads.max_bytes()} bytes"},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+    # Direct uploads go straight to storage and need the checksum up front.
+    direct = bool(data.get("direct")) and get_storage().supports_presign
+    sha256 = (data.get("sha256") or "").strip().lower()
+    if direct and not uploads.is_sha256(sha256):
+        return Response(
+            {"error": "sha256 (hex) is required for direct uploads"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    upload = UploadSession.objects.create(
+        agent=agent,
+        transaction=txn,
+        filename=filename[:255],
+        content_type=(data.get("content_type") or "")[:120],
+        total_size=size,
+        title=(data.get("title") or "")[:200],
+        doc_type=(data.get("doc_type") or "")[:80],
+        visible_to_buyer=bool(data.get("visible_to_buyer", True)),
+        direct=direct,
+        sha256=sha256 if direct else "",
+    )
+    return Response(_upload_payload(upload), status=status.HTTP_201_CREATED)
+
+
+@api_view(["GET", "PUT"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_upload(request, upload_id):
+    """
+    GET reports the resume offset; PUT appends the raw request body at
+    the Upload-Offset header.
+    """
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+
+    try:
+        upload = UploadSession.objects.get(id=upload_id, agent=agent)
+    except UploadSession.DoesNotExist:
+        return Response({"error": "upload not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == "GET":
+        return Response(_upload_payload(upload))
+
+    if upload.completed_at is not None or upload.direct:
+        return Response(
+            {"error": "upload is complete or goes directly to storage"},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return Response(
+            {"error": "Upload-Offset header is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        uploads.write_chunk(upload, offset, request.stream, length)
+    except uploads.OffsetMismatch as exc:
+        return Response(
+            {"error": str(exc), "offset": exc.expected},
+            status=status.HTTP_409_CONFLICT,
+        )
+    except uploads.UploadError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(_upload_payload(upload))
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def agent_upload_complete(request, upload_id):
+    agent, err = _get_agent_from_token(request)
+    if err:
+        return err
+
+    try:
+        upload = UploadSession.objects.select_related("document").get(
+            id=upload_id, agent=agent
+        )
+    except UploadSession.DoesNotExist:
+        return Response({"error": "upload not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        document, deduplicated = uploads.complete(upload)
+    except uploads.UploadError as exc:
+        return Response(
+            {"error": str(exc), "offset": upload.received},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    return Response(
+        {
+            "document": _document_payload(document, _extract_agent_token(request)),
+            "deduplicated": deduplicated,
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
+# -----------------------------
+# Document downloads
+# -----------------------------
+
+
+@require_GET
+def document_download(request, document_id):
+    """
+    ?t= accepts the buyer's PortalToken (buyer-visible documents of that
+    transaction only) or the agent's token (any document they own).
+    """
+    token_value = request.GET.get("t", "") or request.headers.get("X-Agent-Token", "")
+    if not token_value:
+        return HttpResponseBadRequest("missing token")
+
+    try:
+        document = Document.objects.select_related("stored_object", "transaction").get(
+            id=document_id
+        )
+    except Document.DoesNotExist:
+        return HttpResponseNotFound("document not found")
+
+    pt = PortalToken.objects.filter(token=token_value).first()
+    if pt is not None:
+        allowed = (
+            pt.is_valid()
+            and pt.transaction_id == document.transaction_id
+            and document.visible_to_buyer
+        )
+    else:
+        at = AgentPortalToken.objects.filter(token=token_value).first()
+        allowed = (
+            at is not None
+            and at.is_valid()
+            and at.agent_id == document.transaction.agent_id
+        )
+    if not allowed:
+        return HttpResponseNotFound("document not found")
+    if pt is not None:
+        engagement.record(
+            engagement.Kind.DOCUMENT_OPEN, document.transaction, object_id=document.id
+        )
+
+    if document.stored_object is None:
+        if document.url:
+            return HttpResponseRedirect(document.url)
+        return HttpResponseNotFound("document has no file")
+    return downloads.serve(request, document)
+
+
+# -----------------------------
+# Calendar feeds (.ics)
+# -----------------------------
+
+
+def _calendar_response(request, feed):
+    not_modified = get_conditional_response(
+        request, etag=feed["etag"], last_modified=feed["last_modified"]
+    )
+    if not_modified is None:
+        response = HttpResponse(
+            feed["body"], content_type="text/calendar; charset=utf-8"
+        )
+        response["Last-Modified"] = http_date(feed["last_modified"])
+    else:
+        response = not_modified
+    response["ETag"] = feed["etag"]
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@require_GET
+def agent_calendar(request):
+    """
+    ?t=AGENT_TOKEN -> .ics feed of every closing date and open task/utility
+    due date across the agent's transactions (see portal/ics.py). Calendar
+    apps can't send headers, so the token is in the subscription URL.
+    """
+    token_value = request.GET.get("t", "")
+    if not token_value:
+        return JsonResponse({"error": "missing token"}, status=400)
+    at = (
+        AgentPortalToken.objects.select_related("agent")
+        .filter(token=token_value)
+        .first()
+    )
+    if at is None:
+        return JsonResponse({"error": "invalid token"}, status=401)
+    if not at.is_valid():
+        return JsonResponse({"error": "expired token"}, status=401)
+    return _calendar_response(request, ics.agent_feed(at.agent))
+
+
+@require_GET
+def transaction_calendar(request, transaction_id):
+    """
+    .ics feed for one transaction; ?t= is the buyer's or agent's token.
+    """
+    token_value = request.GET.get("t", "")
+    if not token_value:
+        return HttpResponseBadRequest("missing token")
+    if not _can_watch(token_value, transaction_id):
+        return HttpResponseNotFound("transaction not found")
+    return _calendar_response(request, ics.transaction_feed(transaction_id))
+
+
+# -----------------------------
+# Live updates (Server-Sent Events)
+# -----------------------------
+
+
+def _can_watch(token_value, transaction_id):
+    pt = PortalToken.objects.filter(token=token_value).first()
+    if pt is not None:
+        return pt.is_valid() and pt.transaction_id == transaction_id
+    at = AgentPortalToken.objects.filter(token=token_value).first()
+    return (
+        at is not None
+        and at.is_valid()
+        and Transaction.objects.filter(id=transaction_id, agent_id=at.agent_id).exists()
+    )
+
+
+async def _event_stream(transaction_id):
+    heartbeat = getattr(settings, "PORTAL_SSE_HEARTBEAT_SECONDS", 20)
+    max_age = getattr(settings, "PORTAL_SSE_MAX_SECONDS", 3600)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_age
+
+    sub = pubsub.subscribe(transaction_id)
+    try:
+        ready = json.dumps({"cursor": delta.make_cursor()})
+        yield f"retry: 3000\nevent: ready\ndata: {ready}\n\n"
+        while loop.time() < deadline:
+            try:
+                message = await sub.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"event: change\ndata: {json.dumps(message)}\n\n"
+    finally:
+        pubsub.unsubscribe(sub)
+
+
+@require_GET
+async def transaction_events(request, transaction_id):
+    """
+    SSE stream of change notifications for one transaction; ?t= is the
+    buyer's or agent's magic-link token (EventSource can't send headers).
+    Each "change" event only says something changed; clients fetch it with
+    ?since=<cursor>. Streams end after PORTAL_SSE_MAX_SECONDS so the token
+    is re-checked on reconnect. Serve under ASGI: under WSGI every open
+    stream holds a worker thread.
+    """
+    token_value = request.GET.get("t", "") or request.headers.get("X-Agent-Token", "")
+    if not token_value:
+        return HttpResponseBadRequest("missing token")
+    if not await sync_to_async(_can_watch, thread_sensitive=False)(
+        token_value, transaction_id
+    ):
+        return HttpResponseNotFound("transaction not found")
+
+    response = StreamingHttpResponse(
+        _event_stream(transaction_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
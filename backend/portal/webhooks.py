@@ -0,0 +1,299 @@
+"""
+Deliver outbox events to agents' webhook endpoints.
+
+Run by manage.py dispatch_webhooks, never from a request. Each pass:
+
+1. Fan-out: pending OutboxEvents older than PORTAL_WEBHOOK_COALESCE_SECONDS
+   are grouped per agent. Events sharing a coalesce key collapse to the
+   latest one (transaction.updated merges its field changes). Each active
+   endpoint gets one WebhookDelivery per PORTAL_WEBHOOK_BATCH_MAX events.
+   The events are then marked dispatched, in the same DB transaction.
+2. Send: due deliveries are POSTed concurrently (PORTAL_WEBHOOK_WORKERS).
+   Any 2xx marks a delivery delivered. Failures back off exponentially,
+   with jitter. After PORTAL_WEBHOOK_MAX_ATTEMPTS the delivery is marked
+   failed. A 410 Gone deactivates the endpoint.
+
+Requests carry
+  X-Portal-Signature: t=<unix ts>,v1=<hex HMAC-SHA256(secret, "<ts>.<body>")>
+  X-Portal-Delivery: <delivery id>
+Receivers verify the HMAC and reject stale timestamps.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent, WebhookDelivery, WebhookEndpoint
+
+logger = logging.getLogger("portal.webhooks")
+
+SIGNATURE_HEADER = "X-Portal-Signature"
+
+# Sent deliveries are leased for this long so an overlapping dispatcher
+# doesn't pick them up while the POST is in flight.
+LEASE = timedelta(minutes=2)
+
+
+def _setting(name, default):
+    return getattr(settings, f"PORTAL_WEBHOOK_{name}", default)
+
+
+def sign(secret, body, timestamp=None):
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    digest = hmac.new(
+        secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def backoff(attempts):
+    """
+    Seconds before retry number `attempts` + 1: 30s, 1m, 2m, ... capped at
+    1h, with +/-20% jitter so failed endpoints don't retry in lockstep.
+    """
+    delay = min(30 * 2 ** (attempts - 1), 3600)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# -----------------------------
+# Fan-out
+# -----------------------------
+
+
+def _event_payload(event, coalesced=1):
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "created_at": event.created_at,
+        "transaction_id": event.transaction_id,
+        "data": event.data,
+        "coalesced": coalesced,
+    }
+
+
+def coalesce(events):
+    """
+    Collapse events sharing a coalesce key to the latest one, keeping the
+    latest one's position. For transaction.updated the field changes are
+    merged (first "from", last "to"); no-op round trips are dropped.
+    """
+    latest, merged, counts = {}, {}, Counter()
+    for event in events:
+        if not event.coalesce_key:
+            continue
+        key = event.coalesce_key
+        counts[key] += 1
+        latest[key] = event
+        if "changes" in event.data:
+            changes = merged.setdefault(key, {})
+            for field, change in event.data["changes"].items():
+                first = changes.get(field, change)["from"]
+                changes[field] = {"from": first, "to": change["to"]}
+
+    out = []
+    for event in events:
+        key = event.coalesce_key
+        if key and latest[key] is not event:
+            continue
+        payload = _event_payload(event, counts[key] if key else 1)
+        if key in merged:
+            changes = {f: c for f, c in merged[key].items() if c["from"] != c["to"]}
+            if not changes:
+                continue
+            payload["data"] = {**event.data, "changes": changes}
+        out.append(payload)
+    return out
+
+
+def fan_out(now=None, limit=1000):
+    """
+    Turn pending events into deliveries. Returns (events, deliveries).
+    """
+    now = now or timezone.now()
+    ready_before = now - timedelta(seconds=_setting("COALESCE_SECONDS", 5))
+    batch_max = _setting("BATCH_MAX", 100)
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True, created_at__lte=ready_before)
+            .order_by("id")[:limit]
+        )
+        if not events:
+            return 0, 0
+
+        by_agent = defaultdict(list)
+        for event in events:
+            by_agent[event.agent_id].append(event)
+        endpoints = defaultdict(list)
+        for endpoint in WebhookEndpoint.objects.filter(
+            agent_id__in=by_agent, is_active=True
+        ):
+            endpoints[endpoint.agent_id].append(endpoint)
+
+        deliveries = []
+        for agent_id, agent_events in by_agent.items():
+            if not endpoints[agent_id]:
+                continue
+            payloads = coalesce(agent_events)
+            for endpoint in endpoints[agent_id]:
+                wanted = [p for p in payloads if endpoint.wants(p["type"])]
+                for start in range(0, len(wanted), batch_max):
+                    batch = wanted[start : start + batch_max]
+                    deliveries.append(
+                        WebhookDelivery(
+                            endpoint=endpoint,
+                            body=json.dumps({"events": batch}, cls=DjangoJSONEncoder),
+                            event_count=len(batch),
+                            next_attempt_at=now,
+                        )
+                    )
+
+        WebhookDelivery.objects.bulk_create(deliveries)
+        OutboxEvent.objects.filter(id__in=[e.id for e in events]).update(
+            dispatched_at=now
+        )
+    return len(events), len(deliveries)
+
+
+# -----------------------------
+# Sending
+# -----------------------------
+
+
+def post(delivery):
+    """
+    POST one delivery; returns (status or None, error message).
+    """
+    body = delivery.body.encode()
+    req = urllib.request.Request(
+        delivery.endpoint.url,
+        data=body,
+        method="POST",
+        headers={
+            "Content-Type": "application/json",
+            "User-Agent": "realestate-portal-webhooks",
+            SIGNATURE_HEADER: sign(delivery.endpoint.secret, body),
+            "X-Portal-Delivery": str(delivery.id),
+        },
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=_setting("TIMEOUT", 5)) as resp:
+            return resp.status, ""
+    except urllib.error.HTTPError as exc:
+        return exc.code, f"HTTP {exc.code}"
+    except Exception as exc:  # DNS, refused, timeout, TLS
+        return None, str(exc)[:200]
+
+
+def _claim_due(now, limit):
+    due = WebhookDelivery.objects.filter(
+        delivered_at__isnull=True,
+        failed_at__isnull=True,
+        next_attempt_at__lte=now,
+        endpoint__is_active=True,
+    )
+    with transaction.atomic():
+        ids = list(
+            due.select_for_update(skip_locked=True, of=("self",))
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        WebhookDelivery.objects.filter(id__in=ids).update(next_attempt_at=now + LEASE)
+    return list(WebhookDelivery.objects.select_related("endpoint").filter(id__in=ids))
+
+
+def send_due(now=None, limit=200):
+    """
+    Attempt every due delivery once. Returns a Counter of outcomes.
+    """
+    now = now or timezone.now()
+    stats = Counter()
+    deliveries = _claim_due(now, limit)
+    if not deliveries:
+        return stats
+
+    with ThreadPoolExecutor(
+        max_workers=_setting("WORKERS", 8), thread_name_prefix="portal-webhooks"
+    ) as pool:
+        results = list(pool.map(post, deliveries))
+
+    max_attempts = _setting("MAX_ATTEMPTS", 8)
+    for delivery, (status, error) in zip(deliveries, results):
+        delivery.attempts += 1
+        delivery.last_status = status
+        delivery.last_error = error
+        if status is not None and 200 <= status < 300:
+            delivery.delivered_at = timezone.now()
+            stats["delivered"] += 1
+        elif status == 410:
+            WebhookEndpoint.objects.filter(id=delivery.endpoint_id).update(
+                is_active=False
+            )
+            delivery.failed_at = timezone.now()
+            stats["gone"] += 1
+        elif delivery.attempts >= max_attempts:
+            delivery.failed_at = timezone.now()
+            stats["failed"] += 1
+            logger.warning(
+                "webhook delivery %s to %s gave up: %s",
+                delivery.id,
+                delivery.endpoint.url,
+                error,
+            )
+        else:
+            delivery.next_attempt_at = timezone.now() + timedelta(
+                seconds=backoff(delivery.attempts)
+            )
+            stats["retrying"] += 1
+
+    WebhookDelivery.objects.bulk_update(
+        deliveries,
+        [
+            "attempts",
+            "last_status",
+            "last_error",
+            "delivered_at",
+            "failed_at",
+            "next_attempt_at",
+        ],
+    )
+    return stats
+
+
+def dispatch():
+    """
+    One fan-out + send pass.
+    """
+    events, created = fan_out()
+    stats = send_due()
+    stats["events"] = events
+    stats["deliveries_created"] = created
+    return stats
+
+
+def prune(days):
+    """
+    Drop dispatched events and finished deliveries older than `days`.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    events, _ = OutboxEvent.objects.filter(dispatched_at__lt=cutoff).delete()
+    deliveries, _ = (
+        WebhookDelivery.objects.filter(created_at__lt=cutoff)
+        .exclude(delivered_at__isnull=True, failed_at__isnull=True)
+        .delete()
+    )
+    return events, deliveries
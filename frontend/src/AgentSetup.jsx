@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 
 const API_BASE = "http://127.0.0.1:8000/api/portal";
 
@@ -54,6 +54,8 @@ export default function AgentSetup() {
   const [selectedId, setSelectedId] = useState("");
 
   const [txnData, setTxnData] = useState(null);
+  // Transaction payloads preloaded by the batch endpoint, keyed by id
+  const txnCache = useRef(new Map());
 
   // ---- Basics ----
   const [address, setAddress] = useState("");
@@ -108,6 +110,17 @@ export default function AgentSetup() {
         if (j.transactions?.length) {
           setSelectedId(String(j.transactions[0].id));
         }
+
+        // Preload the active pipeline so switching transactions is instant
+        const rb = await fetch(`${API_BASE}/agent/transactions/batch/`, {
+          headers: agentHeaders(),
+        });
+        if (rb.ok) {
+          const jb = await rb.json();
+          for (const t of jb.transactions || []) {
+            txnCache.current.set(String(t.transaction.id), t);
+          }
+        }
       } catch (e) {
         setErr(e.message);
       } finally {
@@ -148,11 +161,14 @@ export default function AgentSetup() {
     async function loadTxn() {
       setErr("");
       try {
-        const r = await fetch(`${API_BASE}/agent/transaction/${selectedId}/`, {
-          headers: agentHeaders(),
-        });
-        const j = await r.json();
-        if (!r.ok) throw new Error(j?.error || "Failed to load transaction");
+        let j = txnCache.current.get(selectedId);
+        if (!j) {
+          const r = await fetch(`${API_BASE}/agent/transaction/${selectedId}/`, {
+            headers: agentHeaders(),
+          });
+          j = await r.json();
+          if (!r.ok) throw new Error(j?.error || "Failed to load transaction");
+        }
 
         setTxnData(j);
         setAddress(j.transaction?.address || "");
@@ -174,28 +190,54 @@ export default function AgentSetup() {
   }, [selectedId, token]);
 
   // =========================
-  // Save basics
+  // Save (basics + vendors + utilities in one request)
   // =========================
-  async function saveBasics() {
-    setSaving(true);
-    setSaveMsg("");
-    try {
-      const r = await fetch(`${API_BASE}/agent/transaction/${selectedId}/`, {
-        method: "PATCH",
-        headers: agentHeaders({ "Content-Type": "application/json" }),
-        body: JSON.stringify({
+  async function saveTransaction() {
+    const vendors = {
+      closing_attorney_vendor_id: closingAttorneyId ? Number(closingAttorneyId) : null,
+      preferred_vendor_ids: Array.from(preferredVendorIds).map(Number),
+    };
+    // Utilities are rebuilt from the selected providers, so only send them when changed
+    const loadedUtilityIds = (txnData?.utility_providers || []).map(v => String(v.id));
+    if (
+      loadedUtilityIds.length !== utilityVendorIds.size ||
+      loadedUtilityIds.some(id => !utilityVendorIds.has(id))
+    ) {
+      vendors.utility_provider_ids = Array.from(utilityVendorIds).map(Number);
+    }
+
+    const r = await fetch(`${API_BASE}/agent/transaction/${selectedId}/save/`, {
+      method: "POST",
+      headers: agentHeaders({ "Content-Type": "application/json" }),
+      body: JSON.stringify({
+        version: txnData?.version,
+        transaction: {
           address,
           closing_date: closingDate || null,
           hero_image_url: heroImageUrl,
           homestead_exemption_url: homesteadUrl,
           review_url: reviewUrl,
           my_documents_url: myDocsUrl,
-        }),
-      });
+        },
+        vendors,
+      }),
+    });
+
+    const j = await r.json();
+    if (r.status === 409) {
+      throw new Error("This transaction was changed elsewhere. Reload to see the latest.");
+    }
+    if (!r.ok) throw new Error(j?.error || "Save failed");
 
-      const j = await r.json();
-      if (!r.ok) throw new Error(j?.error || "Save failed");
+    txnCache.current.set(selectedId, j);
+    setTxnData(j);
+  }
 
+  async function saveBasics() {
+    setSaving(true);
+    setSaveMsg("");
+    try {
+      await saveTransaction();
       setSaveMsg("Saved ✓");
     } catch (e) {
       setErr(e.message);
@@ -204,32 +246,11 @@ export default function AgentSetup() {
     }
   }
 
-  // =========================
-  // Save vendors + utilities
-  // =========================
   async function saveVendors() {
     setVendorsSaving(true);
     setVendorsMsg("");
     try {
-      const vResp = await fetch(`${API_BASE}/agent/transaction/${selectedId}/vendors/`, {
-        method: "POST",
-        headers: agentHeaders({ "Content-Type": "application/json" }),
-        body: JSON.stringify({
-          closing_attorney_vendor_id: closingAttorneyId ? Number(closingAttorneyId) : null,
-          preferred_vendor_ids: Array.from(preferredVendorIds).map(Number),
-        }),
-      });
-      if (!vResp.ok) throw new Error("Failed to save vendors");
-
-      const uResp = await fetch(`${API_BASE}/agent/transaction/${selectedId}/utilities/set/`, {
-        method: "POST",
-        headers: agentHeaders({ "Content-Type": "application/json" }),
-        body: JSON.stringify({
-          utility_vendor_ids: Array.from(utilityVendorIds).map(Number),
-        }),
-      });
-      if (!uResp.ok) throw new Error("Failed to save utilities");
-
+      await saveTransaction();
       setVendorsMsg("Saved ✓");
     } catch (e) {
       setVendorsError(e.message);
@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import { BrowserRouter, Routes, Route, Link, useNavigate } from "react-router-dom";
 import "./App.css";
 import AgentSetup from "./AgentSetup";
@@ -8,6 +8,34 @@ import AgentLogin from "./AgentLogin";
 
 const API_BASE = "http://127.0.0.1:8000/api/portal";
 
+// Merge a `?since=` delta into the loaded session (rows are keyed by id;
+// other keys only appear in the delta when they changed).
+function applyDelta(prev, delta) {
+  const next = { ...prev, cursor: delta.cursor };
+  for (const key of ["tasks", "utilities", "documents"]) {
+    const gone = new Set(delta.deleted?.[key] || []);
+    const changed = new Map((delta[key] || []).map((row) => [row.id, row]));
+    const rows = (prev[key] || [])
+      .filter((row) => !gone.has(row.id))
+      .map((row) => changed.get(row.id) || row);
+    const seen = new Set(rows.map((row) => row.id));
+    for (const row of changed.values()) if (!seen.has(row.id)) rows.push(row);
+    next[key] = rows;
+  }
+  for (const key of [
+    "property",
+    "transaction",
+    "closing_attorney",
+    "preferred_vendors",
+    "homestead_exemption_url",
+    "review_url",
+    "my_documents_url",
+  ]) {
+    if (key in delta) next[key] = delta[key];
+  }
+  return next;
+}
+
 function BuyerPortal() {
   const token = useMemo(() => {
     const p = new URLSearchParams(window.location.search);
@@ -30,7 +58,8 @@ function BuyerPortal() {
     setLoading(true);
     setErr("");
 
-    fetch(`${API_BASE}/session/?t=${encodeURIComponent(token)}`)
+    // Redirects to the static snapshot (or the live session if unpublished)
+    fetch(`${API_BASE}/session/published/?t=${encodeURIComponent(token)}`)
       .then(async (r) => {
         const j = await r.json().catch(() => ({}));
         if (!r.ok) throw new Error(j?.error || "Failed to load session");
@@ -41,6 +70,49 @@ function BuyerPortal() {
       .finally(() => setLoading(false));
   }, [token]);
 
+  // Live updates: the stream only signals that something changed; the
+  // change itself is fetched as a small delta since our cursor.
+  const cursorRef = useRef("");
+  cursorRef.current = session?.cursor || "";
+  const txnId = session?.transaction?.id;
+  useEffect(() => {
+    if (!token || !txnId || typeof EventSource === "undefined") return;
+
+    let inFlight = false;
+    let again = false;
+    const pull = () => {
+      if (inFlight) {
+        again = true;
+        return;
+      }
+      inFlight = true;
+      const since = encodeURIComponent(cursorRef.current);
+      fetch(`${API_BASE}/session/?t=${encodeURIComponent(token)}&since=${since}`)
+        .then((r) => (r.ok ? r.json() : null))
+        .then((delta) => {
+          if (!delta) return;
+          cursorRef.current = delta.cursor;
+          setSession((prev) => (prev ? applyDelta(prev, delta) : prev));
+        })
+        .catch(() => {})
+        .finally(() => {
+          inFlight = false;
+          if (again) {
+            again = false;
+            pull();
+          }
+        });
+    };
+
+    const es = new EventSource(
+      `${API_BASE}/transaction/${txnId}/events/?t=${encodeURIComponent(token)}`
+    );
+    es.addEventListener("change", pull);
+    // Catch up on anything missed while reconnecting
+    es.addEventListener("ready", () => cursorRef.current && pull());
+    return () => es.close();
+  }, [token, txnId]);
+
   if (!token) {
     return (
       <div style={shell}>
@@ -218,7 +290,13 @@ function BuyerPortal() {
                   <div style={{ display: "flex", gap: 12, flexWrap: "wrap", marginTop: 6 }}>
                     {u.phone ? <span style={tiny}>📞 {u.phone}</span> : null}
                     {u.website ? (
-                      <a style={link} href={u.website} target="_blank" rel="noreferrer">
+                      <a
+                        style={link}
+                        href={u.website}
+                        target="_blank"
+                        rel="noreferrer"
+                        onClick={() => track(token, "utility_click", u.id)}
+                      >
                         🔗 Website
                       </a>
                     ) : null}
@@ -247,6 +325,7 @@ function BuyerPortal() {
               title="My Documents"
               subtitle="Your folder (Google Drive / Box / Dropbox)"
               href={d?.my_documents_url}
+              onOpen={() => track(token, "link_click", null, "my_documents")}
               empty="Not set yet"
             />
             <Divider />
@@ -254,6 +333,7 @@ function BuyerPortal() {
               title="Homestead Exemption"
               subtitle="File after closing (varies by county)"
               href={d?.homestead_exemption_url}
+              onOpen={() => track(token, "link_click", null, "homestead_exemption")}
               empty="Not set"
             />
             <Divider />
@@ -261,6 +341,7 @@ function BuyerPortal() {
               title="Leave a Review"
               subtitle="If you enjoyed working with your agent"
               href={d?.review_url}
+              onOpen={() => track(token, "link_click", null, "review")}
               empty="Not set"
             />
           </div>
@@ -313,11 +394,23 @@ function Card({ children }) {
   return <div style={card}>{children}</div>;
 }
 
+// Fire-and-forget engagement event; keepalive lets it outlive the click's
+// navigation. The server buffers these, so sending one per click is fine.
+function track(token, kind, objectId, target) {
+  if (!token) return;
+  fetch(`${API_BASE}/engagement/?t=${encodeURIComponent(token)}`, {
+    method: "POST",
+    keepalive: true,
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ events: [{ kind, object_id: objectId, target: target || "" }] }),
+  }).catch(() => {});
+}
+
 function Divider() {
   return <div style={{ height: 1, background: "rgba(255,255,255,0.08)" }} />;
 }
 
-function LinkRow({ title, subtitle, href, empty }) {
+function LinkRow({ title, subtitle, href, empty, onOpen }) {
   const ok = !!(href && String(href).trim());
   return (
     <div style={{ display: "flex", justifyContent: "space-between", gap: 12, alignItems: "center" }}>
@@ -326,7 +419,7 @@ function LinkRow({ title, subtitle, href, empty }) {
         <div style={pMutedSmall}>{subtitle}</div>
       </div>
       {ok ? (
-        <a href={href} target="_blank" rel="noreferrer" style={btnGhost}>Open</a>
+        <a href={href} target="_blank" rel="noreferrer" style={btnGhost} onClick={onOpen}>Open</a>
       ) : (
         <div style={pMutedSmall}>{empty}</div>
       )}